@@ -9,6 +9,11 @@ from config.constants import (
     DEFAULT_NOTE_TEMPLATES,
     DB_CONFIG,
     TABLE_CONFIG,
+    RESULT_CACHE_CONFIG,
+    FIGURE_CACHE_CONFIG,
+    FILTER_MASK_CONFIG,
+    UPLOAD_CONFIG,
+    WAFFLE_CONFIG,
     PAGE_SIZE_OPTIONS,
     DEFAULT_PAGE_SIZE,
     QUICK_FILTERS,
@@ -17,6 +22,8 @@ from config.constants import (
 
 from config.database_schema import (
     SQL_SCHEMAS,
+    SQL_INDEXES,
+    SECONDARY_TABLE_INDEX_SQL,
     REGISTRY_INITIAL_DATA
 )
 
@@ -31,11 +38,18 @@ __all__ = [
     'DEFAULT_NOTE_TEMPLATES',
     'DB_CONFIG',
     'TABLE_CONFIG',
+    'RESULT_CACHE_CONFIG',
+    'FIGURE_CACHE_CONFIG',
+    'FILTER_MASK_CONFIG',
+    'UPLOAD_CONFIG',
+    'WAFFLE_CONFIG',
     'PAGE_SIZE_OPTIONS',
     'DEFAULT_PAGE_SIZE',
     'QUICK_FILTERS',
     'BATCH_OPERATIONS',
     'SQL_SCHEMAS',
+    'SQL_INDEXES',
+    'SECONDARY_TABLE_INDEX_SQL',
     'REGISTRY_INITIAL_DATA'
 ]
 
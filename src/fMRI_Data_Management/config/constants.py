@@ -74,7 +74,19 @@ DEFAULT_NOTE_TEMPLATES = [
 # Database Configuration
 DB_CONFIG = {
     'default_path': 'fmri_qc.db',
-    'check_same_thread': False
+    'check_same_thread': False,
+    'timeout': 30,          # seconds to wait on a locked database / busy pool
+    'pool_size': 5,         # max pooled read connections
+    'frame_patch_limit': 500,   # dirty rows patched into the cached frame before a full reload
+    'metric_storage': 'json',   # 'json' (qc_data.qc_metrics blob) or 'normalized' (qc_metric_values)
+    'import_chunk_size': 5000,  # rows per executemany batch in bulk table loads
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,       # negative = KiB (~20 MB)
+        'mmap_size': 268435456,     # 256 MB
+        'temp_store': 'MEMORY'
+    }
 }
 
 # Table Configuration
@@ -83,7 +95,46 @@ TABLE_CONFIG = {
                             'view_details', 'row_id', 'notes'],
     'metadata_columns': ['created_at', 'updated_at', 'updated_by'],
     'fixed_qc_fields': ['PPG', 'PPG_correct', 'cglab', 'projects', 
-                        'Download', 'rescan', 'notes', 'tags']
+                        'Download', 'rescan', 'notes', 'tags'],
+    # Page/sort/filter the main table in SQL instead of in the browser
+    'server_side': False,
+    # Milliseconds of no typing before the ID / notes search boxes apply
+    # (dbc.Input debounce is in ms)
+    'filter_debounce': 400
+}
+
+# Server-side cache for filtered results (filtered-data store holds only a key)
+RESULT_CACHE_CONFIG = {
+    'max_bytes': 256 * 1024 * 1024,
+    'max_entries': 32
+}
+
+# Serialized stats figures, keyed on (chart, data generation, filter fingerprint)
+FIGURE_CACHE_CONFIG = {
+    'max_bytes': 64 * 1024 * 1024,
+    'max_entries': 64
+}
+
+# Per-predicate boolean masks over the parsed qc_data frame (native table mode)
+FILTER_MASK_CONFIG = {
+    'max_bytes': 64 * 1024 * 1024,
+    'max_entries': 64
+}
+
+# Uploaded CSV files are decoded to disk; only a preview is kept in memory
+UPLOAD_CONFIG = {
+    'dir': None,                # None -> <system temp dir>/fmri_uploads
+    'max_age_hours': 24,        # older uploads are removed on the next upload
+    'decode_chunk_size': 4 * 1024 * 1024,   # base64 characters per decode step (multiple of 4)
+    'read_chunk_size': 50000,   # CSV rows per chunk when counting / importing
+    'preview_rows': 10
+}
+
+# Status matrix (waffle chart); waves with more subjects are binned into aggregated rows
+WAFFLE_CONFIG = {
+    'max_rows': 200,        # subject rows per wave drawn individually
+    'bin_by': 'id_block',   # 'id_block' (consecutive IDs) or 'signature' (identical status rows)
+    'cell_size': 15         # target cell size in pixels
 }
 
 # Page Size Options
@@ -97,7 +148,7 @@ QUICK_FILTERS = {
     # 'incomplete': {'label': 'Show Incomplete QC', 'color': 'warning'},
     'notes': {'label': 'Show With Notes', 'color': 'info'},
     'week': {'label': 'Show This Week', 'color': 'secondary'},
-    'need_rerun': {'label': 'Need Re-run', 'color': 'danger'},
+    'need_rerun': {'label': 'Need Re-run', 'color': 'danger', 'tag': 'needs re-run'},
     # 'needs_review': {'label': 'Needs Review', 'color': 'warning'}
 }
 
@@ -66,9 +66,101 @@ SQL_SCHEMAS = {
             created_by TEXT,
             is_primary INTEGER DEFAULT 0
         )
+    """,
+
+    # Long-format QC metrics (used when DB_CONFIG['metric_storage'] == 'normalized')
+    'qc_metric_values': """
+        CREATE TABLE IF NOT EXISTS qc_metric_values (
+            ID TEXT NOT NULL,
+            wave TEXT NOT NULL,
+            metric_key TEXT NOT NULL REFERENCES column_config (column_key),
+            value,
+            PRIMARY KEY (ID, wave, metric_key)
+        )
+    """,
+
+    # Inverted tag index, kept in sync with qc_data.tags
+    'subject_tags': """
+        CREATE TABLE IF NOT EXISTS subject_tags (
+            ID TEXT NOT NULL,
+            wave TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (ID, wave, tag)
+        )
+    """,
+
+    # Results of utils/analysis_results_check.py, one row per rule pattern
+    'analysis_checks': """
+        CREATE TABLE IF NOT EXISTS analysis_checks (
+            subject TEXT NOT NULL,
+            session TEXT NOT NULL,
+            task TEXT NOT NULL,
+            pattern TEXT NOT NULL,
+            wave TEXT,
+            data_type TEXT,
+            expected_count INTEGER,
+            actual_count INTEGER,
+            tolerance INTEGER,
+            extra_files INTEGER,
+            status TEXT,
+            output_path TEXT,
+            dir_mtime REAL,
+            file_count INTEGER,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (subject, session, task, pattern)
+        )
+    """,
+
+    # Cached directory listings; a directory is re-listed only when its mtime changes
+    'analysis_dir_index': """
+        CREATE TABLE IF NOT EXISTS analysis_dir_index (
+            path TEXT PRIMARY KEY,
+            mtime REAL NOT NULL,
+            files TEXT,
+            subdirs TEXT
+        )
     """
 }
 
+# Secondary Index Definitions (created by migrations, see database/migrations.py)
+SQL_INDEXES = {
+    'idx_audit_log_subject_updated': """
+        CREATE INDEX IF NOT EXISTS idx_audit_log_subject_updated
+        ON audit_log (subject_id, updated_at)
+    """,
+
+    'idx_audit_log_updated': """
+        CREATE INDEX IF NOT EXISTS idx_audit_log_updated
+        ON audit_log (updated_at)
+    """,
+
+    'idx_qc_data_wave': """
+        CREATE INDEX IF NOT EXISTS idx_qc_data_wave
+        ON qc_data (wave)
+    """,
+
+    'idx_qc_metric_values_key': """
+        CREATE INDEX IF NOT EXISTS idx_qc_metric_values_key
+        ON qc_metric_values (metric_key, wave)
+    """,
+
+    'idx_subject_tags_tag': """
+        CREATE INDEX IF NOT EXISTS idx_subject_tags_tag
+        ON subject_tags (tag)
+    """,
+
+    'idx_analysis_checks_wave_task': """
+        CREATE INDEX IF NOT EXISTS idx_analysis_checks_wave_task
+        ON analysis_checks (wave, task)
+    """
+}
+
+# (ID, wave) index added to every dynamic table that has both columns
+SECONDARY_TABLE_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_{table_name}_id_wave
+    ON {table_name} (ID, wave)
+"""
+
 # Registry Initial Data
 REGISTRY_INITIAL_DATA = {
     'table_name': 'qc_data',
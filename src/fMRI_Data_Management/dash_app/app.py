@@ -1,7 +1,10 @@
 import dash
 import dash_bootstrap_components as dbc
 from dash_app.layouts.main_layout import create_main_layout
-from config.constants import COLORS
+from config.constants import (COLORS, RESULT_CACHE_CONFIG, FIGURE_CACHE_CONFIG,
+                              FILTER_MASK_CONFIG)
+from utils.result_cache import ResultCache, FigureCache, MaskCache
+from utils.progress import ProgressTracker
 
 def create_app(database):
     CUSTOM_CSS = f"""
@@ -110,6 +113,10 @@ def create_app(database):
     app.config.suppress_callback_exceptions = True
     
     app.db = database
+    app.result_cache = ResultCache(**RESULT_CACHE_CONFIG)
+    app.figure_cache = FigureCache(**FIGURE_CACHE_CONFIG)
+    app.filter_masks = MaskCache(**FILTER_MASK_CONFIG)
+    app.import_progress = ProgressTracker()
 
     app.layout = create_main_layout()
     
@@ -3,6 +3,8 @@ import dash_bootstrap_components as dbc
 from dash import html
 import json
 from datetime import datetime
+from utils.data_processing import diff_table_edits
+from dash_app.callbacks.table_patch import patch_table_row, request_table_refresh
 
 def register_data_callbacks(app, db):
     """Register data manipulation callbacks"""
@@ -12,51 +14,44 @@ def register_data_callbacks(app, db):
         Input('data-table', 'data_timestamp'),
         State('data-table', 'data'),
         State('data-table', 'data_previous'),
-        State('data-table', 'derived_virtual_data'),
+        State('data-table', 'derived_viewport_indices'),
         State('current-table', 'data'),
+        State('filtered-data', 'data'),
         prevent_initial_call=True
     )
-    def update_cell(timestamp, current_data, previous_data, derived_data, current_table):
-        """Handle cell edits in data table - FIXED for pagination"""
+    def update_cell(timestamp, current_data, previous_data, viewport_indices,
+                    current_table, filtered_data):
+        """Handle cell edits in data table (all cells changed on the visible page)"""
         if not timestamp or not current_data or not current_table:
-            return current_data
+            return dash.no_update
         
-        previous_data = previous_data or []
+        # Edits (typing or multi-cell paste) only touch the visible page
+        edits = diff_table_edits(current_data, previous_data, viewport_indices,
+                                 skip_columns=('tags', 'view_details'))
+        if not edits:
+            return dash.no_update
         
-        # Use derived_virtual_data if available (represents displayed data)
-        display_data = derived_data if derived_data else current_data
+        if current_table == 'qc_data':
+            db.update_fields(
+                [(row.get('ID'), row.get('wave', ''), key, value) for row, key, value in edits],
+                user='dash_user'
+            )
+        else:
+            # For secondary tables, use row_id if available (fallback to ID+wave)
+            db.update_secondary_table_cells(
+                current_table,
+                [(row.get('row_id'), row.get('ID'), row.get('wave', ''), key, value)
+                 for row, key, value in edits],
+                user='dash_user'
+            )
         
-        for i, curr_row in enumerate(current_data):
-            prev_row = previous_data[i] if i < len(previous_data) else None
-            if prev_row:
-                for key in curr_row:
-                    if key in ['tags', 'view_details']:
-                        continue
-                    
-                    prev_value = prev_row.get(key)
-                    
-                    if str(curr_row[key]) != str(prev_value):
-                        subject_id = curr_row.get('ID')
-                        wave = curr_row.get('wave', '')
-                        
-                        if current_table == 'qc_data':
-                            db.update_field(subject_id, wave, key, curr_row[key], user='dash_user')
-                        else:
-                            # For secondary tables, use row_id if available
-                            row_id = curr_row.get('row_id', None)
-                            if row_id:
-                                db.update_secondary_table_field_by_rowid(
-                                    current_table, row_id, key, curr_row[key], user='dash_user'
-                                )
-                            else:
-                                # Fallback to ID+wave
-                                db.update_secondary_table_field(
-                                    current_table, subject_id, wave, key, curr_row[key], user='dash_user'
-                                )
-                        
-                        return current_data
+        # Keep the cached filtered frame (exports) in step with the table
+        for row, key, value in edits:
+            patch_table_row(app.result_cache, filtered_data, row.get('ID'),
+                            row.get('wave', ''), {key: value}, row_id=row.get('row_id'))
         
-        return current_data
+        # The browser already shows the edited values
+        return dash.no_update
     
     
     @app.callback(
@@ -158,11 +153,7 @@ def register_data_callbacks(app, db):
                     className='bg-warning text-dark'
                 )
             
-            count = 0
-            for sid, wave in selected_subjects:
-                for tag in tags_to_add:
-                    db.add_tag(sid, wave, tag, user='dash_user')
-                count += 1
+            count = db.batch_add_tags(selected_subjects, tags_to_add, user='dash_user')
             
             message = f"Added {len(tags_to_add)} tag(s) to **{count}** subjects"
         
@@ -180,6 +171,7 @@ def register_data_callbacks(app, db):
         else:
             message = "Invalid operation"
         
+        request_table_refresh()
         return dbc.Toast(
             message,
             header="Batch Operation Complete",
@@ -225,11 +217,9 @@ def register_data_callbacks(app, db):
                 row = derived_data[idx]
                 subjects_to_delete.append((row['ID'], row['wave']))
         
-        deleted_count = 0
-        for sid, wave in subjects_to_delete:
-            db.delete_subject(sid, wave)
-            deleted_count += 1
+        deleted_count = db.delete_subjects(subjects_to_delete, user='dash_user')
         
+        request_table_refresh()
         return dbc.Toast(
             f"Successfully deleted **{deleted_count}** record(s).",
             header="Deletion Complete",
@@ -289,6 +279,7 @@ def register_data_callbacks(app, db):
         
         try:
             db.delete_table(table_name)
+            request_table_refresh()
             return dbc.Toast(
                 f"Successfully deleted table '{table_name}'",
                 header="Table Deleted",
@@ -2,7 +2,8 @@ from dash import callback, Output, Input, State, callback_context, dash, dash_ta
 import dash_bootstrap_components as dbc
 from dash import html
 import pandas as pd
-from utils.data_processing import parse_qc_metrics
+from utils.data_processing import parse_qc_metrics, resolve_active_row
+from config.constants import TABLE_CONFIG
 
 def register_detail_callbacks(app, db):
     """Register subject detail modal callbacks"""
@@ -50,15 +51,11 @@ def register_detail_callbacks(app, db):
             if active_cell.get('column_id') != 'view_details':
                 return False, "", "", "", None
             
-            row_index = active_cell['row']
-            page_current = page_current or 0
-            page_size = page_size or 25
-            global_row_index = page_current * page_size + row_index
-
-            if not derived_data or global_row_index >= len(derived_data):
+            clicked_row = resolve_active_row(active_cell, derived_data, page_current,
+                                             page_size, TABLE_CONFIG['server_side'])
+            if not clicked_row:
                 return False, "", "", "", None
 
-            clicked_row = derived_data[global_row_index]
             subject_id = clicked_row.get('ID')
             wave = clicked_row.get('wave', '')
             
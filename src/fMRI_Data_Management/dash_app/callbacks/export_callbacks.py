@@ -1,7 +1,8 @@
+import dash
 from dash import callback, Output, Input, State, dcc
 import pandas as pd
 from datetime import datetime
-from utils.data_processing import prepare_export_dataframe
+from utils.data_processing import prepare_export_dataframe, resolve_filtered_data
 
 def register_export_callbacks(app, db):
     """Register export-related callbacks"""
@@ -15,7 +16,8 @@ def register_export_callbacks(app, db):
     def export_all_data(n_clicks, data, current_table):
         """Export all data from current table"""
         if n_clicks and data:
-            df = pd.DataFrame(data)
+            # The store holds a cache key / query spec; resolve the rows here
+            df = resolve_filtered_data(db, data, app.result_cache)
             is_qc = (current_table == 'qc_data')
             df = prepare_export_dataframe(df, is_qc)
             
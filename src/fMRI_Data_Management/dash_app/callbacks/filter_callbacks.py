@@ -1,19 +1,95 @@
-from dash import callback, Output, Input, State, callback_context
+from dash import callback, Output, Input, State, callback_context, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from utils.data_processing import (
-    parse_qc_metrics,
-    get_all_unique_tags,
-    filter_dataframe_by_criteria,
-    apply_quick_filter
-)
+from utils.data_processing import parse_filter_query
+from utils.filter_spec import FilterSpec
+import math
 import pandas as pd
 import json
-from config.constants import DEFAULT_HIDDEN_COLUMNS
+from config.constants import DEFAULT_HIDDEN_COLUMNS, TABLE_CONFIG
+from utils.result_cache import filter_fingerprint
+
+SERVER_SIDE = TABLE_CONFIG['server_side']
+
+# DataTable interactions that only need a new page in server-side mode
+TABLE_STATE_INPUTS = {'data-table.page_current', 'data-table.sort_by',
+                      'data-table.filter_query', 'page-size-dropdown.value'}
 
 
 def register_filter_callbacks(app, db):
     """Register filter-related callbacks"""
     
+    def build_table_columns(all_columns, hidden_cols):
+        """Helper: Column definitions, selector options and data columns"""
+        col_options = [{'label': col, 'value': col} 
+                    for col in all_columns if col != 'view_details']
+        
+        if not hidden_cols:
+            hidden_cols = DEFAULT_HIDDEN_COLUMNS
+        
+        # Build visible columns list
+        visible_columns = [col for col in all_columns if col not in hidden_cols]
+        if 'view_details' in visible_columns:
+            visible_columns.remove('view_details')
+        visible_columns = ['view_details'] + visible_columns
+        
+        non_editable = TABLE_CONFIG['non_editable_columns']
+        
+        # Build column definitions
+        columns = [
+            {
+                'name': 'View' if col == 'view_details' else col,
+                'id': col,
+                'editable': col not in non_editable,
+                'presentation': 'markdown' if col == 'view_details' else None
+            }
+            for col in visible_columns
+        ]
+        
+        # Ensure ID and wave are in the data (even if hidden from view)
+        data_columns = visible_columns.copy()
+        if 'ID' not in data_columns:
+            data_columns.append('ID')
+        if 'wave' not in data_columns:
+            data_columns.append('wave')
+        
+        return columns, col_options, hidden_cols, data_columns
+    
+    def query_table_page(selected_table, filters, sort_by, page_current, page_size, hidden_cols):
+        """Helper: Server-side mode - fetch only the requested page via SQL"""
+        rows, total, all_columns = db.query_table(
+            selected_table, filters, sort_by, page_current, page_size
+        )
+        df = pd.DataFrame(rows, columns=all_columns)
+        if 'tags' in df.columns:
+            df['tags'] = df['tags'].apply(
+                lambda x: ', '.join(json.loads(x)) if x and x != 'null' else ''
+            )
+        df['view_details'] = '🔎'
+        
+        wave_options = [{'label': w, 'value': w}
+                        for w in db.get_distinct_values(selected_table, 'wave')]
+        tag_options = []
+        if selected_table == 'qc_data':
+            tag_options = [{'label': f"{t} ({n})", 'value': t}
+                           for t, n in db.get_tag_counts().items()]
+        
+        columns, col_options, hidden_cols, data_columns = build_table_columns(
+            df.columns.tolist(), hidden_cols
+        )
+        data_columns = [col for col in data_columns if col in df.columns]
+        data = df[data_columns].to_dict('records')
+        
+        # The store keeps the query, not the rows
+        query_spec = {'table': selected_table, 'filters': filters, 'sort_by': sort_by}
+        page_count = max(1, math.ceil(total / page_size))
+        filtered_store = {'query': query_spec, 'fingerprint': filter_fingerprint(query_spec),
+                          'total': total}
+        
+        return (columns, data, page_size, wave_options, tag_options,
+                filtered_store, col_options, hidden_cols,
+                selected_table, page_count, page_current, [])
+    
     @app.callback(
         [Output('data-table', 'columns'),
          Output('data-table', 'data'),
@@ -23,7 +99,10 @@ def register_filter_callbacks(app, db):
          Output('filtered-data', 'data'),
          Output('column-selector', 'options'),
          Output('column-selector', 'value'),
-         Output('current-table', 'data')],
+         Output('current-table', 'data'),
+         Output('data-table', 'page_count'),
+         Output('data-table', 'page_current'),
+         Output('data-table', 'selected_rows')],
         [Input('filter-id', 'value'),
          Input('filter-wave', 'value'),
          Input('filter-rescan', 'value'),
@@ -35,18 +114,33 @@ def register_filter_callbacks(app, db):
          Input('quick-need_rerun', 'n_clicks'),
          Input('column-selector', 'value'),
          Input('add-subject-modal', 'is_open'),
-         Input('toast-container', 'children'),
-         Input('table-selector', 'value')],
-        #  Input('data-table', 'page_size')],
-        State('data-table', 'page_size')
+         Input('data-refresh', 'data'),
+         Input('table-selector', 'value'),
+         Input('data-table', 'page_current'),
+         Input('data-table', 'sort_by'),
+         Input('data-table', 'filter_query'),
+         Input('page-size-dropdown', 'value')],
+        [State('data-table', 'page_size'),
+         State('filtered-data', 'data')]
     )
     def update_table(filter_id, filter_wave, filter_rescan, filter_tags, filter_notes,
                     q_rescan, q_notes, q_week, q_need_rerun,
-                    hidden_cols, modal_open, toast_children, selected_table, 
-                    current_page_size):
+                    hidden_cols, modal_open, refresh, selected_table, 
+                    page_current, sort_by, filter_query, dropdown_page_size,
+                    current_page_size, previous_filtered):
         """Update data table with filters and column visibility"""
         
+        ctx = callback_context
+        triggered = {t['prop_id'] for t in ctx.triggered} if ctx.triggered else set()
+        table_state_only = bool(triggered) and triggered <= TABLE_STATE_INPUTS
+        
+        # Native mode pages/sorts/filters in the browser
+        if not SERVER_SIDE and table_state_only:
+            raise PreventUpdate
+        
         page_size = current_page_size if current_page_size else 25
+        if SERVER_SIDE and 'page-size-dropdown.value' in triggered and dropdown_page_size:
+            page_size = dropdown_page_size
         
         if not selected_table:
             selected_table = 'qc_data'
@@ -58,9 +152,46 @@ def register_filter_callbacks(app, db):
         except Exception:
             selected_table = 'qc_data'
         
+        if SERVER_SIDE:
+            # Quick filters stick while paging/sorting; any other change clears them
+            quick_filter = None
+            button_ids = [t.split('.')[0] for t in triggered if t.startswith('quick-')]
+            if button_ids:
+                quick_filter = button_ids[0].replace('quick-', '')
+            elif table_state_only and isinstance(previous_filtered, dict):
+                quick_filter = previous_filtered['query']['filters'].get('quick_filter')
+            
+            if triggered != {'data-table.page_current'}:
+                page_current = 0
+            
+            filters = {
+                'filter_id': filter_id, 'filter_wave': filter_wave,
+                'filter_rescan': filter_rescan, 'filter_tags': filter_tags,
+                'filter_notes': filter_notes, 'quick_filter': quick_filter,
+                'conditions': parse_filter_query(filter_query)
+            }
+            return query_table_page(selected_table, filters, sort_by,
+                                    page_current or 0, page_size, hidden_cols)
+        
+        # Quick filters apply only on the click itself
+        quick_filter = None
+        if selected_table == 'qc_data' and ctx.triggered:
+            button_id = ctx.triggered[0]['prop_id'].split('.')[0]
+            if button_id.startswith('quick-'):
+                quick_filter = button_id.replace('quick-', '')
+        filters = {
+            'filter_id': filter_id, 'filter_wave': filter_wave,
+            'filter_rescan': filter_rescan, 'filter_tags': filter_tags,
+            'filter_notes': filter_notes, 'quick_filter': quick_filter
+        } if selected_table == 'qc_data' else {}
+        
         if selected_table == 'qc_data':
-            raw_data = db.get_all_data_raw()
-            df = parse_qc_metrics(raw_data)
+            # Masks of unchanged predicates are reused while the parsed
+            # frame is unchanged; tag predicates use the subject_tags index
+            df = FilterSpec.from_filters(filters).apply(
+                db.get_qc_dataframe(copy=False), masks=app.filter_masks,
+                tag_keys=lambda tag: db.get_subjects_with_tags([tag])
+            )
         else:
             raw_data = db.get_table_data(selected_table)
             df = pd.DataFrame(raw_data)
@@ -70,21 +201,8 @@ def register_filter_callbacks(app, db):
                 )
         
         if df.empty:
-            return [], [], page_size, [], [], [], [], [], selected_table
-        
-        # Apply filters for qc_data
-        if selected_table == 'qc_data':
-            ctx = callback_context
-            if ctx.triggered:
-                button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-                if button_id.startswith('quick-'):
-                    filter_type = button_id.replace('quick-', '')
-                    df = apply_quick_filter(df, filter_type)
-            
-            df = filter_dataframe_by_criteria(
-                df, filter_id, filter_wave, filter_rescan,
-                filter_tags, filter_notes
-            )
+            return ([], [], page_size, [], [], [], [], [], selected_table,
+                    no_update, no_update, no_update)
         
         # Get wave options
         wave_options = []
@@ -94,50 +212,29 @@ def register_filter_callbacks(app, db):
         # Get tag options
         tag_options = []
         if selected_table == 'qc_data':
-            all_tags = get_all_unique_tags(df)
-            tag_options = [{'label': t, 'value': t} for t in all_tags]
-        
-        df['view_details'] = '🔎'
-        
-        # Column selector options
-        all_columns = df.columns.tolist()
-        col_options = [{'label': col, 'value': col} 
-                    for col in all_columns if col != 'view_details']
-        
-        if not hidden_cols:
-            hidden_cols = DEFAULT_HIDDEN_COLUMNS
-        
-        # Build visible columns list
-        visible_columns = [col for col in all_columns if col not in hidden_cols]
-        if 'view_details' in visible_columns:
-            visible_columns.remove('view_details')
-        visible_columns = ['view_details'] + visible_columns
+            tag_options = [{'label': f"{t} ({n})", 'value': t}
+                           for t, n in db.get_tag_counts().items()]
         
-        from config.constants import TABLE_CONFIG
-        non_editable = TABLE_CONFIG['non_editable_columns']
+        # Keep the filtered frame on the server; the store only gets its key.
+        # The query spec lets an evicted entry be rebuilt in SQL.
+        query_spec = {'table': selected_table, 'sort_by': None, 'filters': filters}
+        filtered_store = {
+            'key': app.result_cache.put(df),
+            'fingerprint': filter_fingerprint(query_spec),
+            'query': query_spec,
+            'total': len(df)
+        }
         
-        # Build column definitions
-        columns = [
-            {
-                'name': 'View' if col == 'view_details' else col,
-                'id': col,
-                'editable': col not in non_editable,
-                'presentation': 'markdown' if col == 'view_details' else None
-            }
-            for col in visible_columns
-        ]
-        
-        # Ensure ID and wave are in the data (even if hidden from view)
-        data_columns = visible_columns.copy()
-        if 'ID' not in data_columns:
-            data_columns.append('ID')
-        if 'wave' not in data_columns:
-            data_columns.append('wave')
+        df = df.assign(view_details='🔎')
         
+        columns, col_options, hidden_cols, data_columns = build_table_columns(
+            df.columns.tolist(), hidden_cols
+        )
         data = df[data_columns].to_dict('records')
         
         return (columns, data, page_size, wave_options, tag_options,
-                df.to_dict('records'), col_options, hidden_cols, selected_table)
+                filtered_store, col_options, hidden_cols, selected_table,
+                no_update, no_update, no_update)
     
     
     @app.callback(
@@ -146,6 +243,7 @@ def register_filter_callbacks(app, db):
     )
     def update_table_selector_options(_):
         """Update table selector dropdown options"""
+        # get_all_tables only returns registered tables that actually exist
         tables = db.get_all_tables()
         
         valid_options = []
@@ -153,24 +251,10 @@ def register_filter_callbacks(app, db):
             if not t.get('display_name') or not t.get('table_name'):
                 continue
             
-            # Verify table exists
-            try:
-                import sqlite3
-                conn = sqlite3.connect(db.db_path)
-                cur = conn.cursor()
-                cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name=?",
-                    (t['table_name'],)
-                )
-                if cur.fetchone():
-                    valid_options.append({
-                        'label': t['display_name'],
-                        'value': t['table_name']
-                    })
-                cur.close()
-                conn.close()
-            except Exception:
-                continue
+            valid_options.append({
+                'label': t['display_name'],
+                'value': t['table_name']
+            })
         
         return valid_options
     
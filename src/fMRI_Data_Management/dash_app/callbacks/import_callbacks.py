@@ -1,20 +1,21 @@
 from dash import callback, Output, Input, State, html, dash
 import dash_bootstrap_components as dbc
-from utils.file_operations import decode_uploaded_file, prepare_temp_csv, cleanup_temp_file
+from utils.file_operations import (save_uploaded_file, read_csv_preview, cleanup_temp_file,
+                                   upload_token, resolve_upload, discard_upload)
+from config.constants import UPLOAD_CONFIG
 from utils.validators import validate_csv_structure, validate_table_name
-import pandas as pd
-import io
+from dash_app.callbacks.table_patch import request_table_refresh
 
 
 def register_import_callbacks(app, db):
     """Register import-related callbacks"""
 
-    def create_preview_table(df, extra_messages=None):
+    def create_preview_table(df, extra_messages=None, total_rows=None):
         """Helper function to create preview table"""
         from dash import dash_table
         
         preview = dash_table.DataTable(
-            data=df.head(10).to_dict('records'),
+            data=df.head(UPLOAD_CONFIG['preview_rows']).to_dict('records'),
             columns=[{"name": i, "id": i} for i in df.columns],
             style_table={'overflowX': 'auto', 'maxHeight': '400px', 'overflowY': 'auto'},
             style_cell={'textAlign': 'left', 'minWidth': '100px', 'fontSize': '12px'},
@@ -23,7 +24,8 @@ def register_import_callbacks(app, db):
         
         components = [
             dbc.Alert(
-                f"Found {len(df)} rows with {len(df.columns)} columns", 
+                f"Found {len(df) if total_rows is None else total_rows} rows "
+                f"with {len(df.columns)} columns", 
                 color="success", 
                 className='mb-2'
             )
@@ -33,27 +35,67 @@ def register_import_callbacks(app, db):
             components.extend(extra_messages)
         
         components.extend([
-            html.P("Preview (first 10 rows):", className='fw-bold mb-2'),
+            html.P(f"Preview (first {UPLOAD_CONFIG['preview_rows']} rows):",
+                   className='fw-bold mb-2'),
             preview
         ])
         
         return html.Div(components)
 
-    def handle_preview(contents, filename, additional_messages=None):
-        """Generic preview handler"""
+    def create_conflict_report(conflicts, max_rows=100):
+        """Helper function to show import conflicts (logged, not applied)"""
+        from dash import dash_table
+
+        if conflicts is None or conflicts.empty:
+            return None
+
+        n_subjects = conflicts['subject_id'].nunique()
+        return html.Div([
+            dbc.Alert(
+                f"{len(conflicts)} conflicting value(s) in {n_subjects} existing record(s) "
+                "were logged and not applied",
+                color="warning",
+                className='mb-2'
+            ),
+            dash_table.DataTable(
+                data=conflicts.head(max_rows).to_dict('records'),
+                columns=[{"name": i, "id": i}
+                         for i in ['subject_id', 'wave', 'field_name', 'old_value', 'new_value']],
+                page_size=10,
+                style_table={'overflowX': 'auto'},
+                style_cell={'textAlign': 'left', 'minWidth': '100px', 'fontSize': '12px'},
+                style_header={'backgroundColor': 'rgb(230, 230, 230)', 'fontWeight': 'bold'}
+            )
+        ])
+
+    def handle_preview(contents, filename, previous_upload=None, extra_messages_for=None):
+        """Generic preview handler
+
+        The upload is written to disk once and only its head is parsed; the
+        store keeps an opaque token for the file, never its path or the data.
+        """
+        if previous_upload:
+            discard_upload(previous_upload.get('token'))
+        
         if contents is None:
             return html.Div("No file selected", className='text-muted'), True, None
         
-        success, df, error = decode_uploaded_file(contents)
+        success, path, error = save_uploaded_file(contents, filename)
+        if success:
+            success, head, total_rows, error = read_csv_preview(path)
+            if not success:
+                cleanup_temp_file(path)
         if not success:
             return dbc.Alert(f"Error reading CSV: {error}", color="danger"), True, None
         
-        is_valid, error_msg = validate_csv_structure(df, ['ID'])
+        is_valid, error_msg = validate_csv_structure(head, ['ID'])
         if not is_valid:
+            cleanup_temp_file(path)
             return dbc.Alert(error_msg, color="danger"), True, None
         
-        preview_content = create_preview_table(df, additional_messages)
-        return preview_content, False, df.to_json(date_format='iso', orient='split')
+        additional_messages = extra_messages_for(head) if extra_messages_for else None
+        preview_content = create_preview_table(head, additional_messages, total_rows)
+        return preview_content, False, {'token': upload_token(path), 'filename': filename, 'rows': total_rows}
 
     @app.callback(
         [Output('import-preview', 'children'),
@@ -61,11 +103,12 @@ def register_import_callbacks(app, db):
          Output('uploaded-csv-data', 'data')],
         Input('upload-csv', 'contents'),
         State('upload-csv', 'filename'),
+        State('uploaded-csv-data', 'data'),
         prevent_initial_call=True
     )
-    def preview_qc_csv(contents, filename):
+    def preview_qc_csv(contents, filename, previous_upload):
         """Preview CSV before importing to QC data"""
-        return handle_preview(contents, filename)
+        return handle_preview(contents, filename, previous_upload)
 
     @app.callback(
         [Output('import-status', 'children'),
@@ -87,30 +130,33 @@ def register_import_callbacks(app, db):
         if not wave:
             return dbc.Alert("Wave is required", color="warning"), None
         
+        csv_path = resolve_upload(csv_data.get('token'))
+        if not csv_path:
+            return dbc.Alert("Uploaded file not found, please upload it again", color="warning"), None
+
         try:
-            df = pd.read_json(io.StringIO(csv_data), orient='split')
-            
-            if project:
-                df['projects'] = project
-            
-            temp_path = prepare_temp_csv(df)
-            
-            try:
-                count = db.import_from_csv(temp_path, wave=wave, user='dash_user')
-                
-                toast = dbc.Toast(
-                    f"Successfully imported {count} records to {wave}",
-                    header="Import Complete",
-                    is_open=True,
-                    duration=4000,
-                    className='bg-success text-white'
-                )
-                
-                return dbc.Alert(f"Successfully imported {count} records", color="success"), toast
+            # Stream the uploaded file from disk in chunks
+            count, conflicts = db.import_from_csv(
+                csv_path, wave=wave, user='dash_user', return_conflicts=True,
+                chunksize=UPLOAD_CONFIG['read_chunk_size'],
+                overrides={'projects': project} if project else None
+            )
                 
-            finally:
-                cleanup_temp_file(temp_path)
-            
+            toast = dbc.Toast(
+                f"Successfully imported {count} records to {wave}",
+                header="Import Complete",
+                is_open=True,
+                duration=4000,
+                className='bg-success text-white'
+            )
+
+            status = html.Div([
+                dbc.Alert(f"Successfully imported {count} records", color="success"),
+                create_conflict_report(conflicts)
+            ])
+            request_table_refresh()
+            return status, toast
+
         except Exception as e:
             return dbc.Alert(f"Import failed: {str(e)}", color="danger"), None
 
@@ -120,43 +166,35 @@ def register_import_callbacks(app, db):
          Output('uploaded-table-csv-data', 'data')],
         Input('upload-table-csv', 'contents'),
         State('upload-table-csv', 'filename'),
+        State('uploaded-table-csv-data', 'data'),
         prevent_initial_call=True
     )
-    def preview_table_csv(contents, filename):
+    def preview_table_csv(contents, filename, previous_upload):
         """Preview CSV before importing as new table"""
         from config.constants import TABLE_CONFIG
         
-        if contents is None:
-            return html.Div("No file selected", className='text-muted'), True, None
-        
-        success, df, error = decode_uploaded_file(contents)
-        if not success:
-            return dbc.Alert(f"Error reading CSV: {error}", color="danger"), True, None
-        
-        is_valid, error_msg = validate_csv_structure(df, ['ID'])
-        if not is_valid:
-            return dbc.Alert(error_msg, color="danger"), True, None
-        
-        extra_messages = []
-        
-        metadata_cols = [col for col in TABLE_CONFIG['metadata_columns'] if col in df.columns]
-        if metadata_cols:
-            extra_messages.append(
-                dbc.Alert(
-                    f"Columns {metadata_cols} will be overwritten with system-generated values",
-                    color="warning",
-                    className="mb-2"
+        def table_messages(head):
+            extra_messages = []
+            
+            metadata_cols = [col for col in TABLE_CONFIG['metadata_columns'] if col in head.columns]
+            if metadata_cols:
+                extra_messages.append(
+                    dbc.Alert(
+                        f"Columns {metadata_cols} will be overwritten with system-generated values",
+                        color="warning",
+                        className="mb-2"
+                    )
                 )
+            
+            extra_messages.append(
+                html.P([
+                    html.Strong("Note: "), 
+                    "A unique 'row_id' column will be automatically added to this table."
+                ], className="text-info small mb-2")
             )
+            return extra_messages
         
-        extra_messages.append(
-            html.P([
-                html.Strong("Note: "), 
-                "A unique 'row_id' column will be automatically added to this table."
-            ], className="text-info small mb-2")
-        )
-        
-        return handle_preview(contents, filename, extra_messages)
+        return handle_preview(contents, filename, previous_upload, table_messages)
 
     @app.callback(
         [Output('table-import-status', 'children'),
@@ -175,32 +213,38 @@ def register_import_callbacks(app, db):
                             description, wave, project, user):
         if not n_clicks:
             return dash.no_update, dash.no_update
+        job_id = f"table-import-{n_clicks}"
         
         if not csv_data or not table_name:
+            app.import_progress.finish(job_id)
             return dbc.Alert("Please fill in table name and upload CSV", color="warning"), None
         
         if not wave or not project:
+            app.import_progress.finish(job_id)
             return dbc.Alert("Wave and Project are required", color="warning"), None
         
         is_valid, error_msg = validate_table_name(table_name)
         if not is_valid:
+            app.import_progress.finish(job_id)
             return dbc.Alert(error_msg, color="danger"), None
+
+        csv_path = resolve_upload(csv_data.get('token'))
+        if not csv_path:
+            app.import_progress.finish(job_id)
+            return dbc.Alert("Uploaded file not found, please upload it again", color="warning"), None
         
         try:
-            df = pd.read_json(io.StringIO(csv_data), orient='split')
-            
-            if 'wave' not in df.columns:
-                df['wave'] = wave
-            if 'projects' not in df.columns:
-                df['projects'] = project
-            
-            result = db.create_table_from_dataframe(
+            result = db.create_table_from_csv(
                 table_name=table_name,
-                df=df,
+                csv_path=csv_path,
                 display_name=display_name or table_name.replace('_', ' ').title(),
                 description=description,
                 user=user or 'dash_user',
-                overwrite=True
+                overwrite=True,
+                defaults={'wave': wave, 'projects': project},
+                rows_total=csv_data.get('rows'),
+                progress_callback=lambda done, total: app.import_progress.update(
+                    job_id, done, total)
             )
             
             if result['success']:
@@ -211,9 +255,51 @@ def register_import_callbacks(app, db):
                     duration=4000,
                     className='bg-success text-white'
                 )
+                request_table_refresh()
                 return dbc.Alert(f"{result['message']}", color="success"), toast
             else:
                 return dbc.Alert(f"Import failed: {result['message']}", color="danger"), None
             
         except Exception as e:
-            return dbc.Alert(f"Import failed: {str(e)}", color="danger"), None
\ No newline at end of file
+            return dbc.Alert(f"Import failed: {str(e)}", color="danger"), None
+        
+        finally:
+            app.import_progress.finish(job_id)
+    
+    @app.callback(
+        [Output('table-import-progress-interval', 'disabled'),
+         Output('table-import-progress', 'style'),
+         Output('table-import-progress', 'value', allow_duplicate=True),
+         Output('table-import-progress', 'label', allow_duplicate=True)],
+        Input('confirm-table-import', 'n_clicks'),
+        prevent_initial_call=True
+    )
+    def start_table_import_progress(n_clicks):
+        """Show the progress bar and start polling while a table import runs"""
+        if not n_clicks:
+            return dash.no_update, dash.no_update, dash.no_update, dash.no_update
+        app.import_progress.discard(f"table-import-{n_clicks - 1}")
+        app.import_progress.start(f"table-import-{n_clicks}", message="Reading CSV")
+        return False, {'display': 'flex'}, 0, ""
+    
+    @app.callback(
+        [Output('table-import-progress', 'value'),
+         Output('table-import-progress', 'label'),
+         Output('table-import-progress-interval', 'disabled', allow_duplicate=True)],
+        Input('table-import-progress-interval', 'n_intervals'),
+        State('confirm-table-import', 'n_clicks'),
+        prevent_initial_call=True
+    )
+    def poll_table_import_progress(n_intervals, n_clicks):
+        """Report rows loaded so far; stop polling once the import finished"""
+        job_id = f"table-import-{n_clicks}"
+        job = app.import_progress.get(job_id)
+        if not job:
+            return 0, "", dash.no_update
+        if job['total']:
+            label = f"{job['done']:,} / {job['total']:,} rows"
+        else:
+            label = job['message']
+        if job['finished']:
+            return (100 if job['total'] else 0), label, True
+        return app.import_progress.percent(job_id), label, dash.no_update
@@ -32,13 +32,12 @@ def register_modal_callbacks(app, db):
     @app.callback(
         Output('import-modal', 'is_open'),
         [Input('import-csv-btn', 'n_clicks'),
-         Input('close-import', 'n_clicks'),
-         Input('confirm-import', 'n_clicks')],
+         Input('close-import', 'n_clicks')],
         [State('import-modal', 'is_open')]
     )
-    def toggle_import_modal(n_open, n_close, n_confirm, is_open):
-        """Toggle import CSV modal"""
-        if n_open or n_close or n_confirm:
+    def toggle_import_modal(n_open, n_close, is_open):
+        """Toggle import CSV modal (stays open after import to show conflicts)"""
+        if n_open or n_close:
             return not is_open
         return is_open
     
@@ -46,13 +45,12 @@ def register_modal_callbacks(app, db):
     @app.callback(
         Output('import-table-modal', 'is_open'),
         [Input('import-table-btn', 'n_clicks'),
-         Input('close-table-import', 'n_clicks'),
-         Input('confirm-table-import', 'n_clicks')],
+         Input('close-table-import', 'n_clicks')],
         [State('import-table-modal', 'is_open')]
     )
-    def toggle_import_table_modal(n_open, n_close, n_confirm, is_open):
-        """Toggle import table modal"""
-        if n_open or n_close or n_confirm:
+    def toggle_import_table_modal(n_open, n_close, is_open):
+        """Toggle import table modal (stays open after import to show progress)"""
+        if n_open or n_close:
             return not is_open
         return is_open
     
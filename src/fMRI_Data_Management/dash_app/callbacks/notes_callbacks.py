@@ -1,5 +1,8 @@
 from dash import callback, Output, Input, State, callback_context, dash
 import dash_bootstrap_components as dbc
+from utils.data_processing import resolve_active_row
+from config.constants import TABLE_CONFIG
+from dash_app.callbacks.table_patch import patch_table_row, request_table_refresh
 
 def register_notes_callbacks(app, db):
     """Register notes editor callbacks"""
@@ -7,7 +10,8 @@ def register_notes_callbacks(app, db):
     @app.callback(
         [Output('notes-editor-modal', 'is_open'),
          Output('notes-editor-textarea', 'value'),
-         Output('notes-edit-context', 'data')],
+         Output('notes-edit-context', 'data'),
+         Output('data-table', 'data', allow_duplicate=True)],
         [Input('data-table', 'active_cell'),
          Input('cancel-notes-edit', 'n_clicks'),
          Input('save-notes-edit', 'n_clicks')],
@@ -16,15 +20,16 @@ def register_notes_callbacks(app, db):
          State('data-table', 'derived_virtual_data'),
          State('data-table', 'page_current'),
          State('data-table', 'page_size'),
-         State('current-table', 'data')],
+         State('current-table', 'data'),
+         State('filtered-data', 'data')],
         prevent_initial_call=True
     )
     def manage_notes_editor(active_cell, cancel_clicks, save_clicks,
                            notes_value, context, derived_data,
-                           page_current, page_size, current_table):
+                           page_current, page_size, current_table, filtered_data):
         ctx = callback_context
         if not ctx.triggered:
-            return False, "", None
+            return False, "", None, dash.no_update
         
         trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
         
@@ -46,20 +51,27 @@ def register_notes_callbacks(app, db):
                         db.update_secondary_table_field_by_rowid(
                             current_table, row_id, 'notes', notes_value, user='dash_user'
                         )
-            return False, "", None
+                
+                # Patch the one edited cell instead of reloading the table
+                patch = patch_table_row(
+                    app.result_cache, filtered_data, context['subject_id'],
+                    context['wave'], {'notes': notes_value},
+                    row_id=None if current_table == 'qc_data' else context.get('row_id')
+                )
+                if patch is None:
+                    request_table_refresh()
+                    patch = dash.no_update
+                return False, "", None, patch
+            return False, "", None, dash.no_update
         
         # Open modal when clicking notes cell
         if trigger_id == 'data-table' and active_cell:
             if active_cell.get('column_id') == 'notes':
-                row_index = active_cell['row']
-                page_current = page_current or 0
-                page_size = page_size or 25
-                actual_index = page_current * page_size + row_index
-                
-                if not derived_data or actual_index >= len(derived_data):
-                    return False, "", None
+                row_data = resolve_active_row(active_cell, derived_data, page_current,
+                                              page_size, TABLE_CONFIG['server_side'])
+                if not row_data:
+                    return False, "", None, dash.no_update
                 
-                row_data = derived_data[actual_index]
                 subject_id = str(row_data.get('ID'))
                 wave = str(row_data.get('wave', ''))
                 current_notes = row_data.get('notes', '') or ''
@@ -70,6 +82,6 @@ def register_notes_callbacks(app, db):
                     'row_id': row_data.get('row_id')
                 }
                 
-                return True, current_notes, context
+                return True, current_notes, context, dash.no_update
         
-        return False, "", None
\ No newline at end of file
+        return False, "", None, dash.no_update
\ No newline at end of file
@@ -1,4 +1,5 @@
 from dash import callback, Output, Input
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from dash import html
 from utils.plots import (
@@ -6,34 +7,74 @@ from utils.plots import (
     create_stacked_bar_chart,
     create_waffle_chart,
     create_time_series_chart,
+    create_pipeline_completion_chart,
     get_summary_stats
 )
-from utils.data_processing import parse_qc_metrics
+from utils.data_processing import resolve_filtered_data
+from utils.progress_summary import summarize_progress
 from config.constants import COLORS
+from utils.result_cache import filter_fingerprint
+
+# Statistics are only computed while this tab is shown
+STATS_TAB = 'tab-stats'
+
+# Figure callbacks: (graph id, figure cache kind, builder taking a progress summary)
+SUMMARY_FIGURES = [
+    ('radar-chart', 'radar', create_radar_chart),
+    ('bar-chart', 'bar', create_stacked_bar_chart),
+    ('time-series-chart', 'time_series', create_time_series_chart)
+]
 
 def register_stats_callbacks(app, db):
     """Register statistics visualization callbacks"""
     
+    def stats_source(filtered_data, use_filter):
+        """Helper: (data generation, fingerprint, rows) for the full data or the filtered subset
+
+        rows is a callable returning the parsed frame; fingerprint is 'all'
+        unless the current QC filter applies.
+        """
+        generation = db.data_generation
+        query = (filtered_data.get('query') or {}) if isinstance(filtered_data, dict) else {}
+        if not use_filter or not query or query.get('table') != 'qc_data':
+            return generation, 'all', lambda: db.get_qc_dataframe(copy=False)
+        fingerprint = filtered_data.get('fingerprint') or filter_fingerprint(query)
+        return generation, fingerprint, lambda: resolve_filtered_data(
+            db, filtered_data, app.result_cache)
+    
+    def stats_summary(filtered_data, use_filter):
+        """Helper: (generation, fingerprint, progress summary) for the stats tab"""
+        generation, fingerprint, rows = stats_source(filtered_data, use_filter)
+        if fingerprint == 'all':
+            return generation, fingerprint, db.get_progress_summary()
+        
+        # Filtered subsets: summarized once per generation, shared by all figures
+        key = f"progress:{generation}:{fingerprint}"
+        summary = app.result_cache.get(key)
+        if summary is None:
+            summary = summarize_progress(rows())
+            app.result_cache.put(summary, key)
+        return generation, fingerprint, summary
+    
     @app.callback(
-        [Output('stats-cards', 'children'),
-         Output('radar-chart', 'figure'),
-         Output('bar-chart', 'figure'),
-         Output('waffle-chart', 'figure'),
-         Output('time-series-chart', 'figure')],
-        Input('filtered-data', 'data')
+        Output('stats-cards', 'children'),
+        [Input('main-tabs', 'active_tab'),
+         Input('filtered-data', 'data'),
+         Input('stats-use-filter', 'value')]
     )
-    def update_statistics(filtered_data):
-        """Update all statistics visualizations"""
-        # Always use QC data for statistics
-        qc_raw_data = db.get_all_data_raw()
-        if not qc_raw_data:
-            return [], {}, {}, {}, {}
+    def update_stats_cards(active_tab, filtered_data, use_filter):
+        """Summary cards (only while the statistics tab is shown)"""
+        if active_tab != STATS_TAB:
+            raise PreventUpdate
         
-        df = parse_qc_metrics(qc_raw_data)
-        stats = get_summary_stats(df)
+        _, _, summary = stats_summary(filtered_data, use_filter)
+        if summary['subjects'].empty:
+            return []
+        
+        stats = get_summary_stats(summary)
         
         # Create summary cards
-        cards = [
+        return [
             dbc.Col([
                 dbc.Card([
                     dbc.CardBody([
@@ -61,13 +102,79 @@ def register_stats_callbacks(app, db):
                 ], style={"backgroundColor": COLORS['card'][2], "color": "white"})
             ], md=4)
         ]
-        
-        return (
-            cards,
-            create_radar_chart(df),
-            create_stacked_bar_chart(df),
-            create_waffle_chart(df),
-            create_time_series_chart(df)
+    
+    def register_summary_figure(graph_id, kind, build):
+        """Helper: One lazily computed, cached figure rendered from the progress summary"""
+        @app.callback(
+            Output(graph_id, 'figure'),
+            [Input('main-tabs', 'active_tab'),
+             Input('filtered-data', 'data'),
+             Input('stats-use-filter', 'value')]
         )
-
-
+        def update_summary_figure(active_tab, filtered_data, use_filter):
+            if active_tab != STATS_TAB:
+                raise PreventUpdate
+            generation, fingerprint, summary = stats_summary(filtered_data, use_filter)
+            if summary['subjects'].empty:
+                return {}
+            return app.figure_cache.get_figure(kind, generation, fingerprint,
+                                               lambda: build(summary))
+    
+    for graph_id, kind, build in SUMMARY_FIGURES:
+        register_summary_figure(graph_id, kind, build)
+    
+    @app.callback(
+        Output('pipeline-completion-chart', 'figure'),
+        [Input('main-tabs', 'active_tab'),
+         Input('filtered-data', 'data')]
+    )
+    def update_pipeline_completion(active_tab, filtered_data):
+        """Analysis output checks (analysis_checks) summarized per task and wave"""
+        if active_tab != STATS_TAB:
+            raise PreventUpdate
+        
+        # Not cached: the analysis checker usually writes from another process
+        completion = db.get_pipeline_completion()
+        if completion.empty:
+            return {}
+        return create_pipeline_completion_chart(completion)
+    
+    @app.callback(
+        [Output('waffle-chart', 'figure'),
+         Output('waffle-wave', 'options'),
+         Output('waffle-project', 'options')],
+        [Input('main-tabs', 'active_tab'),
+         Input('filtered-data', 'data'),
+         Input('stats-use-filter', 'value'),
+         Input('waffle-wave', 'value'),
+         Input('waffle-project', 'value'),
+         Input('waffle-bin-by', 'value')]
+    )
+    def update_waffle_chart(active_tab, filtered_data, use_filter, wave, project, bin_by):
+        """Status matrix, drilled down to one wave and/or project"""
+        if active_tab != STATS_TAB:
+            raise PreventUpdate
+        
+        generation, fingerprint, summary = stats_summary(filtered_data, use_filter)
+        keys = summary['subjects'].index
+        if keys.empty:
+            return {}, [], []
+        
+        wave_options = [{'label': w, 'value': w}
+                        for w in sorted(keys.get_level_values('wave').unique())]
+        project_options = [{'label': p, 'value': p}
+                           for p in sorted(keys.get_level_values('project').unique()) if p]
+        
+        def build():
+            _, _, rows = stats_source(filtered_data, use_filter)
+            df = rows()
+            if wave:
+                df = df[df['wave'] == wave]
+            if project and 'projects' in df.columns:
+                df = df[df['projects'].astype(str) == project]
+            return create_waffle_chart(df, bin_by=bin_by)
+        
+        fingerprint = filter_fingerprint({'rows': fingerprint, 'wave': wave,
+                                          'project': project, 'bin_by': bin_by})
+        figure = app.figure_cache.get_figure('waffle', generation, fingerprint, build)
+        return figure, wave_options, project_options
@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from dash import Patch, set_props
+from config.constants import TABLE_CONFIG
+
+
+def request_table_refresh():
+    """Ask update_table to reload data-table (after structural changes)"""
+    set_props('data-refresh', {'data': time.time()})
+
+
+def patch_table_row(cache, filtered_data, subject_id, wave, changes, row_id=None):
+    """Apply cell changes to the cached filtered frame; return a data-table Patch
+
+    Native mode only: data-table.data has the same row order as the cached
+    frame behind the filtered-data key, so the row position is found on the
+    server without sending the table back. Returns None when the row cannot
+    be located (server-side mode, evicted cache entry); callers should then
+    fall back to request_table_refresh().
+    """
+    if TABLE_CONFIG['server_side'] or not isinstance(filtered_data, dict):
+        return None
+    frame = cache.get(filtered_data.get('key'))
+    if frame is None or frame.empty:
+        return None
+
+    if row_id is not None and 'row_id' in frame.columns:
+        mask = (frame['row_id'] == row_id).to_numpy()
+    else:
+        mask = ((frame['ID'].astype(str) == str(subject_id))
+                & (frame['wave'].astype(str) == str(wave))).to_numpy()
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return None
+
+    patch = Patch()
+    for column, value in changes.items():
+        if column in frame.columns:
+            if isinstance(value, str) and frame[column].dtype != object:
+                frame[column] = frame[column].astype(object)
+            frame.iloc[positions, frame.columns.get_loc(column)] = value
+        for position in positions:
+            patch[int(position)][column] = value
+    return patch
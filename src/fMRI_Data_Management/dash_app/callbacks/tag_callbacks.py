@@ -2,7 +2,9 @@ from dash import callback, Output, Input, State, callback_context, ALL, dash
 import dash_bootstrap_components as dbc
 from dash import html
 import json
-from utils.data_processing import parse_qc_metrics
+from utils.data_processing import resolve_active_row
+from config.constants import TABLE_CONFIG
+from dash_app.callbacks.table_patch import patch_table_row, request_table_refresh
 
 # row index/id could be tricky
 
@@ -25,16 +27,13 @@ def register_tag_callbacks(app, db):
         State('data-table', 'derived_virtual_data'),
         State('data-table', 'page_current'),
         State('data-table', 'page_size'),
-        State('data-table', 'data'),
+        State('filtered-data', 'data'),
         State('current-table', 'data')],
         prevent_initial_call=True
     )
     def manage_tag_editor(active_cell, close_clicks, add_clicks, delete_clicks,
                         context, selected_tag, custom_tag, derived_data, 
-                        page_current, page_size, current_data, current_table):
-        from utils.data_processing import parse_qc_metrics
-        import pandas as pd
-        
+                        page_current, page_size, filtered_data, current_table):
         ctx = callback_context
         if not ctx.triggered:
             return False, "", None, None, dash.no_update
@@ -46,16 +45,11 @@ def register_tag_callbacks(app, db):
 
         if trigger_id == 'data-table' and active_cell:
             if active_cell.get('column_id') == 'tags':
-                row_index = active_cell['row']
-                page_current = page_current or 0
-                page_size = page_size or 25
-                
-                actual_index = page_current * page_size + row_index
-                
-                if not derived_data or actual_index >= len(derived_data):
+                row_data = resolve_active_row(active_cell, derived_data, page_current,
+                                              page_size, TABLE_CONFIG['server_side'])
+                if not row_data:
                     return False, "", None, None, dash.no_update
                 
-                row_data = derived_data[actual_index]
                 subject_id = str(row_data.get('ID'))
                 wave = str(row_data.get('wave', ''))
                 
@@ -64,27 +58,16 @@ def register_tag_callbacks(app, db):
                 tags_display = create_tags_display(tags_list)
                 return True, tags_display, context, None, dash.no_update
 
-        def refresh_table():
-            if current_table == 'qc_data':
-                raw_data = db.get_all_data_raw()
-                df = parse_qc_metrics(raw_data)
-            else:
-                raw_data = db.get_table_data(current_table)
-                df = pd.DataFrame(raw_data)
-                if 'tags' in df.columns:
-                    df['tags'] = df['tags'].apply(
-                        lambda x: ', '.join(json.loads(x)) if x and x != 'null' else ''
-                    )
-            
-            df['view_details'] = '🔍'
-            
-            # Keep same columns as current display
-            if current_data and len(current_data) > 0:
-                existing_cols = list(current_data[0].keys())
-                available_cols = [col for col in existing_cols if col in df.columns]
-                return df[available_cols].to_dict('records')
-            
-            return df.to_dict('records')
+        def patch_tags(tags_list):
+            """Send only the edited tags cell (full reload if it can't be patched)"""
+            patch = patch_table_row(
+                app.result_cache, filtered_data, context['subject_id'], context['wave'],
+                {'tags': ', '.join(tags_list)}
+            )
+            if patch is None:
+                request_table_refresh()
+                return dash.no_update
+            return patch
 
         if trigger_id == 'add-tag-btn' and context:
             tag_to_add = custom_tag or selected_tag
@@ -92,7 +75,7 @@ def register_tag_callbacks(app, db):
                 db.add_tag(context['subject_id'], context['wave'], tag_to_add, user='dash_user')
                 tags_list = db.get_subject_tags(context['subject_id'], context['wave'])
                 
-                refreshed_data = refresh_table()
+                refreshed_data = patch_tags(tags_list)
                 tags_display = create_tags_display(tags_list)
                 toast = dbc.Toast(
                     f"Added '{tag_to_add}' to ID {context['subject_id']} ({context['wave']})",
@@ -108,7 +91,7 @@ def register_tag_callbacks(app, db):
             db.remove_tag(context['subject_id'], context['wave'], tag_to_delete, user='dash_user')
             tags_list = db.get_subject_tags(context['subject_id'], context['wave'])
             
-            refreshed_data = refresh_table()
+            refreshed_data = patch_tags(tags_list)
             tags_display = create_tags_display(tags_list)
             toast = dbc.Toast(
                 f"Removed '{tag_to_delete}' from ID {context['subject_id']} ({context['wave']})",
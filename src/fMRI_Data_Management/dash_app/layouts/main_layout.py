@@ -12,7 +12,8 @@ from dash_app.layouts.components import (
     create_page_size_selector,
     create_quick_filter_buttons
 )
-from config.constants import COLORS, PREDEFINED_TAGS, BATCH_OPERATIONS, PAGE_SIZE_OPTIONS
+from config.constants import (COLORS, PREDEFINED_TAGS, BATCH_OPERATIONS, PAGE_SIZE_OPTIONS,
+                              TABLE_CONFIG, WAFFLE_CONFIG)
 
 def create_main_layout():
     return dbc.Container([
@@ -39,9 +40,9 @@ def create_main_layout():
                         create_operation_cards(),
                         create_table_selector(),
                         create_table_section()
-                    ], label="Data Management"),
-                    dbc.Tab([create_stats_section()], label="Statistics"),
-                ])
+                    ], label="Data Management", tab_id='tab-data'),
+                    dbc.Tab([create_stats_section()], label="Statistics", tab_id='tab-stats'),
+                ], id='main-tabs', active_tab='tab-data')
             ], width=9)
         ]),
         
@@ -55,6 +56,7 @@ def create_main_layout():
         
         # Data stores
         dcc.Store(id='filtered-data'),
+        dcc.Store(id='data-refresh', data=0),
         dcc.Store(id='uploaded-csv-data'),
         dcc.Store(id='uploaded-table-csv-data'),
         dcc.Store(id='tag-edit-context'),
@@ -111,7 +113,8 @@ def create_filter_section():
             dbc.Row([
                 dbc.Col([
                     dbc.Label("Search ID"),
-                    dbc.Input(id='filter-id', type='text', placeholder='e.g., 0011')
+                    dbc.Input(id='filter-id', type='text', placeholder='e.g., 0011',
+                              debounce=TABLE_CONFIG['filter_debounce'])
                 ], width=12),
                 dbc.Col([
                     dbc.Label("Wave"),
@@ -135,7 +138,8 @@ def create_filter_section():
                 ], width=12),
                 dbc.Col([
                     dbc.Label("Notes contain"),
-                    dbc.Input(id='filter-notes', type='text', placeholder='Search notes')
+                    dbc.Input(id='filter-notes', type='text', placeholder='Search notes',
+                              debounce=TABLE_CONFIG['filter_debounce'])
                 ], width=12),
             ], className="g-2"),
             html.Hr(),
@@ -281,11 +285,14 @@ def create_table_section():
                 columns=[],
                 data=[],
                 editable=True,
-                filter_action='native',
-                sort_action='native',
+                filter_action='custom' if TABLE_CONFIG['server_side'] else 'native',
+                filter_query='',
+                sort_action='custom' if TABLE_CONFIG['server_side'] else 'native',
+                sort_mode='single',
+                sort_by=[],
                 row_selectable='multi',
                 selected_rows=[],
-                page_action='native',
+                page_action='custom' if TABLE_CONFIG['server_side'] else 'native',
                 page_current=0,
                 page_size=25,
                 style_table={'overflowX': 'auto'},
@@ -307,6 +314,12 @@ def create_stats_section():
         dbc.CardBody([
             html.H5("Statistics Overview", className="mb-3"),
             # html.P("Statistics based on Main data only", className="text-muted small"),
+            dbc.Switch(
+                id='stats-use-filter',
+                label="Only subjects matching the current filters",
+                value=False,
+                className='mb-3'
+            ),
             dbc.Row(id='stats-cards', className='mb-3'),
             dbc.Row([
                 dbc.Col([dcc.Graph(id='radar-chart')], md=12)
@@ -317,9 +330,35 @@ def create_stats_section():
             dbc.Row([
                 dbc.Col([dcc.Graph(id='time-series-chart')], md=12)
             ], className='mt-3'),
+            dbc.Row([
+                dbc.Col([dcc.Graph(id='pipeline-completion-chart')], md=12)
+            ], className='mt-3'),
+            dbc.Row([
+                dbc.Col([
+                    dbc.Label("Wave"),
+                    dcc.Dropdown(id='waffle-wave', placeholder='All waves', clearable=True)
+                ], md=3),
+                dbc.Col([
+                    dbc.Label("Project"),
+                    dcc.Dropdown(id='waffle-project', placeholder='All projects', clearable=True)
+                ], md=3),
+                dbc.Col([
+                    dbc.Label("Group large cohorts by"),
+                    dcc.RadioItems(
+                        id='waffle-bin-by',
+                        options=[
+                            {'label': ' ID block', 'value': 'id_block'},
+                            {'label': ' Status pattern', 'value': 'signature'}
+                        ],
+                        value=WAFFLE_CONFIG['bin_by'],
+                        inline=True,
+                        inputStyle={'marginLeft': '10px'}
+                    )
+                ], md=6)
+            ], className='mt-3'),
             dbc.Row([
                 dbc.Col([dcc.Graph(id='waffle-chart')], md=12)
-            ], className='mt-3')
+            ], className='mt-2')
         ])
     ], className='mb-3')
 
@@ -169,7 +169,10 @@ def create_import_table_modal():
             
             html.Hr(),
             html.Div(id='table-import-preview'),
-            html.Div(id='table-import-status')
+            html.Div(id='table-import-status'),
+            dbc.Progress(id='table-import-progress', value=0, striped=True, animated=True,
+                         className='mt-2', style={'display': 'none'}),
+            dcc.Interval(id='table-import-progress-interval', interval=500, disabled=True)
         ]),
         
         dbc.ModalFooter([
@@ -2,11 +2,14 @@ from database.base import DatabaseBase
 from database.qc_operations import QCOperations
 from database.table_operations import TableOperations
 from database.audit_operations import AuditOperations
+from database.query_operations import QueryOperations
+from database.analysis_operations import AnalysisOperations
 from config.constants import DEFAULT_NOTE_TEMPLATES
 
-class FMRIQCDatabase(QCOperations, TableOperations, AuditOperations):
-    def __init__(self, db_path: str = "fmri_qc.db"):
-        super().__init__(db_path)
+class FMRIQCDatabase(QCOperations, TableOperations, AuditOperations, QueryOperations,
+                     AnalysisOperations):
+    def __init__(self, db_path: str = "fmri_qc.db", metric_storage: str = None):
+        super().__init__(db_path, metric_storage)
         
         # Clean up orphaned registry entries on startup
         try:
@@ -27,7 +30,9 @@ __all__ = [
     'DatabaseBase',
     'QCOperations',
     'TableOperations',
-    'AuditOperations'
+    'AuditOperations',
+    'QueryOperations',
+    'AnalysisOperations'
 ]
 
 
@@ -0,0 +1,144 @@
+import json
+import pandas as pd
+from typing import Any, List, Dict, Tuple, Iterable
+from database.base import DatabaseBase
+
+# analysis_checks columns written from a check results frame
+ANALYSIS_CHECK_COLUMNS = ['subject', 'session', 'task', 'pattern', 'wave', 'data_type',
+                          'expected_count', 'actual_count', 'tolerance', 'extra_files',
+                          'status', 'output_path', 'dir_mtime', 'file_count']
+
+
+
+def _same_value(stored: Any, value: Any) -> bool:
+    """Compare a stored metric with a new one ("1", 1 and 1.0 are the same)"""
+    try:
+        return float(stored) == float(value)
+    except (TypeError, ValueError):
+        return stored == value
+
+
+class AnalysisOperations(DatabaseBase):
+    """Stored analysis output checks and the cached directory index behind them"""
+
+    def get_subject_waves(self) -> List[Tuple[str, str]]:
+        """Get every (ID, wave) tracked in qc_data"""
+        with self.read_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT ID, wave FROM qc_data ORDER BY ID, wave")
+            return [tuple(row) for row in cur.fetchall()]
+
+    def load_dir_index(self) -> Dict[str, Tuple[float, List[str], List[str]]]:
+        """Get cached directory listings as {path: (mtime, files, subdirs)}"""
+        with self.read_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT path, mtime, files, subdirs FROM analysis_dir_index")
+            return {row[0]: (row[1], json.loads(row[2]), json.loads(row[3]))
+                    for row in cur.fetchall()}
+
+    def save_dir_index(self, listings: Dict[str, Tuple[float, List[str], List[str]]],
+                       removed: Iterable[str] = ()):
+        """Upsert changed directory listings and drop directories that disappeared"""
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            cur.executemany("""
+                INSERT OR REPLACE INTO analysis_dir_index (path, mtime, files, subdirs)
+                VALUES (?, ?, ?, ?)
+            """, [(path, mtime, json.dumps(files), json.dumps(subdirs))
+                  for path, (mtime, files, subdirs) in listings.items()])
+            cur.executemany("DELETE FROM analysis_dir_index WHERE path = ?",
+                            [(path,) for path in removed])
+
+    def save_analysis_checks(self, results: pd.DataFrame) -> int:
+        """Upsert check results keyed by (subject, session, task, pattern)
+
+        Rows whose stored values are identical are left untouched, so
+        checked_at records when a result last changed. Returns rows written.
+        """
+        if results.empty:
+            return 0
+        frame = results.reindex(columns=ANALYSIS_CHECK_COLUMNS).astype(object)
+        frame = frame.where(frame.notna(), None)
+        key = ['subject', 'session', 'task', 'pattern']
+        values = [c for c in ANALYSIS_CHECK_COLUMNS if c not in key]
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            before = self.conn.total_changes
+            cur.executemany(f"""
+                INSERT INTO analysis_checks ({', '.join(ANALYSIS_CHECK_COLUMNS)})
+                VALUES ({', '.join(['?'] * len(ANALYSIS_CHECK_COLUMNS))})
+                ON CONFLICT ({', '.join(key)}) DO UPDATE SET
+                    {', '.join(f"{c} = excluded.{c}" for c in values)},
+                    checked_at = CURRENT_TIMESTAMP
+                WHERE ({', '.join(values)}) IS NOT
+                      ({', '.join(f"excluded.{c}" for c in values)})
+            """, frame.itertuples(index=False, name=None))
+            return self.conn.total_changes - before
+
+    def set_check_metrics(self, values: Dict[Tuple[str, str], Dict[str, Any]],
+                          user: str = "analysis_check") -> int:
+        """Write check-derived metrics ({(ID, wave): {metric: value}}) to qc_data
+
+        Only values that differ from the stored ones are written, grouped per
+        (metric, value) into batch_set_field calls in one transaction.
+        Returns the number of metric values changed.
+        """
+        if not values:
+            return 0
+
+        groups = {}
+        with self.transaction() as cur:
+            records = self._load_batch_records(list(values))
+            if self.metric_storage == 'normalized':
+                cur.execute("""
+                    SELECT m.ID, m.wave, m.metric_key, m.value FROM qc_metric_values m
+                    JOIN batch_keys k ON m.ID = k.ID AND m.wave = k.wave
+                """)
+                stored = {}
+                for subject_id, wave, metric, value in cur.fetchall():
+                    stored.setdefault((subject_id, wave), {})[metric] = value
+            else:
+                stored = {key: json.loads(record['qc_metrics'] or '{}')
+                          for key, record in records.items()}
+
+            for key, metrics in values.items():
+                if key not in records:
+                    continue
+                for metric, value in metrics.items():
+                    if not _same_value(stored.get(key, {}).get(metric), value):
+                        groups.setdefault((metric, value), []).append(key)
+
+            for (metric, value), pairs in groups.items():
+                self.batch_set_field(pairs, metric, value, user)
+        return sum(len(pairs) for pairs in groups.values())
+
+    def get_analysis_checks(self, subject: str = None, wave: str = None) -> pd.DataFrame:
+        """Get stored check results (optionally for one subject and/or wave)"""
+        clauses, params = [], []
+        if subject is not None:
+            clauses.append("subject = ?")
+            params.append(subject)
+        if wave is not None:
+            clauses.append("wave = ?")
+            params.append(wave)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.read_connection() as conn:
+            return pd.read_sql(
+                f"SELECT * FROM analysis_checks {where} ORDER BY subject, session, task, pattern",
+                conn, params=params
+            )
+
+    def get_pipeline_completion(self) -> pd.DataFrame:
+        """Per wave and task: subjects checked and subjects whose checks all pass"""
+        with self.read_connection() as conn:
+            return pd.read_sql("""
+                SELECT wave, task, COUNT(*) AS subjects,
+                       SUM(all_pass) AS complete
+                FROM (
+                    SELECT wave, task, subject, MIN(status = 'PASS') AS all_pass
+                    FROM analysis_checks
+                    GROUP BY wave, task, subject
+                )
+                GROUP BY wave, task
+                ORDER BY wave, task
+            """, conn)
@@ -6,18 +6,16 @@ class AuditOperations(DatabaseBase):
     
     def add_note_template(self, name: str, content: str, category: str = "general"):
         """Add note template"""
-        self.cursor.execute("""
-            INSERT OR IGNORE INTO note_templates (template_name, template_content, category)
-            VALUES (?, ?, ?)
-        """, (name, content, category))
-        self.conn.commit()
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            cur.execute("""
+                INSERT OR IGNORE INTO note_templates (template_name, template_content, category)
+                VALUES (?, ?, ?)
+            """, (name, content, category))
     
     def get_note_templates(self) -> List[Dict]:
         """Get all note templates"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             cur.execute("SELECT * FROM note_templates ORDER BY category, template_name")
             return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
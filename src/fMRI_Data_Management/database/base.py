@@ -1,48 +1,198 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import Optional
 from config.constants import DB_CONFIG
 from config.database_schema import SQL_SCHEMAS, REGISTRY_INITIAL_DATA
+from database.connection_pool import ConnectionPool, configure_connection
+from database.migrations import run_migrations
+
+METRIC_STORAGE_MODES = ('json', 'normalized')
+
+# Dirty-key marker meaning "every qc_data row may have changed"
+ALL_ROWS = object()
 
 class DatabaseBase:
-    """Base database connection and initialization"""
-    
-    def __init__(self, db_path: str = None):
+    """Base database connection and initialization (pooled reads, serialized writes)"""
+
+    def __init__(self, db_path: str = None, metric_storage: str = None):
         self.db_path = db_path or DB_CONFIG['default_path']
+        self.metric_storage = metric_storage or DB_CONFIG['metric_storage']
+        if self.metric_storage not in METRIC_STORAGE_MODES:
+            raise ValueError(f"Unknown metric storage mode: {self.metric_storage}")
         self.conn = sqlite3.connect(
-            self.db_path, 
+            self.db_path,
+            timeout=DB_CONFIG['timeout'],
             check_same_thread=DB_CONFIG['check_same_thread']
         )
-        self.conn.row_factory = sqlite3.Row
+        configure_connection(self.conn, DB_CONFIG['pragmas'])
         self.cursor = self.conn.cursor()
+
+        self._write_lock = threading.RLock()
+        self._transaction_depth = 0
+        self._scratch_changes = 0   # temp-table rows written by the open transaction
+
+        # Write generation + qc_data keys changed since the parsed-frame cache
+        # was last refreshed (see QCOperations.get_qc_dataframe)
+        self._generation = 0
+        self._pending_dirty = None
+        self._dirty_keys = set()
+        self._frame_lock = threading.Lock()
+        self._frame_cache = None    # (generation, parsed qc_data frame)
+        self._progress_cache = None # (generation, progress summary of that frame)
+        self._metric_keys_cache = None  # (generation, metric keys in use)
+        self._count_lock = threading.Lock()
+        self._count_cache = {}  # (generation, table, where, params) -> row count
+        self.pool = ConnectionPool(
+            self.db_path,
+            size=DB_CONFIG['pool_size'],
+            timeout=DB_CONFIG['timeout'],
+            pragmas=DB_CONFIG['pragmas']
+        )
+
         self._initialize_database()
-    
+
     def _initialize_database(self):
-        """Create all database tables"""
-        # Create tables
-        for table_name, schema_sql in SQL_SCHEMAS.items():
-            self.cursor.execute(schema_sql)
-        
-        # Register qc_data as primary table
-        self.cursor.execute("""
-            INSERT OR IGNORE INTO table_registry 
-            (table_name, display_name, primary_keys, is_primary, created_by)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            REGISTRY_INITIAL_DATA['table_name'],
-            REGISTRY_INITIAL_DATA['display_name'],
-            REGISTRY_INITIAL_DATA['primary_keys'],
-            REGISTRY_INITIAL_DATA['is_primary'],
-            REGISTRY_INITIAL_DATA['created_by']
-        ))
-        
-        self.conn.commit()
-    
+        """Create all database tables and apply pending migrations"""
+        with self.transaction() as cur:
+            # Create tables
+            for table_name, schema_sql in SQL_SCHEMAS.items():
+                cur.execute(schema_sql)
+
+            # Register qc_data as primary table
+            cur.execute("""
+                INSERT OR IGNORE INTO table_registry
+                (table_name, display_name, primary_keys, is_primary, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                REGISTRY_INITIAL_DATA['table_name'],
+                REGISTRY_INITIAL_DATA['display_name'],
+                REGISTRY_INITIAL_DATA['primary_keys'],
+                REGISTRY_INITIAL_DATA['is_primary'],
+                REGISTRY_INITIAL_DATA['created_by']
+            ))
+
+        # Bring indexes and later schema changes up to date
+        with self._write_lock:
+            run_migrations(self.conn)
+
+        self._sync_metric_storage()
+
+    def _sync_metric_storage(self):
+        """Move QC metrics into the active storage (JSON blob or qc_metric_values)"""
+        with self.transaction() as cur:
+            if self.metric_storage == 'normalized':
+                cur.execute("""
+                    INSERT OR REPLACE INTO qc_metric_values (ID, wave, metric_key, value)
+                    SELECT q.ID, q.wave, j.key, j.value
+                    FROM qc_data q, json_each(q.qc_metrics) j
+                    WHERE json_valid(q.qc_metrics) AND j.value IS NOT NULL
+                """)
+                if cur.rowcount > 0:
+                    print(f"[INFO] Moved {cur.rowcount} QC metric values to qc_metric_values")
+                cur.execute("""
+                    INSERT OR IGNORE INTO column_config (column_key, display_name)
+                    SELECT DISTINCT metric_key, metric_key FROM qc_metric_values
+                """)
+                cur.execute("UPDATE qc_data SET qc_metrics = NULL WHERE qc_metrics IS NOT NULL")
+            else:
+                cur.execute("SELECT COUNT(*) FROM qc_metric_values")
+                moved = cur.fetchone()[0]
+                if not moved:
+                    return
+                cur.execute("""
+                    UPDATE qc_data SET qc_metrics = json_patch(
+                        COALESCE(qc_metrics, '{}'),
+                        (SELECT json_group_object(m.metric_key, m.value)
+                         FROM qc_metric_values m
+                         WHERE m.ID = qc_data.ID AND m.wave = qc_data.wave)
+                    )
+                    WHERE EXISTS (SELECT 1 FROM qc_metric_values m
+                                  WHERE m.ID = qc_data.ID AND m.wave = qc_data.wave)
+                """)
+                cur.execute("DELETE FROM qc_metric_values")
+                print(f"[INFO] Moved {moved} QC metric values back to qc_data.qc_metrics")
+
+    @contextmanager
+    def transaction(self):
+        """Serialized write transaction on the writer connection
+
+        Nested use joins the outer transaction; only the outermost block
+        commits (or rolls back on error). The outermost block opens the
+        transaction explicitly, so DDL (CREATE TABLE/INDEX) inside it rolls
+        back too; sqlite3 would otherwise autocommit statements before the
+        first DML.
+        """
+        with self._write_lock:
+            self._transaction_depth += 1
+            if self._transaction_depth == 1:
+                changes_before = self.conn.total_changes
+                self._scratch_changes = 0
+                self._pending_dirty = None
+                if not self.conn.in_transaction:
+                    try:
+                        self.cursor.execute("BEGIN")
+                    except Exception:
+                        self._transaction_depth -= 1
+                        raise
+            try:
+                yield self.cursor
+                if self._transaction_depth == 1:
+                    self.conn.commit()
+                    # Only real row changes (not temp-table staging) are a new generation
+                    if self.conn.total_changes - self._scratch_changes != changes_before:
+                        self._bump_generation()
+            except Exception:
+                if self._transaction_depth == 1:
+                    self.conn.rollback()
+                raise
+            finally:
+                if self._transaction_depth == 1:
+                    self._pending_dirty = None
+                self._transaction_depth -= 1
+
+    def _mark_dirty(self, keys=None):
+        """Record qc_data rows changed by the current transaction
+
+        keys: iterable of (ID, wave); [] for writes that leave qc_data alone;
+        None invalidates every row. Unmarked writes count as None.
+        """
+        if self._pending_dirty is ALL_ROWS:
+            return
+        if keys is None:
+            self._pending_dirty = ALL_ROWS
+            return
+        if self._pending_dirty is None:
+            self._pending_dirty = set()
+        self._pending_dirty.update((str(i), str(w)) for i, w in keys)
+
+    def _bump_generation(self):
+        """Advance the write generation after a commit (write lock held)"""
+        self._generation += 1
+        pending = ALL_ROWS if self._pending_dirty is None else self._pending_dirty
+        if pending is ALL_ROWS or self._dirty_keys is ALL_ROWS:
+            self._dirty_keys = ALL_ROWS
+        else:
+            self._dirty_keys |= pending
+
+    @property
+    def data_generation(self) -> int:
+        """Counter bumped by every committed write"""
+        return self._generation
+
+    @contextmanager
+    def read_connection(self):
+        """Borrow a pooled read connection"""
+        with self.pool.connection() as conn:
+            yield conn
+
     def get_connection(self):
-        """Get a new database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
-    
+        """Get a new (unpooled) database connection; caller must close it"""
+        conn = sqlite3.connect(self.db_path, timeout=DB_CONFIG['timeout'])
+        return configure_connection(conn, DB_CONFIG['pragmas'])
+
     def close(self):
-        """Close database connection"""
-        self.conn.close()
+        """Close database connections"""
+        self.pool.close_all()
+        with self._write_lock:
+            self.conn.close()
@@ -0,0 +1,87 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any
+
+
+def configure_connection(conn: sqlite3.Connection, pragmas: Dict[str, Any]) -> sqlite3.Connection:
+    """Apply row factory and PRAGMA settings to a connection"""
+    conn.row_factory = sqlite3.Row
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of SQLite connections (used for reads)"""
+
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0,
+                 pragmas: Dict[str, Any] = None):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new pooled connection"""
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        return configure_connection(conn, self.pragmas)
+
+    def acquire(self) -> sqlite3.Connection:
+        """Get an idle connection, opening one if the pool is below its size"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No database connection available after {self.timeout}s "
+                f"(pool size {self.size})"
+            )
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool"""
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager: borrow a connection and give it back afterwards"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close all idle connections and refuse new ones"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
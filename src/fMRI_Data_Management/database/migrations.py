@@ -0,0 +1,91 @@
+import sqlite3
+from config.database_schema import SQL_INDEXES, SECONDARY_TABLE_INDEX_SQL
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Append new steps with the next version number; never edit applied ones.
+
+
+def create_secondary_table_indexes(cur: sqlite3.Cursor, table_name: str) -> bool:
+    """Create the (ID, wave) index on a dynamic table that has both columns"""
+    cur.execute(f"PRAGMA table_info({table_name})")
+    columns = {row[1] for row in cur.fetchall()}
+    if not {'ID', 'wave'} <= columns:
+        return False
+    cur.execute(SECONDARY_TABLE_INDEX_SQL.format(table_name=table_name))
+    return True
+
+
+def _add_core_indexes(cur: sqlite3.Cursor):
+    """v1: indexes for audit_log lookups and wave filters on qc_data"""
+    for index_name in ['idx_audit_log_subject_updated', 'idx_audit_log_updated',
+                       'idx_qc_data_wave']:
+        cur.execute(SQL_INDEXES[index_name])
+
+
+def _index_secondary_tables(cur: sqlite3.Cursor):
+    """v2: (ID, wave) indexes on existing dynamic tables"""
+    cur.execute("""
+        SELECT r.table_name FROM table_registry r
+        JOIN sqlite_master m ON m.type = 'table' AND m.name = r.table_name
+        WHERE r.is_primary = 0
+    """)
+    for (table_name,) in cur.fetchall():
+        create_secondary_table_indexes(cur, table_name)
+
+
+def _add_metric_value_index(cur: sqlite3.Cursor):
+    """v3: (metric_key, wave) index for per-metric aggregates"""
+    cur.execute(SQL_INDEXES['idx_qc_metric_values_key'])
+
+
+def _backfill_subject_tags(cur: sqlite3.Cursor):
+    """v4: tag index table built from the qc_data.tags JSON arrays"""
+    cur.execute(SQL_INDEXES['idx_subject_tags_tag'])
+    cur.execute("""
+        INSERT OR IGNORE INTO subject_tags (ID, wave, tag)
+        SELECT q.ID, q.wave, TRIM(j.value)
+        FROM qc_data q, json_each(q.tags) j
+        WHERE json_valid(q.tags) AND j.type = 'text' AND TRIM(j.value) != ''
+    """)
+
+
+def _add_analysis_checks_index(cur: sqlite3.Cursor):
+    """v5: (wave, task) index for pipeline completion summaries"""
+    cur.execute(SQL_INDEXES['idx_analysis_checks_wave_task'])
+
+
+MIGRATIONS = [
+    (1, "Add audit_log and qc_data indexes", _add_core_indexes),
+    (2, "Add (ID, wave) indexes to dynamic tables", _index_secondary_tables),
+    (3, "Add qc_metric_values index", _add_metric_value_index),
+    (4, "Add subject_tags index table", _backfill_subject_tags),
+    (5, "Add analysis_checks index", _add_analysis_checks_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations, each in its own transaction; returns new version"""
+    current = get_schema_version(conn)
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        cur = conn.cursor()
+        try:
+            cur.execute("BEGIN")
+            migrate(cur)
+            cur.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"[ERROR] Migration {version} failed: {description}")
+            raise
+        print(f"[INFO] Applied migration {version}: {description}")
+        current = version
+    return current
@@ -1,9 +1,18 @@
 import json
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from database.base import DatabaseBase
-from config.constants import TABLE_CONFIG
+from config.constants import TABLE_CONFIG, DB_CONFIG
+
+# Fixed qc_data fields compared against existing records on import
+IMPORT_COMPARE_FIELDS = ['PPG', 'PPG_correct', 'cglab', 'projects', 'Download',
+                         'rescan', 'notes', 'tags']
+IMPORT_CONFLICT_COLUMNS = ['subject_id', 'wave', 'field_name', 'old_value',
+                           'new_value', 'action_type', 'updated_by']
+# Fixed qc_data fields that update_field writes as plain columns
+UPDATABLE_FIXED_FIELDS = ['notes', 'rescan', 'PPG', 'PPG_correct',
+                          'cglab', 'projects', 'Download']
 
 class QCOperations(DatabaseBase):
     
@@ -32,16 +41,121 @@ class QCOperations(DatabaseBase):
             (subject_id, wave, field_name, old_value, new_value, action_type, updated_by)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (subject_id, wave, field_name, str(old_value), str(new_value), action_type, user))
+
+    def _qc_select_sql(self, cur, where: str = "", order_by: str = "q.ID, q.wave",
+                       expand_json: bool = False):
+        """Helper: SELECT for qc_data rows; pivots qc_metric_values in normalized mode
+
+        With expand_json=True, JSON-mode metrics are also returned as one
+        column per key (json_extract) instead of the qc_metrics blob.
+        """
+        if self.metric_storage != 'normalized' and expand_json:
+            cur.execute("PRAGMA table_info(qc_data)")
+            fixed = [f"q.{row[1]}" for row in cur.fetchall() if row[1] != 'qc_metrics']
+            keys = self._metric_keys(cur)
+            extracts = [
+                'json_extract(q.qc_metrics, ?) AS "{}"'.format(key.replace('"', '""'))
+                for key in keys
+            ]
+            sql = f"SELECT {', '.join(fixed + extracts)} FROM qc_data q {where} ORDER BY {order_by}"
+            return sql, [f'$."{key}"' for key in keys]
+
+        if self.metric_storage != 'normalized':
+            return f"SELECT q.* FROM qc_data q {where} ORDER BY {order_by}", []
+
+        cur.execute("PRAGMA table_info(qc_data)")
+        fixed = [f"q.{row[1]}" for row in cur.fetchall() if row[1] != 'qc_metrics']
+        keys = self._metric_keys(cur)
+
+        pivots = [
+            'MAX(CASE WHEN m.metric_key = ? THEN m.value END) AS "{}"'.format(key.replace('"', '""'))
+            for key in keys
+        ]
+        sql = f"""
+            SELECT {', '.join(fixed + pivots)}
+            FROM qc_data q
+            LEFT JOIN qc_metric_values m ON m.ID = q.ID AND m.wave = q.wave
+            {where}
+            GROUP BY q.ID, q.wave
+            ORDER BY {order_by}
+        """
+        return sql, keys
+
+    def _metric_keys(self, cur) -> List[str]:
+        """Helper: Sorted metric keys in use, cached per data generation
+
+        Saves a scan of every row's metrics on each server-side page/sort/
+        filter request. Not cached inside an open write transaction, whose
+        uncommitted rows may add keys.
+        """
+        in_write = cur.connection is self.conn and self._transaction_depth > 0
+        generation = self._generation
+        cached = self._metric_keys_cache
+        if not in_write and cached is not None and cached[0] == generation:
+            return list(cached[1])
+
+        if self.metric_storage == 'normalized':
+            cur.execute("SELECT DISTINCT metric_key FROM qc_metric_values ORDER BY metric_key")
+        else:
+            cur.execute("""
+                SELECT DISTINCT j.key FROM qc_data, json_each(qc_data.qc_metrics) j
+                WHERE json_valid(qc_data.qc_metrics) ORDER BY j.key
+            """)
+        keys = [row[0] for row in cur.fetchall()]
+        if not in_write:
+            self._metric_keys_cache = (generation, keys)
+        return list(keys)
+
+    def _read_qc_rows(self, conn, where: str = "", params: tuple = (),
+                      order_by: str = "q.ID, q.wave") -> List[Dict]:
+        """Helper: Read qc_data rows as dicts (metrics expanded in normalized mode)"""
+        cur = conn.cursor()
+        sql, pivot_params = self._qc_select_sql(cur, where, order_by)
+        cur.execute(sql, list(pivot_params) + list(params))
+        return [dict(row) for row in cur.fetchall()]
+
+    def _get_metric_value(self, subject_id: str, wave: str, metric_key: str) -> Any:
+        """Helper: Single stored metric value (normalized mode)"""
+        self.cursor.execute("""
+            SELECT value FROM qc_metric_values
+            WHERE ID = ? AND wave = ? AND metric_key = ?
+        """, (subject_id, wave, metric_key))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def _write_metric_values(self, rows: List[tuple]):
+        """Helper: Upsert (ID, wave, metric_key, value) rows; None deletes the value"""
+        rows = list(rows)
+        if not rows:
+            return
+        keys = sorted({row[2] for row in rows})
+        self.cursor.executemany("""
+            INSERT OR IGNORE INTO column_config (column_key, display_name)
+            VALUES (?, ?)
+        """, [(key, key.replace('_', ' ').title()) for key in keys])
+        self.cursor.executemany("""
+            DELETE FROM qc_metric_values WHERE ID = ? AND wave = ? AND metric_key = ?
+        """, [row[:3] for row in rows if row[3] is None])
+        self.cursor.executemany("""
+            INSERT OR REPLACE INTO qc_metric_values (ID, wave, metric_key, value)
+            VALUES (?, ?, ?, ?)
+        """, [row for row in rows if row[3] is not None])
+
+    def _set_subject_tags(self, subject_id: str, wave: str, tags: List[str]):
+        """Helper: Replace the subject_tags rows of one record"""
+        self.cursor.execute(
+            "DELETE FROM subject_tags WHERE ID = ? AND wave = ?", (subject_id, wave)
+        )
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO subject_tags (ID, wave, tag) VALUES (?, ?, ?)",
+            [(subject_id, wave, tag) for tag in tags]
+        )
     
     def add_subject(self, subject_id: str, wave: str, 
                     other_fields: Dict = None, user: str = "user"):
         if not subject_id or not wave:
             raise ValueError("Subject ID and wave are required")
         
-        # Check if exists
-        if self._get_qc_record(subject_id, wave):
-            raise ValueError(f"Subject {subject_id} wave {wave} already exists")
-        
         # Prepare data
         qc_metrics = {}
         fixed_fields = {key: None for key in TABLE_CONFIG['fixed_qc_fields']}
@@ -62,41 +176,57 @@ class QCOperations(DatabaseBase):
                     from utils.data_processing import tags_to_json
                     fixed_fields['tags'] = tags_to_json(tags_str)
         
-        # Insert
-        self.cursor.execute("""
-            INSERT INTO qc_data 
-            (ID, wave, qc_metrics, notes, rescan, tags,
-             PPG, PPG_correct, cglab, projects, Download, 
-             created_at, updated_at, updated_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            subject_id, wave, 
-            json.dumps(qc_metrics, ensure_ascii=False),
-            fixed_fields.get('notes'),
-            fixed_fields.get('rescan', 0),
-            fixed_fields.get('tags'),
-            fixed_fields.get('PPG'),
-            fixed_fields.get('PPG_correct'),
-            fixed_fields.get('cglab'),
-            fixed_fields.get('projects'),
-            fixed_fields.get('Download'),
-            datetime.now(), datetime.now(), user
-        ))
-        
-        self._log_audit(subject_id, wave, 'new_subject', None, 'created', 'insert', user)
-        self.conn.commit()
+        normalized = self.metric_storage == 'normalized'
+        with self.transaction() as cur:
+            self._mark_dirty([(subject_id, wave)])
+            # Check if exists
+            if self._get_qc_record(subject_id, wave):
+                raise ValueError(f"Subject {subject_id} wave {wave} already exists")
+
+            # Insert
+            cur.execute("""
+                INSERT INTO qc_data 
+                (ID, wave, qc_metrics, notes, rescan, tags,
+                 PPG, PPG_correct, cglab, projects, Download, 
+                 created_at, updated_at, updated_by)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                subject_id, wave,
+                None if normalized else json.dumps(qc_metrics, ensure_ascii=False),
+                fixed_fields.get('notes'),
+                fixed_fields.get('rescan', 0),
+                fixed_fields.get('tags'),
+                fixed_fields.get('PPG'),
+                fixed_fields.get('PPG_correct'),
+                fixed_fields.get('cglab'),
+                fixed_fields.get('projects'),
+                fixed_fields.get('Download'),
+                datetime.now(), datetime.now(), user
+            ))
+            if normalized:
+                self._write_metric_values(
+                    (subject_id, wave, k, v) for k, v in qc_metrics.items()
+                )
+            if fixed_fields.get('tags'):
+                self._set_subject_tags(subject_id, wave, json.loads(fixed_fields['tags']))
+
+            self._log_audit(subject_id, wave, 'new_subject', None, 'created', 'insert', user)
         return True
     
     def update_field(self, subject_id: str, wave: str, field_name: str, 
                      new_value: Any, user: str = "user"):
         """Update field in qc_data (with audit log)"""
+        with self.transaction():
+            return self._update_field(subject_id, wave, field_name, new_value, user)
+
+    def _update_field(self, subject_id: str, wave: str, field_name: str,
+                      new_value: Any, user: str):
+        """Helper: update_field body; caller holds the write transaction"""
+        self._mark_dirty([(subject_id, wave)])
         record = self._get_qc_record(subject_id, wave)
         if not record:
             return False
         
-        updatable_fixed_fields = ['notes', 'rescan', 'PPG', 'PPG_correct', 
-                                 'cglab', 'projects', 'Download']
-        
         # Handle tags
         if field_name == 'tags':
             from utils.data_processing import tags_to_json, extract_tags_from_string
@@ -107,15 +237,25 @@ class QCOperations(DatabaseBase):
             self._update_qc_field(subject_id, wave, 'tags', new_tags_json, user)
             
             new_tags_list = extract_tags_from_string(new_value)
+            self._set_subject_tags(subject_id, wave, json.loads(new_tags_json))
             new_value_str = ', '.join(new_tags_list)
         
         # Handle fixed fields
-        elif field_name in updatable_fixed_fields:
+        elif field_name in UPDATABLE_FIXED_FIELDS:
             old_value = record[field_name]
             self._update_qc_field(subject_id, wave, field_name, new_value, user)
             new_value_str = str(new_value)
         
-        # Handle QC metrics
+        # Handle QC metrics (normalized: touch one row, not the whole document)
+        elif self.metric_storage == 'normalized':
+            old_value = self._get_metric_value(subject_id, wave, field_name)
+            self._write_metric_values([(subject_id, wave, field_name, new_value)])
+            self.cursor.execute("""
+                UPDATE qc_data SET updated_at = ?, updated_by = ?
+                WHERE ID = ? AND wave = ?
+            """, (datetime.now(), user, subject_id, wave))
+            new_value_str = str(new_value)
+
         else:
             data = json.loads(record['qc_metrics'] or '{}')
             old_value = data.get(field_name)
@@ -128,207 +268,655 @@ class QCOperations(DatabaseBase):
             new_value_str = str(new_value)
         
         self._log_audit(subject_id, wave, field_name, old_value, new_value_str, 'update', user)
-        self.conn.commit()
         return True
     
+    def update_fields(self, changes: List[tuple], user: str = "user") -> int:
+        """Apply (subject_id, wave, field_name, new_value) edits in one transaction"""
+        count = 0
+        with self.transaction():
+            for subject_id, wave, field_name, new_value in changes:
+                if self._update_field(subject_id, wave, field_name, new_value, user):
+                    count += 1
+        return count
+    
     def add_tag(self, subject_id: str, wave: str, tag: str, user: str = "user"):
         """Add a single tag to subject"""
-        record = self._get_qc_record(subject_id, wave)
-        if not record:
-            return False
-        
-        tags = json.loads(record['tags']) if record['tags'] else []
-        
-        if tag not in tags:
-            old_value_str = ', '.join(tags)
-            tags.append(tag)
-            
-            new_tags_json = json.dumps(tags)
-            self._update_qc_field(subject_id, wave, 'tags', new_tags_json, user)
-            
-            new_value_str = ', '.join(tags)
-            self._log_audit(subject_id, wave, 'tags', old_value_str, new_value_str, 'add_tag', user)
-            
-            self.conn.commit()
-            return True
-        
+        with self.transaction():
+            self._mark_dirty([(subject_id, wave)])
+            record = self._get_qc_record(subject_id, wave)
+            if not record:
+                return False
+
+            tags = json.loads(record['tags']) if record['tags'] else []
+
+            if tag not in tags:
+                old_value_str = ', '.join(tags)
+                tags.append(tag)
+
+                new_tags_json = json.dumps(tags)
+                self._update_qc_field(subject_id, wave, 'tags', new_tags_json, user)
+                self.cursor.execute(
+                    "INSERT OR IGNORE INTO subject_tags (ID, wave, tag) VALUES (?, ?, ?)",
+                    (subject_id, wave, tag)
+                )
+
+                new_value_str = ', '.join(tags)
+                self._log_audit(subject_id, wave, 'tags', old_value_str, new_value_str, 'add_tag', user)
+                return True
+
         return False
     
     def remove_tag(self, subject_id: str, wave: str, tag: str, user: str = "user"):
         """Remove specific tag from subject"""
-        record = self._get_qc_record(subject_id, wave)
-        if not record:
-            return False
-        
-        current_tags = json.loads(record['tags']) if record['tags'] else []
-        
-        if tag in current_tags:
-            current_tags.remove(tag)
-            self._update_qc_field(subject_id, wave, 'tags', json.dumps(current_tags), user)
-            self.conn.commit()
-            return True
-        
+        with self.transaction():
+            self._mark_dirty([(subject_id, wave)])
+            record = self._get_qc_record(subject_id, wave)
+            if not record:
+                return False
+
+            current_tags = json.loads(record['tags']) if record['tags'] else []
+
+            if tag in current_tags:
+                current_tags.remove(tag)
+                self._update_qc_field(subject_id, wave, 'tags', json.dumps(current_tags), user)
+                if tag not in current_tags:
+                    self.cursor.execute(
+                        "DELETE FROM subject_tags WHERE ID = ? AND wave = ? AND tag = ?",
+                        (subject_id, wave, tag)
+                    )
+                return True
+
         return False
     
     def delete_subject(self, subject_id: str, wave: str, user: str = "user"):
-        record = self._get_qc_record(subject_id, wave)
-        if not record:
-            return False
-        
-        # Log before deletion
-        self._log_audit(subject_id, wave, 'delete', str(dict(record)), None, 'delete', user)
-        
-        # Delete
-        self.cursor.execute(
-            "DELETE FROM qc_data WHERE ID = ? AND wave = ?", 
-            (subject_id, wave)
-        )
-        
-        self.conn.commit()
-        return True
+        return self.delete_subjects([(subject_id, wave)], user) > 0
     
+    def _stage_batch_keys(self, subject_wave_pairs: List[tuple], cur=None):
+        """Helper: Put (ID, wave) keys in temp table batch_keys for set-based statements
+
+        Caller holds the write transaction, or passes the cursor of a pooled
+        read connection (temp tables are per connection).
+        """
+        cur = cur or self.cursor
+        changes_before = cur.connection.total_changes
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS batch_keys (
+                ID TEXT NOT NULL, wave TEXT NOT NULL, PRIMARY KEY (ID, wave)
+            )
+        """)
+        cur.execute("DELETE FROM batch_keys")
+        cur.executemany(
+            "INSERT OR IGNORE INTO batch_keys (ID, wave) VALUES (?, ?)",
+            [(str(subject_id), str(wave)) for subject_id, wave in subject_wave_pairs]
+        )
+        if cur.connection is self.conn:
+            # Staging alone must not bump data_generation (see transaction())
+            self._scratch_changes += cur.connection.total_changes - changes_before
+
+    def _load_batch_records(self, subject_wave_pairs: List[tuple]) -> Dict[tuple, Dict]:
+        """Helper: Fetch many QC records in one query (keys left in batch_keys)"""
+        cur = self.cursor
+        self._stage_batch_keys(subject_wave_pairs)
+        cur.execute("""
+            SELECT q.* FROM qc_data q
+            JOIN batch_keys k ON q.ID = k.ID AND q.wave = k.wave
+        """)
+        return {(row['ID'], row['wave']): dict(row) for row in cur.fetchall()}
+
+    def _log_audit_rows(self, rows: List[tuple]):
+        """Helper: Insert (subject_id, wave, field, old, new, action, user) audit rows"""
+        self.cursor.executemany("""
+            INSERT INTO audit_log 
+            (subject_id, wave, field_name, old_value, new_value, action_type, updated_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(sid, wave, field, str(old), str(new), action, user)
+              for sid, wave, field, old, new, action, user in rows])
+
+    def batch_add_tags(self, subject_wave_pairs: List[tuple], tags: List[str],
+                       user: str = "user") -> int:
+        """Add tags to many subjects in one transaction; returns records changed"""
+        tags = [tag for tag in dict.fromkeys(tags) if tag]
+        if not tags or not subject_wave_pairs:
+            return 0
+
+        now = datetime.now()
+        updates, tag_rows, audit_rows = [], [], []
+        with self.transaction():
+            records = self._load_batch_records(subject_wave_pairs)
+            for (subject_id, wave), record in records.items():
+                current = json.loads(record['tags']) if record['tags'] else []
+                added = [tag for tag in tags if tag not in current]
+                if not added:
+                    continue
+                new_tags = current + added
+                updates.append((json.dumps(new_tags), now, user, subject_id, wave))
+                tag_rows.extend((subject_id, wave, tag) for tag in added)
+                audit_rows.append((subject_id, wave, 'tags', ', '.join(current),
+                                   ', '.join(new_tags), 'add_tag', user))
+
+            self._mark_dirty((u[3], u[4]) for u in updates)
+            self.cursor.executemany("""
+                UPDATE qc_data SET tags = ?, updated_at = ?, updated_by = ?
+                WHERE ID = ? AND wave = ?
+            """, updates)
+            self.cursor.executemany(
+                "INSERT OR IGNORE INTO subject_tags (ID, wave, tag) VALUES (?, ?, ?)",
+                tag_rows
+            )
+            self._log_audit_rows(audit_rows)
+        return len(updates)
+
+    def batch_set_field(self, subject_wave_pairs: List[tuple], field_name: str,
+                        value: Any, user: str = "user") -> int:
+        """Set one field to the same value on many subjects in one transaction"""
+        if not subject_wave_pairs:
+            return 0
+
+        now = datetime.now()
+        normalized = self.metric_storage == 'normalized'
+        with self.transaction() as cur:
+            records = self._load_batch_records(subject_wave_pairs)
+            self._mark_dirty(records.keys())
+            keys = list(records.keys())
+
+            if field_name == 'tags':
+                from utils.data_processing import tags_to_json
+                new_json = tags_to_json(value)
+                new_tags = json.loads(new_json)
+                old_values = [', '.join(json.loads(records[k]['tags'] or '[]')) for k in keys]
+                new_value_str = ', '.join(new_tags)
+                cur.executemany("""
+                    UPDATE qc_data SET tags = ?, updated_at = ?, updated_by = ?
+                    WHERE ID = ? AND wave = ?
+                """, [(new_json, now, user) + k for k in keys])
+                cur.execute("""
+                    DELETE FROM subject_tags WHERE (ID, wave) IN (SELECT ID, wave FROM batch_keys)
+                """)
+                cur.executemany(
+                    "INSERT OR IGNORE INTO subject_tags (ID, wave, tag) VALUES (?, ?, ?)",
+                    [k + (tag,) for k in keys for tag in new_tags]
+                )
+
+            elif field_name in UPDATABLE_FIXED_FIELDS:
+                old_values = [records[k][field_name] for k in keys]
+                new_value_str = str(value)
+                cur.executemany(f"""
+                    UPDATE qc_data SET {field_name} = ?, updated_at = ?, updated_by = ?
+                    WHERE ID = ? AND wave = ?
+                """, [(value, now, user) + k for k in keys])
+
+            elif normalized:
+                cur.execute("""
+                    SELECT m.ID, m.wave, m.value FROM qc_metric_values m
+                    JOIN batch_keys k ON m.ID = k.ID AND m.wave = k.wave
+                    WHERE m.metric_key = ?
+                """, (field_name,))
+                stored = {(row[0], row[1]): row[2] for row in cur.fetchall()}
+                old_values = [stored.get(k) for k in keys]
+                new_value_str = str(value)
+                self._write_metric_values(k + (field_name, value) for k in keys)
+                cur.executemany("""
+                    UPDATE qc_data SET updated_at = ?, updated_by = ?
+                    WHERE ID = ? AND wave = ?
+                """, [(now, user) + k for k in keys])
+
+            else:
+                old_values, updates = [], []
+                for k in keys:
+                    data = json.loads(records[k]['qc_metrics'] or '{}')
+                    old_values.append(data.get(field_name))
+                    data[field_name] = value
+                    updates.append((json.dumps(data, ensure_ascii=False), now, user) + k)
+                new_value_str = str(value)
+                cur.executemany("""
+                    UPDATE qc_data SET qc_metrics = ?, updated_at = ?, updated_by = ?
+                    WHERE ID = ? AND wave = ?
+                """, updates)
+
+            self._log_audit_rows(
+                k + (field_name, old, new_value_str, 'update', user)
+                for k, old in zip(keys, old_values)
+            )
+        return len(keys)
+
+    def delete_subjects(self, subject_wave_pairs: List[tuple], user: str = "user") -> int:
+        """Delete many subjects in one transaction; returns records deleted
+
+        Tombstones (the full record as JSON) are written to the audit log
+        with a single INSERT ... SELECT before the rows are removed.
+        """
+        pairs = list(subject_wave_pairs)  # used twice; may be a generator
+        if not pairs:
+            return 0
+
+        with self.transaction() as cur:
+            self._stage_batch_keys(pairs)
+            self._mark_dirty(pairs)
+
+            cur.execute("PRAGMA table_info(qc_data)")
+            fields = []
+            for column in [row[1] for row in cur.fetchall()]:
+                if column == 'qc_metrics' and self.metric_storage == 'normalized':
+                    value = """(SELECT json_group_object(m.metric_key, m.value)
+                                FROM qc_metric_values m
+                                WHERE m.ID = q.ID AND m.wave = q.wave)"""
+                elif column == 'qc_metrics':
+                    value = "CASE WHEN json_valid(q.qc_metrics) THEN json(q.qc_metrics) END"
+                else:
+                    value = f"q.{column}"
+                fields.append(f"'{column}', {value}")
+
+            # Log before deletion
+            cur.execute(f"""
+                INSERT INTO audit_log 
+                (subject_id, wave, field_name, old_value, new_value, action_type, updated_by)
+                SELECT q.ID, q.wave, 'delete', json_object({', '.join(fields)}),
+                       'None', 'delete', ?
+                FROM qc_data q JOIN batch_keys k ON q.ID = k.ID AND q.wave = k.wave
+            """, (user,))
+            deleted = cur.rowcount
+
+            for table in ('qc_metric_values', 'subject_tags', 'qc_data'):
+                cur.execute(f"""
+                    DELETE FROM {table} WHERE (ID, wave) IN (SELECT ID, wave FROM batch_keys)
+                """)
+        return deleted
+
+    def batch_delete(self, subject_wave_pairs: List[tuple], user: str = "user") -> int:
+        """Delete many subjects in one transaction (see delete_subjects)"""
+        return self.delete_subjects(subject_wave_pairs, user)
+
     def batch_update(self, subject_wave_pairs: List[tuple], 
                     field_name: str, value: Any, user: str = "user"):
         """Batch update multiple subjects"""
-        count = 0
-        for subject_id, wave in subject_wave_pairs:
-            if field_name == 'tag':
-                if self.add_tag(subject_id, wave, value, user):
-                    count += 1
-            elif self.update_field(subject_id, wave, field_name, value, user):
-                count += 1
-        return count
+        if field_name == 'tag':
+            return self.batch_add_tags(subject_wave_pairs, [value], user)
+        return self.batch_set_field(subject_wave_pairs, field_name, value, user)
     
-    def import_from_csv(self, csv_path: str, wave: str, user: str = "system"):
-        """Import data from CSV file (no overwrite; log conflicts only)"""
-        df = pd.read_csv(csv_path)
+    @staticmethod
+    def _column_values(df: pd.DataFrame, column: str, default: Any = None) -> List:
+        """Helper: Column as native Python values (NaN -> None)"""
+        if column not in df.columns:
+            return [default] * len(df)
+        series = df[column]
+        return series.astype(object).where(series.notna(), None).tolist()
 
-        if 'ID' not in df.columns:
-            raise ValueError("CSV must contain 'ID' column")
+    def _get_wave_ids(self, wave: str) -> set:
+        """Helper: All subject IDs already stored for a wave (one query)"""
+        self.cursor.execute("SELECT ID FROM qc_data WHERE wave = ?", (wave,))
+        return {row[0] for row in self.cursor.fetchall()}
 
-        fixed_columns = TABLE_CONFIG['fixed_qc_fields']
-        qc_columns = [col for col in df.columns 
-                    if col not in ['ID', 'wave'] + fixed_columns 
-                    and not col.startswith('Note') and col != 'notes']
+    def _build_import_rows(self, df: pd.DataFrame, wave: str, qc_columns: List[str],
+                           note_columns: List[str], user: str):
+        """Helper: Build qc_data, audit_log, qc_metric_values and subject_tags tuples"""
+        from utils.data_processing import tags_to_json
+
+        metric_block = df[qc_columns].astype(object).where(df[qc_columns].notna(), None)
+        metric_dicts = [
+            {k: v for k, v in zip(qc_columns, values) if v is not None}
+            for values in metric_block.itertuples(index=False, name=None)
+        ]
+        metrics_json = [json.dumps(m, ensure_ascii=False) for m in metric_dicts]
+
+        # Notes: "NoteX: value" lines take precedence over a plain notes column
+        notes = self._column_values(df, 'notes')
+        if note_columns:
+            note_lines = [
+                (f"{col}: " + df[col].astype(str)).where(df[col].notna(), None).tolist()
+                for col in note_columns
+            ]
+            notes = [
+                '\n'.join(line for line in lines if line is not None) or fallback
+                for lines, fallback in zip(zip(*note_lines), notes)
+            ]
+
+        tags = [tags_to_json(t) if t is not None else None
+                for t in self._column_values(df, 'tags')]
 
-        for col in qc_columns:
-            self._register_column(col, col.replace('_', ' ').title())
+        now = datetime.now()
+        ids = df['ID'].tolist()
+        normalized = self.metric_storage == 'normalized'
+        metric_rows = [
+            (subject_id, wave, k, v)
+            for subject_id, metrics in zip(ids, metric_dicts) if normalized
+            for k, v in metrics.items()
+        ]
+        qc_rows = list(zip(
+            ids, [wave] * len(df),
+            [None] * len(df) if normalized else metrics_json, notes, tags,
+            self._column_values(df, 'PPG'), self._column_values(df, 'PPG_correct'),
+            self._column_values(df, 'cglab'), self._column_values(df, 'projects'),
+            self._column_values(df, 'Download'), self._column_values(df, 'rescan', 0),
+            [now] * len(df), [now] * len(df), [user] * len(df)
+        ))
+        audit_rows = [
+            (subject_id, wave, 'qc_import', str(None), metrics, 'import_insert', user)
+            for subject_id, metrics in zip(ids, metrics_json)
+        ]
+        tag_rows = [
+            (subject_id, wave, tag)
+            for subject_id, tags_json in zip(ids, tags) if tags_json
+            for tag in json.loads(tags_json)
+        ]
+        return qc_rows, audit_rows, metric_rows, tag_rows
 
-        imported_count = 0
-        conflict_count = 0
+    def _diff_import_conflicts(self, incoming: pd.DataFrame, wave: str,
+                               qc_columns: List[str], user: str) -> pd.DataFrame:
+        """Helper: Column-wise diff of incoming rows against stored rows of a wave"""
+        columns = ['row', 'order'] + IMPORT_CONFLICT_COLUMNS
+        if incoming.empty:
+            return pd.DataFrame(columns=columns)
 
-        for _, row in df.iterrows():
-            subject_id = row['ID']
-            existing = self._get_qc_record(subject_id, wave)
+        # Expand only the stored rows (and their metrics) the incoming rows hit
+        self._stage_batch_keys((subject_id, wave) for subject_id in incoming['ID'].unique())
+        self.cursor.execute("""
+            SELECT q.* FROM qc_data q
+            JOIN batch_keys k ON q.ID = k.ID AND q.wave = k.wave
+        """)
+        stored = pd.DataFrame([dict(row) for row in self.cursor.fetchall()], dtype=object)
+        if stored.empty:
+            return pd.DataFrame(columns=columns)
+        if self.metric_storage == 'normalized':
+            self.cursor.execute("""
+                SELECT m.ID, m.metric_key, m.value FROM qc_metric_values m
+                JOIN batch_keys k ON m.ID = k.ID AND m.wave = k.wave
+            """)
+            long = pd.DataFrame([tuple(row) for row in self.cursor.fetchall()],
+                                columns=['ID', 'metric_key', 'value'], dtype=object)
+            stored_metrics = long.pivot(index='ID', columns='metric_key', values='value')
+        else:
+            stored_metrics = pd.DataFrame(
+                [json.loads(m or '{}') for m in stored['qc_metrics']],
+                index=stored['ID'], dtype=object
+            )
+        stored = stored.set_index('ID')
 
-            qc_metrics = {col: row[col] for col in qc_columns if pd.notna(row.get(col))}
-            notes = '\n'.join([f"{col}: {row[col]}" for col in df.columns 
-                            if col.startswith('Note') and pd.notna(row.get(col))])
-            notes = notes or row.get('notes')
+        incoming = incoming[incoming['ID'].isin(stored.index)].reset_index(drop=True)
+        keys = incoming['ID']
+        diffs = []
 
-            from utils.data_processing import tags_to_json
-            tags_json = tags_to_json(row['tags']) if pd.notna(row.get('tags')) else None
+        for order, field in enumerate(qc_columns + IMPORT_COMPARE_FIELDS):
+            if field not in incoming.columns:
+                continue
+            new = incoming[field].astype(object)
 
-            if existing:
-                existing_metrics = json.loads(existing.get('qc_metrics') or '{}')
-                has_conflict = False
+            if order < len(qc_columns):
+                # Metrics compare by value; a missing stored key counts as None
+                if field in stored_metrics.columns:
+                    old = pd.Series(stored_metrics[field].reindex(keys).to_numpy(), dtype=object)
+                    old = old.where(old.notna(), None)
+                else:
+                    old = pd.Series([None] * len(keys), dtype=object)
+                changed = new.notna() & (old != new)
+            else:
+                # Fixed fields compare by their string form
+                old = pd.Series(stored[field].reindex(keys).to_numpy(), dtype=object)
+                changed = new.notna() & (old.map(str) != new.map(str))
 
-                for k, v in qc_metrics.items():
-                    old_v = existing_metrics.get(k)
-                    if old_v != v:
-                        self._log_audit(subject_id, wave, k, old_v, v, 'import_conflict', user)
-                        has_conflict = True
+            if changed.any():
+                diffs.append(pd.DataFrame({
+                    'row': changed[changed].index,
+                    'order': order,
+                    'subject_id': keys[changed].to_numpy(),
+                    'field_name': field,
+                    'old_value': old[changed].map(str).to_numpy(),
+                    'new_value': new[changed].map(str).to_numpy(),
+                }))
 
-                # compare fixed fields too
-                for field in ['PPG', 'PPG_correct', 'cglab', 'projects', 'Download', 'rescan', 'notes', 'tags']:
-                    new_v = row.get(field)
-                    old_v = existing.get(field)
-                    if pd.notna(new_v) and str(new_v) != str(old_v):
-                        self._log_audit(subject_id, wave, field, old_v, new_v, 'import_conflict', user)
-                        has_conflict = True
+        if not diffs:
+            return pd.DataFrame(columns=columns)
 
-                if has_conflict:
-                    conflict_count += 1
-                continue  # skip updating
+        conflicts = pd.concat(diffs, ignore_index=True).sort_values(['row', 'order'])
+        conflicts['wave'] = wave
+        conflicts['action_type'] = 'import_conflict'
+        conflicts['updated_by'] = user
+        return conflicts[columns]
 
-            # insert new record
-            self.cursor.execute("""
-                INSERT INTO qc_data 
-                (ID, wave, qc_metrics, notes, tags,
-                PPG, PPG_correct, cglab, projects, Download, rescan,
-                created_at, updated_at, updated_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                subject_id, wave,
-                json.dumps(qc_metrics, ensure_ascii=False),
-                notes, tags_json,
-                row.get('PPG'), row.get('PPG_correct'),
-                row.get('cglab'), row.get('projects'),
-                row.get('Download'), row.get('rescan', 0),
-                datetime.now(), datetime.now(), user
-            ))
-            self._log_audit(subject_id, wave, 'qc_import',
-                            None, json.dumps(qc_metrics, ensure_ascii=False),
-                            'import_insert', user)
-            imported_count += 1
+    def import_from_csv(self, csv_path: str, wave: str, user: str = "system",
+                        return_conflicts: bool = False, chunksize: int = None,
+                        overrides: Dict = None):
+        """Import data from CSV file (no overwrite; log conflicts only)
+
+        With return_conflicts=True, returns (imported_count, conflicts) where
+        conflicts is a DataFrame of the audit rows logged for existing records.
+        With chunksize, the file is streamed through pd.read_csv in chunks of
+        that many rows (one transaction), so memory stays flat for large
+        files. overrides sets columns (e.g. projects) on every row.
+        """
+        if chunksize:
+            chunks = pd.read_csv(csv_path, chunksize=chunksize)
+        else:
+            chunks = [pd.read_csv(csv_path)]
+
+        imported_count, conflict_count = 0, 0
+        conflict_frames = []
+        with self.transaction():
+            existing_ids = self._get_wave_ids(wave)
+            for df in chunks:
+                if overrides:
+                    df = df.assign(**overrides)
+                count, conflicts = self._import_chunk(df, wave, existing_ids, user)
+                imported_count += count
+                conflict_count += conflicts['row'].nunique()
+                if return_conflicts and not conflicts.empty:
+                    conflict_frames.append(conflicts[IMPORT_CONFLICT_COLUMNS])
 
-        self.conn.commit()
         print(f"Import complete: {imported_count} new rows, {conflict_count} conflicts logged.")
+        if return_conflicts:
+            if conflict_frames:
+                conflicts = pd.concat(conflict_frames, ignore_index=True)
+            else:
+                conflicts = pd.DataFrame(columns=IMPORT_CONFLICT_COLUMNS)
+            return imported_count, conflicts
         return imported_count
 
-    
+    def _import_chunk(self, df: pd.DataFrame, wave: str, existing_ids: set,
+                      user: str) -> Tuple[int, pd.DataFrame]:
+        """Helper: Insert new rows of one CSV chunk and log conflicts (transaction held)
+
+        existing_ids is updated with the IDs inserted, so repeats in later
+        chunks are diffed against the first occurrence.
+        """
+        if 'ID' not in df.columns:
+            raise ValueError("CSV must contain 'ID' column")
+
+        cur = self.cursor
+        fixed_columns = TABLE_CONFIG['fixed_qc_fields']
+        qc_columns = [col for col in df.columns
+                    if col not in ['ID', 'wave'] + fixed_columns
+                    and not col.startswith('Note') and col != 'notes']
+        note_columns = [col for col in df.columns if col.startswith('Note')]
+
+        # IDs are stored as TEXT; compare keys in the same representation
+        df = df.assign(ID=df['ID'].astype(str))
+
+        # Split incoming rows into new and existing keys; repeated IDs within
+        # the file are treated as existing so only the first one is inserted
+        is_new = ~df['ID'].isin(existing_ids) & ~df['ID'].duplicated()
+        new_df = df[is_new]
+        existing_df = df[~is_new]
+        self._mark_dirty((subject_id, wave) for subject_id in new_df['ID'])
+
+        cur.executemany("""
+            INSERT OR IGNORE INTO column_config (column_key, display_name)
+            VALUES (?, ?)
+        """, [(col, col.replace('_', ' ').title()) for col in qc_columns])
+
+        qc_rows, audit_rows, metric_rows, tag_rows = self._build_import_rows(
+            new_df, wave, qc_columns, note_columns, user
+        )
+        cur.executemany("""
+            INSERT INTO qc_data
+            (ID, wave, qc_metrics, notes, tags,
+            PPG, PPG_correct, cglab, projects, Download, rescan,
+            created_at, updated_at, updated_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, qc_rows)
+        cur.executemany("""
+            INSERT INTO audit_log
+            (subject_id, wave, field_name, old_value, new_value, action_type, updated_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, audit_rows)
+        self._write_metric_values(metric_rows)
+        cur.executemany(
+            "INSERT OR IGNORE INTO subject_tags (ID, wave, tag) VALUES (?, ?, ?)",
+            tag_rows
+        )
+        existing_ids.update(new_df['ID'])
+
+        # Diff after the inserts so repeated IDs compare against the first row
+        conflicts = self._diff_import_conflicts(existing_df, wave, qc_columns, user)
+        cur.executemany("""
+            INSERT INTO audit_log
+            (subject_id, wave, field_name, old_value, new_value, action_type, updated_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, conflicts[IMPORT_CONFLICT_COLUMNS].itertuples(index=False, name=None))
+        return len(qc_rows), conflicts
+
+
     def _register_column(self, column_key: str, display_name: str = None,
                         data_type: str = 'text', valid_values: List = None):
         """Register new QC metric column"""
         if display_name is None:
             display_name = column_key
         
-        self.cursor.execute("""
-            INSERT OR IGNORE INTO column_config 
-            (column_key, display_name, data_type, valid_values)
-            VALUES (?, ?, ?, ?)
-        """, (column_key, display_name, data_type, 
-              json.dumps(valid_values) if valid_values else None))
-        self.conn.commit()
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            cur.execute("""
+                INSERT OR IGNORE INTO column_config 
+                (column_key, display_name, data_type, valid_values)
+                VALUES (?, ?, ?, ?)
+            """, (column_key, display_name, data_type, 
+                  json.dumps(valid_values) if valid_values else None))
     
+    def get_qc_dataframe(self, copy: bool = True) -> pd.DataFrame:
+        """Parsed qc_data frame (as parse_qc_metrics(get_all_data_raw())), cached
+
+        Rebuilt only when writes were committed since the last call: rows
+        marked dirty are re-read and patched in, anything else reloads fully.
+        Pass copy=False only if the caller will not modify the frame.
+        """
+        from utils.data_processing import parse_qc_metrics
+        from database.base import ALL_ROWS
+
+        with self._frame_lock:
+            with self._write_lock:
+                generation = self._generation
+                dirty = self._dirty_keys
+                self._dirty_keys = set()
+
+            cached = self._frame_cache
+            if cached is not None and cached[0] == generation:
+                frame = cached[1]
+            elif (cached is None or dirty is ALL_ROWS
+                  or len(dirty) > DB_CONFIG['frame_patch_limit']):
+                frame = parse_qc_metrics(self.get_all_data_raw())
+            else:
+                frame = self._patch_qc_frame(cached[1], dirty)
+                self._patch_progress_summary(cached, frame, dirty, generation)
+            self._frame_cache = (generation, frame)
+
+        return frame.copy() if copy else frame
+
+    def _patch_progress_summary(self, cached: tuple, frame: pd.DataFrame,
+                                dirty: set, generation: int):
+        """Helper: Carry the progress summary over a frame patch (frame lock held)"""
+        from utils.data_processing import filter_by_keys
+        from utils.progress_summary import update_progress_summary
+
+        summary = self._progress_cache
+        if summary is None or summary[0] != cached[0]:
+            return
+        self._progress_cache = (generation, update_progress_summary(
+            summary[1], filter_by_keys(cached[1], dirty), filter_by_keys(frame, dirty)
+        ))
+
+    def get_progress_summary(self) -> Dict:
+        """Progress counts per (wave, project, metric) and per week, kept in step with qc_data
+
+        Built once from the parsed frame, then updated from the rows each
+        write changed (see utils.progress_summary). Do not modify the result.
+        """
+        from utils.progress_summary import summarize_progress
+
+        self.get_qc_dataframe(copy=False)
+        with self._frame_lock:
+            generation, frame = self._frame_cache
+            summary = self._progress_cache
+            if summary is None or summary[0] != generation:
+                summary = (generation, summarize_progress(frame))
+                self._progress_cache = summary
+            return summary[1]
+
+    def _patch_qc_frame(self, frame: pd.DataFrame, dirty: set) -> pd.DataFrame:
+        """Helper: Replace the rows of dirty (ID, wave) keys in a parsed frame"""
+        from utils.data_processing import parse_qc_metrics, filter_by_keys
+
+        keys = sorted(dirty)
+        if not keys:
+            return frame
+        # Keys go through batch_keys: no bound-parameter limit, and an index join
+        with self.read_connection() as conn:
+            self._stage_batch_keys(keys, conn.cursor())
+            fresh = parse_qc_metrics(self._read_qc_rows(
+                conn, "WHERE (q.ID, q.wave) IN (SELECT ID, wave FROM batch_keys)"
+            ))
+
+        kept = frame[~frame.index.isin(filter_by_keys(frame, keys).index)]
+        fresh_columns = set(fresh.columns)
+        fresh = fresh.drop(columns=[c for c in fresh.columns
+                                    if c in kept.columns and fresh[c].isna().all()])
+        parts = [part for part in (kept, fresh) if not part.empty]
+        patched = pd.concat(parts, ignore_index=True, sort=False) if parts else kept
+
+        # Metric columns no longer present on any row disappear, as after a reload
+        keep_columns = fresh_columns | set(['ID', 'wave'] + TABLE_CONFIG['fixed_qc_fields']
+                                           + TABLE_CONFIG['metadata_columns'])
+        empty = [c for c in patched.columns
+                 if c not in keep_columns and patched[c].isna().all()]
+        patched = patched.drop(columns=empty)
+        if patched.empty:
+            return patched
+        return patched.sort_values(['ID', 'wave'], kind='stable').reset_index(drop=True)
+
     def get_all_data_raw(self):
         """Get all QC data"""
-        conn = self.get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM qc_data ORDER BY ID, wave")
-            return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
+        with self.read_connection() as conn:
+            return self._read_qc_rows(conn)
     
     def get_subject_history(self, subject_id: str) -> List[Dict]:
         """Get all waves for a subject"""
-        conn = self.get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT * FROM qc_data WHERE ID = ? ORDER BY wave
-            """, (subject_id,))
-            return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
+        with self.read_connection() as conn:
+            return self._read_qc_rows(conn, "WHERE q.ID = ?", (subject_id,), "q.wave")
     
+    def get_metric_counts_by_wave(self, metric_key: str) -> Dict[str, int]:
+        """Count non-null values of one QC metric per wave"""
+        with self.read_connection() as conn:
+            if self.metric_storage == 'normalized':
+                rows = conn.execute("""
+                    SELECT wave, COUNT(*) FROM qc_metric_values
+                    WHERE metric_key = ? AND value IS NOT NULL
+                    GROUP BY wave ORDER BY wave
+                """, (metric_key,)).fetchall()
+            else:
+                rows = conn.execute("""
+                    SELECT wave, COUNT(json_extract(qc_metrics, '$."' || ? || '"'))
+                    FROM qc_data GROUP BY wave ORDER BY wave
+                """, (metric_key,)).fetchall()
+        return {row[0]: row[1] for row in rows if row[1]}
+
     def get_active_columns(self) -> List[Dict]:
         """Get all active column configurations"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             cur.execute("""
                 SELECT * FROM column_config WHERE is_active = 1 ORDER BY created_at
             """)
             return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
     
     def get_audit_log(self, subject_id: str = None, limit: int = 100) -> List[Dict]:
         """Get audit log"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             if subject_id:
                 cur.execute("""
@@ -342,16 +930,18 @@ class QCOperations(DatabaseBase):
                     ORDER BY updated_at DESC LIMIT ?
                 """, (limit,))
             return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
 
     def get_subject_tags(self, subject_id: str, wave: str) -> List[str]:
         """Get tags for a specific subject"""
-        record = self._get_qc_record(subject_id, wave)
-        if not record:
+        with self.read_connection() as conn:
+            row = conn.execute(
+                "SELECT tags FROM qc_data WHERE ID = ? AND wave = ?",
+                (subject_id, wave)
+            ).fetchone()
+        if not row:
             return []
         
-        tags_json = record.get('tags')
+        tags_json = row['tags']
         if tags_json:
             try:
                 return json.loads(tags_json)
@@ -359,7 +949,30 @@ class QCOperations(DatabaseBase):
                 return []
         return []
 
+    def get_tag_counts(self) -> Dict[str, int]:
+        """Get all tags with the number of subject/wave records carrying them"""
+        with self.read_connection() as conn:
+            rows = conn.execute("""
+                SELECT tag, COUNT(*) FROM subject_tags GROUP BY tag ORDER BY tag
+            """).fetchall()
+        return {row[0]: row[1] for row in rows}
 
+    def get_subjects_with_tags(self, tags: List[str], match: str = 'any') -> List[Tuple[str, str]]:
+        """Get (ID, wave) pairs having any ('any') or all ('all') of the given tags"""
+        tags = list(dict.fromkeys(t for t in tags if t))
+        if not tags:
+            return []
+        if match not in ('any', 'all'):
+            raise ValueError(f"Unknown match mode: {match}")
 
-
-
+        placeholders = ', '.join(['?' for _ in tags])
+        having = "HAVING COUNT(DISTINCT tag) = ?" if match == 'all' else ""
+        params = tags + [len(tags)] if match == 'all' else tags
+        with self.read_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT ID, wave FROM subject_tags
+                WHERE tag IN ({placeholders})
+                GROUP BY ID, wave {having}
+                ORDER BY ID, wave
+            """, params).fetchall()
+        return [(row[0], row[1]) for row in rows]
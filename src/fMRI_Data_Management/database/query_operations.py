@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from typing import List, Dict, Tuple, Any
+from database.base import DatabaseBase
+
+# Filtered row counts kept per data generation (server-side paging)
+COUNT_CACHE_ENTRIES = 64
+
+# Dash filter_query operators -> SQL comparison
+FILTER_OPERATORS = {
+    '=': '=', 'eq': '=', '!=': '!=', 'ne': '!=',
+    '<': '<', 'lt': '<', '<=': '<=', 'le': '<=',
+    '>': '>', 'gt': '>', '>=': '>=', 'ge': '>='
+}
+
+
+def _quote(column: str) -> str:
+    """Quote an identifier for SQL"""
+    return '"{}"'.format(column.replace('"', '""'))
+
+
+def _like_pattern(value: Any, prefix: str = '%', suffix: str = '%') -> str:
+    """Escape LIKE wildcards in a user value"""
+    text = str(value).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{prefix}{text}{suffix}"
+
+
+class QueryOperations(DatabaseBase):
+    """Server-side paging, sorting and filtering of table rows"""
+
+    def _row_source_sql(self, cur, table_name: str) -> Tuple[str, List]:
+        """Helper: SELECT producing display rows of a table (metrics expanded)"""
+        if table_name == 'qc_data':
+            from database.qc_operations import QCOperations
+            return QCOperations._qc_select_sql(self, cur, order_by="q.ID, q.wave",
+                                               expand_json=True)
+        return f"SELECT * FROM {_quote(table_name)}", []
+
+    def _filter_clauses(self, table_name: str, filters: Dict,
+                        columns: List[str]) -> Tuple[List[str], List]:
+        """Helper: WHERE clauses for the filter bar, quick filters and filter_query"""
+        from utils.filter_spec import FilterSpec
+        spec = FilterSpec.from_filters(filters, qc=table_name == 'qc_data')
+        clauses, params = [], []
+
+        for predicate in spec.predicates:
+            kind, arg = predicate[0], predicate[1]
+            if kind == 'id_contains':
+                clauses.append("CAST(ID AS TEXT) LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(arg))
+            elif kind == 'wave':
+                clauses.append("wave = ?")
+                params.append(arg)
+            elif kind == 'rescan':
+                clauses.append("rescan = ?")
+                params.append(arg)
+            elif kind == 'tag':
+                clauses.append("(ID, wave) IN (SELECT ID, wave FROM subject_tags WHERE tag = ?)")
+                params.append(arg)
+            elif kind == 'notes_contains':
+                clauses.append("notes LIKE ? ESCAPE '\\'")
+                params.append(_like_pattern(arg))
+            elif predicate == ('quick', 'rescan'):
+                clauses.append("rescan = 1")
+            elif predicate == ('quick', 'notes'):
+                clauses.append("notes IS NOT NULL AND notes != ''")
+            elif predicate == ('quick', 'week'):
+                clauses.append("created_at > ?")
+                params.append(str(datetime.now() - timedelta(days=7)))
+            elif kind == 'condition':
+                _, column, operator, value = predicate
+                if column not in columns:
+                    continue
+                col = _quote(column)
+                if operator in FILTER_OPERATORS:
+                    clauses.append(f"{col} {FILTER_OPERATORS[operator]} ?")
+                    params.append(value)
+                elif operator == 'contains':
+                    clauses.append(f"CAST({col} AS TEXT) LIKE ? ESCAPE '\\'")
+                    params.append(_like_pattern(value))
+                elif operator == 'datestartswith':
+                    clauses.append(f"CAST({col} AS TEXT) LIKE ? ESCAPE '\\'")
+                    params.append(_like_pattern(value, prefix=''))
+                elif operator == 'is blank':
+                    clauses.append(f"({col} IS NULL OR {col} = '')")
+                elif operator == 'is not blank':
+                    clauses.append(f"({col} IS NOT NULL AND {col} != '')")
+
+        return clauses, params
+
+    def _count_rows(self, cur, table_name: str, source_sql: str, source_params: List,
+                    where: str, params: List) -> int:
+        """Helper: COUNT(*) of filtered rows, cached per (data generation, filter)"""
+        generation = self._generation
+        key = (generation, table_name, where, tuple(params))
+        with self._count_lock:
+            total = self._count_cache.get(key)
+        if total is not None:
+            return total
+
+        cur.execute(f"SELECT COUNT(*) FROM ({source_sql}) {where}", source_params + params)
+        total = cur.fetchone()[0]
+        with self._count_lock:
+            # Counts of older generations are stale; keep the cache small
+            self._count_cache = {k: v for k, v in self._count_cache.items()
+                                 if k[0] == generation}
+            if len(self._count_cache) >= COUNT_CACHE_ENTRIES:
+                self._count_cache.clear()
+            self._count_cache[key] = total
+        return total
+
+    def query_table(self, table_name: str, filters: Dict = None,
+                    sort_by: List[Dict] = None, page_current: int = None,
+                    page_size: int = None) -> Tuple[List[Dict], int, List[str]]:
+        """Get one page (or, without page_size, all) of filtered, sorted rows
+
+        Returns (rows, total_matching_rows, columns). The row count is cached
+        per data generation and filter, so paging and sorting only run the
+        page query.
+        """
+        filters = filters or {}
+        with self.read_connection() as conn:
+            cur = conn.cursor()
+            source_sql, source_params = self._row_source_sql(cur, table_name)
+
+            cur.execute(f"SELECT * FROM ({source_sql}) LIMIT 0", source_params)
+            columns = [d[0] for d in cur.description]
+
+            clauses, params = self._filter_clauses(table_name, filters, columns)
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+            order = [
+                f"{_quote(s['column_id'])} {'DESC' if s.get('direction') == 'desc' else 'ASC'}"
+                for s in sort_by or [] if s.get('column_id') in columns
+            ]
+            if not order:
+                if 'row_id' in columns:
+                    order = ['row_id']
+                elif {'ID', 'wave'} <= set(columns):
+                    order = ['ID', 'wave']
+            order_sql = f"ORDER BY {', '.join(order)}" if order else ""
+
+            total = self._count_rows(cur, table_name, source_sql, source_params,
+                                     where, params)
+
+            limit_sql = ""
+            if page_size:
+                limit_sql = "LIMIT ? OFFSET ?"
+                params = params + [int(page_size), int(page_current or 0) * int(page_size)]
+
+            cur.execute(f"SELECT * FROM ({source_sql}) {where} {order_sql} {limit_sql}",
+                        source_params + params)
+            rows = [dict(row) for row in cur.fetchall()]
+
+        return rows, total, columns
+
+    def get_distinct_values(self, table_name: str, column: str) -> List:
+        """Get sorted distinct non-null values of one column"""
+        with self.read_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"PRAGMA table_info({_quote(table_name)})")
+            if column not in {row[1] for row in cur.fetchall()}:
+                return []
+            cur.execute(f"""
+                SELECT DISTINCT {_quote(column)} FROM {_quote(table_name)}
+                WHERE {_quote(column)} IS NOT NULL ORDER BY 1
+            """)
+            return [row[0] for row in cur.fetchall()]
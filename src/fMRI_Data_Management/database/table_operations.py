@@ -1,9 +1,11 @@
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Callable
 from database.base import DatabaseBase
-from config.constants import TABLE_CONFIG
+from database.migrations import create_secondary_table_indexes
+from config.constants import TABLE_CONFIG, DB_CONFIG
 
 #TODO: Optimize the logic for database table operations
 
@@ -12,66 +14,63 @@ class TableOperations(DatabaseBase):
     
     def cleanup_registry(self):
         """Remove orphaned entries from table_registry"""
-        self.cursor.execute("SELECT table_name FROM table_registry")
-        registered_tables = [row[0] for row in self.cursor.fetchall()]
-        
-        self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        actual_tables = [row[0] for row in self.cursor.fetchall()]
-        
-        orphaned = set(registered_tables) - set(actual_tables)
-        for table_name in orphaned:
-            if table_name != 'qc_data':
-                print(f"[INFO] Removing orphaned registry entry: {table_name}")
-                self.cursor.execute("DELETE FROM table_registry WHERE table_name = ?", (table_name,))
-        
-        self.conn.commit()
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            cur.execute("SELECT table_name FROM table_registry")
+            registered_tables = [row[0] for row in cur.fetchall()]
+
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            actual_tables = [row[0] for row in cur.fetchall()]
+
+            orphaned = set(registered_tables) - set(actual_tables)
+            for table_name in orphaned:
+                if table_name != 'qc_data':
+                    print(f"[INFO] Removing orphaned registry entry: {table_name}")
+                    cur.execute("DELETE FROM table_registry WHERE table_name = ?", (table_name,))
+
         return len(orphaned)
     
     def get_all_tables(self) -> List[Dict]:
         """Get all registered tables that actually exist"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             cur.execute("SELECT * FROM table_registry ORDER BY is_primary DESC, created_at")
             registered_tables = [dict(row) for row in cur.fetchall()]
-            
-            valid_tables = []
-            for table_info in registered_tables:
-                table_name = table_info.get('table_name')
-                if not table_name:
-                    continue
-                
-                cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name=?", 
-                    (table_name,)
-                )
-                
-                if cur.fetchone():
-                    valid_tables.append(table_info)
-                else:
-                    print(f"[WARNING] Removing orphaned registry entry: {table_name}")
-                    cur.execute("DELETE FROM table_registry WHERE table_name = ?", (table_name,))
-            
-            conn.commit()
-            return valid_tables
-        finally:
-            conn.close()
+
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            actual_tables = {row[0] for row in cur.fetchall()}
+
+        valid_tables = []
+        orphaned = []
+        for table_info in registered_tables:
+            table_name = table_info.get('table_name')
+            if not table_name:
+                continue
+
+            if table_name in actual_tables:
+                valid_tables.append(table_info)
+            else:
+                print(f"[WARNING] Removing orphaned registry entry: {table_name}")
+                orphaned.append((table_name,))
+
+        if orphaned:
+            with self.transaction() as cur:
+                self._mark_dirty([])
+                cur.executemany("DELETE FROM table_registry WHERE table_name = ?", orphaned)
+
+        return valid_tables
     
     def get_table_info(self, table_name: str) -> Optional[Dict]:
         """Get information about a specific table"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             cur.execute("SELECT * FROM table_registry WHERE table_name = ?", (table_name,))
             row = cur.fetchone()
             return dict(row) if row else None
-        finally:
-            conn.close()
     
     def get_table_data(self, table_name: str) -> List[Dict]:
         """Get all data from a specific table"""
-        conn = self.get_connection()
-        try:
+        with self.read_connection() as conn:
             cur = conn.cursor()
             
             # Verify table exists
@@ -83,32 +82,39 @@ class TableOperations(DatabaseBase):
             if not cur.fetchone():
                 print(f"[ERROR] Table '{table_name}' does not exist")
                 return []
+
+            if table_name == 'qc_data':
+                from database.qc_operations import QCOperations
+                return QCOperations._read_qc_rows(self, conn, order_by="q.rowid")
             
             cur.execute(f"SELECT * FROM {table_name}")
             return [dict(row) for row in cur.fetchall()]
-        finally:
-            conn.close()
     
     def get_subject_all_tables_data(self, subject_id: str) -> Dict[str, List[Dict]]:
         """Get data for a subject across ALL tables"""
         result = {}
         tables = self.get_all_tables()
         
-        for table_info in tables:
-            table_name = table_info['table_name']
-            
-            conn = self.get_connection()
-            try:
-                cur = conn.cursor()
-                query = f"SELECT * FROM {table_name} WHERE ID = ? ORDER BY wave"
-                cur.execute(query, (subject_id,))
-                rows = cur.fetchall()
-                result[table_name] = [dict(row) for row in rows]
-            except Exception as e:
-                print(f"[WARNING] Error querying table {table_name}: {e}")
-                result[table_name] = []
-            finally:
-                conn.close()
+        with self.read_connection() as conn:
+            for table_info in tables:
+                table_name = table_info['table_name']
+
+                try:
+                    if table_name == 'qc_data':
+                        from database.qc_operations import QCOperations
+                        result[table_name] = QCOperations._read_qc_rows(
+                            self, conn, "WHERE q.ID = ?", (subject_id,), "q.wave"
+                        )
+                        continue
+
+                    cur = conn.cursor()
+                    query = f"SELECT * FROM {table_name} WHERE ID = ? ORDER BY wave"
+                    cur.execute(query, (subject_id,))
+                    rows = cur.fetchall()
+                    result[table_name] = [dict(row) for row in rows]
+                except Exception as e:
+                    print(f"[WARNING] Error querying table {table_name}: {e}")
+                    result[table_name] = []
         
         return result
     
@@ -116,12 +122,13 @@ class TableOperations(DatabaseBase):
                       primary_keys: List[str], description: str = None, 
                       user: str = "user"):
         """Register a new table in the registry"""
-        self.cursor.execute("""
-            INSERT OR REPLACE INTO table_registry 
-            (table_name, display_name, description, primary_keys, created_by)
-            VALUES (?, ?, ?, ?, ?)
-        """, (table_name, display_name, description, json.dumps(primary_keys), user))
-        self.conn.commit()
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            cur.execute("""
+                INSERT OR REPLACE INTO table_registry 
+                (table_name, display_name, description, primary_keys, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            """, (table_name, display_name, description, json.dumps(primary_keys), user))
     
     def delete_table(self, table_name: str):
         """Delete a secondary table"""
@@ -129,13 +136,13 @@ class TableOperations(DatabaseBase):
             raise ValueError("Cannot delete primary QC data table")
         
         try:
-            self.cursor.execute("DELETE FROM table_registry WHERE table_name = ?", (table_name,))
-            self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-            self.conn.commit()
+            with self.transaction() as cur:
+                self._mark_dirty([])
+                cur.execute("DELETE FROM table_registry WHERE table_name = ?", (table_name,))
+                cur.execute(f"DROP TABLE IF EXISTS {table_name}")
             print(f"[INFO] Successfully deleted table: {table_name}")
         except Exception as e:
             print(f"[ERROR] Failed to delete table {table_name}: {e}")
-            self.conn.rollback()
             raise
     
     def create_table_from_dataframe(self, table_name: str, df: pd.DataFrame,
@@ -143,8 +150,62 @@ class TableOperations(DatabaseBase):
                                     display_name: str = None,
                                     description: str = None,
                                     user: str = "user",
-                                    overwrite: bool = False) -> Dict:
-        """Create a new table from DataFrame with auto-increment row_id"""
+                                    overwrite: bool = False,
+                                    chunk_size: int = None,
+                                    progress_callback: Callable[[int, int], None] = None) -> Dict:
+        """Create a new table from DataFrame with auto-increment row_id
+
+        progress_callback(rows_done, rows_total) is called after each chunk.
+        """
+        return self._create_table_from_frames(
+            table_name, [df], display_name, description, user, overwrite,
+            chunk_size, progress_callback, rows_total=len(df)
+        )
+    
+    def create_table_from_csv(self, table_name: str, csv_path: str,
+                              display_name: str = None,
+                              description: str = None,
+                              user: str = "user",
+                              overwrite: bool = False,
+                              defaults: Dict = None,
+                              chunk_size: int = None,
+                              progress_callback: Callable[[int, int], None] = None,
+                              rows_total: int = None) -> Dict:
+        """Create a new table by streaming a CSV file in chunks (flat memory)
+
+        defaults fills columns missing from the file (e.g. wave, projects).
+        The column types are taken from the first chunk.
+        """
+        chunk_size = chunk_size or DB_CONFIG['import_chunk_size']
+        
+        def frames():
+            chunks = pd.read_csv(csv_path, chunksize=chunk_size)
+            first = True
+            for chunk in chunks:
+                first = False
+                yield self._fill_defaults(chunk, defaults)
+            if first:
+                # Header-only file: still create the (empty) table
+                yield self._fill_defaults(pd.read_csv(csv_path, nrows=0), defaults)
+        
+        return self._create_table_from_frames(
+            table_name, frames(), display_name, description, user, overwrite,
+            chunk_size, progress_callback, rows_total=rows_total
+        )
+    
+    @staticmethod
+    def _fill_defaults(df: pd.DataFrame, defaults: Dict = None) -> pd.DataFrame:
+        """Helper: Add missing columns with a constant value"""
+        missing = {col: value for col, value in (defaults or {}).items()
+                   if col not in df.columns}
+        return df.assign(**missing) if missing else df
+    
+    def _create_table_from_frames(self, table_name: str, frames, display_name: str,
+                                  description: str, user: str, overwrite: bool,
+                                  chunk_size: int = None,
+                                  progress_callback: Callable[[int, int], None] = None,
+                                  rows_total: int = None) -> Dict:
+        """Helper: Create and fill a table from an iterable of DataFrames (one transaction)"""
         if not display_name:
             display_name = table_name.replace('_', ' ').title()
         
@@ -159,8 +220,8 @@ class TableOperations(DatabaseBase):
                 counter += 1
             display_name = f"{display_name} ({counter-1})"
         
-        if existing_info and overwrite:
-            self.delete_table(table_name)
+        frames = iter(frames)
+        df = next(frames)
         
         # Ensure required columns
         if 'wave' not in df.columns:
@@ -169,10 +230,8 @@ class TableOperations(DatabaseBase):
             raise ValueError("DataFrame must contain 'projects' column")
         
         # Remove metadata columns if they exist
-        df_cleaned = df.drop(
-            columns=[col for col in TABLE_CONFIG['metadata_columns'] if col in df.columns], 
-            errors='ignore'
-        )
+        metadata_columns = [col for col in TABLE_CONFIG['metadata_columns'] if col in df.columns]
+        df_cleaned = df.drop(columns=metadata_columns, errors='ignore')
         
         # Build column definitions
         column_defs = ["row_id INTEGER PRIMARY KEY AUTOINCREMENT"]
@@ -196,30 +255,34 @@ class TableOperations(DatabaseBase):
             "updated_by TEXT"
         ])
         
-        # Create table
-        create_sql = f"CREATE TABLE {table_name} ({', '.join(column_defs)})"
-        self.cursor.execute(create_sql)
-        
-        # Register table
-        self.register_table(table_name, display_name, ['row_id'], description, user)
-        
-        # Import data
-        rows_imported = 0
-        for _, row in df_cleaned.iterrows():
-            cols = list(df_cleaned.columns)
-            placeholders = ', '.join(['?' for _ in cols])
-            values = [row[col] for col in cols]
-            values.extend([datetime.now(), datetime.now(), user])
+        # Drop, create, index, register and load are one transaction: a failed
+        # load (bad chunk, callback error) leaves no table behind and keeps the
+        # table being overwritten
+        with self.transaction() as cur:
+            self._mark_dirty([])
+            if existing_info and overwrite:
+                self.delete_table(table_name)
             
-            insert_sql = f"""
-                INSERT INTO {table_name} 
-                ({', '.join(cols)}, created_at, updated_at, updated_by)
-                VALUES ({placeholders}, ?, ?, ?)
-            """
-            self.cursor.execute(insert_sql, values)
-            rows_imported += 1
-        
-        self.conn.commit()
+            # Create table
+            create_sql = f"CREATE TABLE {table_name} ({', '.join(column_defs)})"
+            cur.execute(create_sql)
+            create_secondary_table_indexes(cur, table_name)
+
+            # Register table
+            self.register_table(table_name, display_name, ['row_id'], description, user)
+
+            # Import data
+            rows_imported = 0
+            while df_cleaned is not None:
+                rows_imported += self._bulk_insert_dataframe(
+                    table_name, df_cleaned, user, chunk_size=chunk_size,
+                    progress_callback=progress_callback,
+                    rows_done=rows_imported, rows_total=rows_total
+                )
+                df = next(frames, None)
+                df_cleaned = None if df is None else df.drop(
+                    columns=[col for col in metadata_columns if col in df.columns]
+                )
         
         return {
             'success': True,
@@ -228,6 +291,53 @@ class TableOperations(DatabaseBase):
             'table_name': table_name
         }
     
+    def _bulk_insert_dataframe(self, table_name: str, df: pd.DataFrame, user: str,
+                               chunk_size: int = None,
+                               progress_callback: Callable[[int, int], None] = None,
+                               rows_done: int = 0, rows_total: int = None) -> int:
+        """Helper: Insert DataFrame rows with executemany in chunks (caller holds the transaction)
+
+        Values are converted to Python types column by column (NaN -> NULL).
+        rows_done/rows_total offset the progress reports when a table is
+        loaded in several frames.
+        """
+        chunk_size = chunk_size or DB_CONFIG['import_chunk_size']
+        if rows_total is None:
+            rows_total = rows_done + len(df)
+        
+        cols = list(df.columns)
+        insert_sql = f"""
+            INSERT INTO {table_name} 
+            ({', '.join(cols)}, created_at, updated_at, updated_by)
+            VALUES ({', '.join(['?'] * len(cols))}, ?, ?, ?)
+        """
+        now = datetime.now()
+        metadata = (now, now, user)
+        
+        # sqlite3 cannot bind pandas Timestamps
+        datetime_cols = [col for col in cols if pd.api.types.is_datetime64_any_dtype(df[col])]
+        if datetime_cols:
+            df = df.assign(**{col: df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+                              for col in datetime_cols})
+        
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            # Column-wise conversion: numpy numeric columns go straight to
+            # Python scalars (SQLite stores NaN as NULL); others map NA -> None
+            values = []
+            for col in cols:
+                series = chunk[col]
+                if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+                    values.append(series.tolist())
+                else:
+                    values.append(series.astype(object).where(series.notna(), None).tolist())
+            values.extend([[item] * len(chunk) for item in metadata])
+            self.cursor.executemany(insert_sql, zip(*values))
+            if progress_callback:
+                progress_callback(rows_done + start + len(chunk), rows_total)
+        
+        return len(df)
+    
     def update_secondary_table_field(self, table_name: str, 
                                     subject_id: str, wave: str,
                                     field_name: str, new_value: any,
@@ -239,26 +349,71 @@ class TableOperations(DatabaseBase):
             return QCOperations.update_field(self, subject_id, wave, field_name, new_value, user)
         
         try:
-            self.cursor.execute(f"""
-                UPDATE {table_name} 
-                SET {field_name} = ?, updated_at = ?, updated_by = ?
-                WHERE ID = ? AND wave = ?
-            """, (new_value, datetime.now(), user, subject_id, wave))
-            self.conn.commit()
+            with self.transaction() as cur:
+                self._mark_dirty([])
+                cur.execute(f"""
+                    UPDATE {table_name} 
+                    SET {field_name} = ?, updated_at = ?, updated_by = ?
+                    WHERE ID = ? AND wave = ?
+                """, (new_value, datetime.now(), user, subject_id, wave))
             return True
         except Exception as e:
             print(f"Error updating {table_name}: {e}")
             return False
     
+    def update_secondary_table_cells(self, table_name: str, changes: List[tuple],
+                                     user: str = "user") -> int:
+        """Apply (row_id, subject_id, wave, field_name, new_value) edits in one transaction
+
+        Rows are matched by row_id when given, otherwise by ID + wave.
+        """
+        if table_name == 'qc_data':
+            raise ValueError("Use QCOperations for qc_data table")
+        
+        # One executemany per (field, key kind)
+        grouped = {}
+        now = datetime.now()
+        for row_id, subject_id, wave, field_name, new_value in changes:
+            if row_id:
+                grouped.setdefault((field_name, 'row_id'), []).append(
+                    (new_value, now, user, row_id))
+            else:
+                grouped.setdefault((field_name, 'ID'), []).append(
+                    (new_value, now, user, subject_id, wave))
+        
+        try:
+            with self.transaction() as cur:
+                self._mark_dirty([])
+                for (field_name, key), rows in grouped.items():
+                    where = "row_id = ?" if key == 'row_id' else "ID = ? AND wave = ?"
+                    cur.executemany(f"""
+                        UPDATE {table_name} 
+                        SET {field_name} = ?, updated_at = ?, updated_by = ?
+                        WHERE {where}
+                    """, rows)
+            return len(changes)
+        except Exception as e:
+            print(f"Error updating {table_name}: {e}")
+            return 0
+    
     def export_to_csv(self, output_path: str, subject_ids: List[str] = None, 
                      table_name: str = 'qc_data'):
         """Export table data to CSV"""
-        if subject_ids:
-            placeholders = ','.join(['?' for _ in subject_ids])
-            query = f"SELECT * FROM {table_name} WHERE ID IN ({placeholders})"
-            df = pd.read_sql(query, self.conn, params=subject_ids)
-        else:
-            df = pd.read_sql(f"SELECT * FROM {table_name}", self.conn)
+        with self.read_connection() as conn:
+            if table_name == 'qc_data' and self.metric_storage == 'normalized':
+                # Metrics are pivoted in SQL; no qc_metrics JSON to expand
+                from database.qc_operations import QCOperations
+                where, params = "", ()
+                if subject_ids:
+                    where = f"WHERE q.ID IN ({','.join(['?' for _ in subject_ids])})"
+                    params = tuple(subject_ids)
+                df = pd.DataFrame(QCOperations._read_qc_rows(self, conn, where, params, "q.rowid"))
+            elif subject_ids:
+                placeholders = ','.join(['?' for _ in subject_ids])
+                query = f"SELECT * FROM {table_name} WHERE ID IN ({placeholders})"
+                df = pd.read_sql(query, conn, params=subject_ids)
+            else:
+                df = pd.read_sql(f"SELECT * FROM {table_name}", conn)
         
         # Process QC data
         if table_name == 'qc_data':
@@ -277,22 +432,23 @@ class TableOperations(DatabaseBase):
         df.to_csv(output_path, index=False)
         return len(df)
 
-def update_secondary_table_field_by_rowid(self, table_name: str, 
-                                          row_id: int,
-                                          field_name: str, new_value: any,
-                                          user: str = "user") -> bool:
-    """Update field in secondary table using row_id (more precise than ID+wave)"""
-    if table_name == 'qc_data':
-        raise ValueError("Use QCOperations for qc_data table")
-    
-    try:
-        self.cursor.execute(f"""
-            UPDATE {table_name} 
-            SET {field_name} = ?, updated_at = ?, updated_by = ?
-            WHERE row_id = ?
-        """, (new_value, datetime.now(), user, row_id))
-        self.conn.commit()
-        return True
-    except Exception as e:
-        print(f"Error updating {table_name} row_id={row_id}: {e}")
-        return False
\ No newline at end of file
+    def update_secondary_table_field_by_rowid(self, table_name: str, 
+                                              row_id: int,
+                                              field_name: str, new_value: any,
+                                              user: str = "user") -> bool:
+        """Update field in secondary table using row_id (more precise than ID+wave)"""
+        if table_name == 'qc_data':
+            raise ValueError("Use QCOperations for qc_data table")
+        
+        try:
+            with self.transaction() as cur:
+                self._mark_dirty([])
+                cur.execute(f"""
+                    UPDATE {table_name} 
+                    SET {field_name} = ?, updated_at = ?, updated_by = ?
+                    WHERE row_id = ?
+                """, (new_value, datetime.now(), user, row_id))
+            return True
+        except Exception as e:
+            print(f"Error updating {table_name} row_id={row_id}: {e}")
+            return False
@@ -3,19 +3,48 @@ from utils.data_processing import (
     extract_tags_from_string,
     tags_to_json,
     get_all_unique_tags,
+    filter_by_keys,
     filter_dataframe_by_criteria,
     apply_quick_filter,
+    parse_filter_query,
+    resolve_active_row,
+    row_key,
+    diff_table_edits,
+    resolve_filtered_data,
     prepare_export_dataframe
 )
 
 from utils.file_operations import (
     decode_uploaded_file,
+    save_uploaded_file,
+    read_csv_preview,
+    upload_token,
+    resolve_upload,
+    discard_upload,
+    prune_uploads,
     prepare_temp_csv,
     cleanup_temp_file,
     export_dataframe_to_csv,
     read_csv_safe
 )
 
+from utils.result_cache import (
+    ResultCache,
+    FigureCache,
+    MaskCache,
+    filter_fingerprint
+)
+
+from utils.filter_spec import FilterSpec
+
+from utils.progress import ProgressTracker
+
+from utils.progress_summary import (
+    summarize_progress,
+    update_progress_summary,
+    metric_counts_by_wave
+)
+
 from utils.validators import (
     validate_subject_input,
     validate_table_name,
@@ -29,6 +58,7 @@ try:
         create_radar_chart,
         create_waffle_chart,
         create_time_series_chart,
+        create_pipeline_completion_chart,
         get_summary_stats
     )
     __all_plots__ = [
@@ -36,6 +66,7 @@ try:
         'create_radar_chart',
         'create_waffle_chart',
         'create_time_series_chart',
+        'create_pipeline_completion_chart',
         'get_summary_stats'
     ]
 except ImportError:
@@ -48,17 +79,42 @@ __all__ = [
     'extract_tags_from_string',
     'tags_to_json',
     'get_all_unique_tags',
+    'filter_by_keys',
     'filter_dataframe_by_criteria',
     'apply_quick_filter',
+    'parse_filter_query',
+    'resolve_active_row',
+    'row_key',
+    'diff_table_edits',
+    'resolve_filtered_data',
     'prepare_export_dataframe',
     
     # File operations
     'decode_uploaded_file',
+    'save_uploaded_file',
+    'read_csv_preview',
+    'upload_token',
+    'resolve_upload',
+    'discard_upload',
+    'prune_uploads',
     'prepare_temp_csv',
     'cleanup_temp_file',
     'export_dataframe_to_csv',
     'read_csv_safe',
     
+    # Result cache
+    'ResultCache',
+    'FigureCache',
+    'MaskCache',
+    'filter_fingerprint',
+    'FilterSpec',
+    
+    # Progress
+    'ProgressTracker',
+    'summarize_progress',
+    'update_progress_summary',
+    'metric_counts_by_wave',
+    
     # Validators
     'validate_subject_input',
     'validate_table_name',
@@ -1,7 +1,28 @@
 import yaml
 import os
+import re
 import glob
+import fnmatch
+import string
+import sys
+import time
+import sqlite3
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+# Checks are I/O bound (network storage); threads overlap the directory walks
+DEFAULT_MAX_WORKERS = 8
+
+# Watch mode: seconds between polls, or the longest wait for inotify events
+WATCH_INTERVAL = 30.0
+
+# Directories modified this recently are not trusted as unchanged on the next run
+MTIME_SETTLE_SECONDS = 2.0
 
 def load_config(path):
     with open(path) as f:
@@ -10,13 +31,215 @@ def load_config(path):
 def safe_glob(pattern):
     return glob.glob(pattern, recursive=True)
 
-def count_check(base_dir, subject, session, rule):
+class DirectoryIndex:
+    """In-memory listing of directory trees, walked once with os.scandir
+
+    glob() evaluates glob patterns against the listing with fnmatch, so
+    many rules over overlapping roots cost one walk instead of one glob
+    each. Paths outside the indexed roots fall back to glob.glob.
+
+    With a cache ({path: (mtime, files, subdirs)}, e.g. from a previous
+    run), a directory whose mtime is unchanged is only stat'ed, not listed.
+    """
+
+    def __init__(self, cache=None):
+        self.dirs = {}      # dir path -> (file names, subdir names)
+        self.mtimes = {}    # dir path -> mtime recorded for the cache
+        self.roots = []
+        self.cache = cache or {}
+        self.listed = 0     # directories actually read with scandir
+
+    def add_roots(self, roots, max_workers=DEFAULT_MAX_WORKERS):
+        # Nested roots are covered by their parent's walk
+        roots = sorted({os.path.normpath(r) for r in roots})
+        roots = [r for r in roots if not self._covers(r)]
+        roots = [r for i, r in enumerate(roots)
+                 if not any(self._is_under(r, other) for other in roots[:i])]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for listing, mtimes, listed in pool.map(self._walk, roots):
+                self.dirs.update(listing)
+                self.mtimes.update(mtimes)
+                self.listed += listed
+        self.roots.extend(roots)
+
+    @staticmethod
+    def _is_under(path, root):
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    def _covers(self, path):
+        return any(self._is_under(path, root) for root in self.roots)
+
+    def _walk(self, root, skip=()):
+        # Subdirectories in skip (already indexed) are not descended into
+        listing, mtimes, listed, stack = {}, {}, 0, [root]
+        now = time.time()
+        while stack:
+            top = stack.pop()
+            try:
+                mtime = os.stat(top).st_mtime
+            except OSError:
+                continue
+            cached = self.cache.get(top)
+            if cached is not None and cached[0] == mtime:
+                files, subdirs = list(cached[1]), list(cached[2])
+            else:
+                files, subdirs = [], []
+                try:
+                    with os.scandir(top) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=True):
+                                subdirs.append(entry.name)
+                            else:
+                                files.append(entry.name)
+                except OSError:
+                    continue
+                listed += 1
+            # A directory changed within the mtime granularity is re-listed next time
+            mtimes[top] = mtime if now - mtime > MTIME_SETTLE_SECONDS else -1.0
+            listing[top] = (files, subdirs)
+            stack.extend(path for path in (os.path.join(top, sub) for sub in subdirs)
+                         if path not in skip)
+        return listing, mtimes, listed
+
+    def refresh(self, paths):
+        # Re-read changed directories in place (new subdirectories are walked);
+        # returns the directories whose listing was added, changed or removed
+        updated = set()
+        for path in sorted({os.path.normpath(p) for p in paths}):
+            if not self._covers(path):
+                continue
+            old = self.dirs.get(path)
+            listing, mtimes, listed = self._walk(path, skip=self.dirs)
+            self.listed += listed
+            if path not in listing:
+                gone = [d for d in self.dirs if self._is_under(d, path)]
+            else:
+                kept = set(listing[path][1])
+                gone = [d for d in self.dirs
+                        for sub in (old[1] if old else ()) if sub not in kept
+                        if self._is_under(d, os.path.join(path, sub))]
+            for d in gone:
+                self.dirs.pop(d, None)
+                self.mtimes.pop(d, None)
+            updated.update(gone)
+            for d, entry in listing.items():
+                if self.dirs.get(d) != entry:
+                    updated.add(d)
+            self.dirs.update(listing)
+            self.mtimes.update(mtimes)
+        return updated
+
+    def listings(self):
+        # {path: (mtime, files, subdirs)}, the cache format of DirectoryIndex
+        return {path: (self.mtimes[path],) + tuple(entry) for path, entry in self.dirs.items()}
+
+    def changed_listings(self):
+        # Listings that differ from the cache: {path: (mtime, files, subdirs)}
+        changed = {}
+        for path, (files, subdirs) in self.dirs.items():
+            entry = (self.mtimes[path], files, subdirs)
+            cached = self.cache.get(path)
+            if cached is None or tuple(cached) != entry:
+                changed[path] = entry
+        return changed
+
+    def removed_paths(self):
+        # Cached directories under the indexed roots that no longer exist
+        return [path for path in self.cache if self._covers(path) and path not in self.dirs]
+
+    def stat(self, path):
+        # (mtime, file count) of an indexed directory; (None, None) if unknown
+        path = os.path.normpath(path)
+        if path not in self.dirs:
+            return None, None
+        return self.mtimes[path], len(self.dirs[path][0])
+
+    def glob(self, pattern):
+        pattern = os.path.normpath(pattern)
+        if not self._covers(pattern):
+            return safe_glob(pattern)
+        parts = pattern.split(os.sep)
+        literal = 0
+        while literal < len(parts) and not glob.has_magic(parts[literal]):
+            literal += 1
+        base = os.sep.join(parts[:literal]) or os.sep
+        if literal == len(parts):
+            parent, name = os.path.split(base)
+            files, subdirs = self.dirs.get(parent, ((), ()))
+            return [base] if base in self.dirs or name in files else []
+        return self._match(base, parts[literal:])
+
+    def _match(self, directory, parts):
+        if directory not in self.dirs:
+            return []
+        files, subdirs = self.dirs[directory]
+        head, rest = parts[0], parts[1:]
+        if head == "**" and not rest:
+            # Trailing "**": the directory and everything below it
+            matches, stack = [directory], [directory]
+            while stack:
+                top = stack.pop()
+                below_files, below_subdirs = self.dirs.get(top, ((), ()))
+                for n in below_files + below_subdirs:
+                    if not n.startswith("."):
+                        matches.append(os.path.join(top, n))
+                stack.extend(os.path.join(top, n) for n in below_subdirs
+                             if not n.startswith("."))
+            return matches
+        if head == "**":
+            # Zero or more directories (glob recursive=True)
+            matches = self._match(directory, rest)
+            for sub in subdirs:
+                if not sub.startswith("."):
+                    matches.extend(self._match(os.path.join(directory, sub), parts))
+            return matches
+        names = (files + subdirs) if not rest else subdirs
+        names = [n for n in fnmatch.filter(names, head)
+                 if head.startswith(".") or not n.startswith(".")]
+        if not rest:
+            return [os.path.join(directory, n) for n in names]
+        matches = []
+        for n in names:
+            sub_path = os.path.join(directory, n)
+            if glob.has_magic(rest[0]) or len(rest) > 1:
+                matches.extend(self._match(sub_path, rest))
+            else:
+                files_below, subdirs_below = self.dirs.get(sub_path, ((), ()))
+                if rest[0] in files_below or rest[0] in subdirs_below:
+                    matches.append(os.path.join(sub_path, rest[0]))
+        return matches
+
+def rule_roots(config, work_dir, prefix=""):
+    # Directory above the first subject/session-specific part of each output_path
+    roots = set()
+    for conf in config.values():
+        template = conf["output_path"]
+        cut = len(template)
+        position = 0
+        for literal, field, _, _ in string.Formatter().parse(template):
+            position += len(literal)
+            if field in ("subject", "session"):
+                cut = position
+                break
+            if field is not None:
+                position += len(field) + 2
+        static = template[:cut].format(work_dir=work_dir, prefix=prefix)
+        roots.add(os.path.dirname(static) if cut < len(template) else static)
+    return roots
+
+def build_index(config, work_dir, prefix="", max_workers=DEFAULT_MAX_WORKERS, cache=None):
+    index = DirectoryIndex(cache)
+    index.add_roots(rule_roots(config, work_dir, prefix), max_workers)
+    return index
+
+def count_check(base_dir, subject, session, rule, index=None):
+    find = index.glob if index is not None else safe_glob
     results = []
     for dt, spec in rule.get("data_types", {}).items():
         pattern = spec["pattern"]
         expected = spec.get("expected_count", 0)
         tol = spec.get("tolerance", 0)
-        files = safe_glob(os.path.join(base_dir, pattern))
+        files = find(os.path.join(base_dir, pattern))
         cnt = len(files)
         diff = cnt - expected
         status = "PASS" if abs(diff) <= tol else f"EXCEEDS_EXPECTATION_ON_{dt}" if diff > tol else f"FAIL_ON_{dt}"
@@ -34,10 +257,11 @@ def count_check(base_dir, subject, session, rule):
         })
     return results
 
-def required_files_check(task, path, files, subject, session):
+def required_files_check(task, path, files, subject, session, index=None):
+    find = index.glob if index is not None else safe_glob
     results = []
     for f in files:
-        exists = bool(safe_glob(os.path.join(path, f)))
+        exists = bool(find(os.path.join(path, f)))
         results.append({
             "task": task,
             "subject": subject,
@@ -48,16 +272,263 @@ def required_files_check(task, path, files, subject, session):
         })
     return results
 
-def perform_checks(config, work_dir, subject, session, prefix=""):
+def perform_checks(config, work_dir, subject, session, prefix="", index=None):
     all_results = []
     for task, conf in config.items():
-        path = conf["output_path"].format(work_dir=work_dir, subject=subject, session=session, prefix=prefix)
+        fields = dict(work_dir=work_dir, subject=subject, session=session, prefix=prefix)
+        path = conf["output_path"].format(**fields)
+        results = []
         if "raw_count_check" in conf and conf["raw_count_check"].get("enabled", False):
-            all_results.extend(count_check(path, subject, session, conf["raw_count_check"]))
+            results.extend(count_check(path, subject, session, conf["raw_count_check"], index))
         if "required_files" in conf:
-            all_results.extend(required_files_check(task, path, conf["required_files"], subject, session))
+            # Required file patterns use the same placeholders as output_path
+            files = [f.format(**fields) for f in conf["required_files"]]
+            results.extend(required_files_check(task, path, files, subject, session, index))
+        for r in results:
+            r["output_path"] = path
+        all_results.extend(results)
     return pd.DataFrame(all_results)
 
+def wave_to_session(wave, session_format="{:02d}"):
+    # "wave1" -> "01"; waves without a number are used as the session label
+    match = re.search(r"(\d+)$", str(wave))
+    return session_format.format(int(match.group(1))) if match else str(wave)
+
+def load_cohort(db_path):
+    # Every (ID, wave) tracked in qc_data
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT ID, wave FROM qc_data ORDER BY ID, wave").fetchall()
+
+def check_cohort(config, work_dir, pairs, prefix="", max_workers=DEFAULT_MAX_WORKERS,
+                 session_format="{:02d}", use_index=True, index=None):
+    # Run perform_checks for many (ID, wave) pairs in a thread pool; one combined frame.
+    # With use_index, the rule roots are walked once and patterns matched in memory.
+    if index is None and use_index:
+        index = build_index(config, work_dir, prefix, max_workers)
+
+    def check_one(pair):
+        subject, wave = pair
+        session = wave_to_session(wave, session_format)
+        df = perform_checks(config, work_dir, subject, session, prefix, index)
+        df.insert(0, "wave", wave)
+        return df
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(pool.map(check_one, pairs))
+    frames = [df for df in frames if not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def check_cohort_incremental(db, config, work_dir, prefix="", max_workers=DEFAULT_MAX_WORKERS,
+                             session_format="{:02d}"):
+    # Check every (ID, wave) in the database and persist the results in analysis_checks.
+    # Directory listings are cached in analysis_dir_index, so a rerun only re-lists
+    # directories whose mtime changed; unchanged results are not rewritten.
+    index = build_index(config, work_dir, prefix, max_workers, cache=db.load_dir_index())
+    df = check_cohort(config, work_dir, db.get_subject_waves(), prefix, max_workers,
+                      session_format, index=index)
+    if not df.empty:
+        stats = [index.stat(path) for path in df["output_path"]]
+        df["dir_mtime"] = [mtime for mtime, _ in stats]
+        df["file_count"] = [count for _, count in stats]
+    db.save_dir_index(index.changed_listings(), index.removed_paths())
+    written = db.save_analysis_checks(df)
+    print(f"[INFO] Checked {len(df)} patterns; listed {index.listed} of "
+          f"{len(index.dirs)} directories, {written} results changed")
+    return df
+
+def metric_map(config):
+    # (task, data_type) -> qc_data metric column, from the "qc_metric" keys of the config
+    mapping = {}
+    for task, conf in config.items():
+        if conf.get("qc_metric"):
+            mapping[(task, None)] = conf["qc_metric"]
+        for dt, spec in conf.get("raw_count_check", {}).get("data_types", {}).items():
+            if spec.get("qc_metric"):
+                mapping[(task, dt)] = spec["qc_metric"]
+    return mapping
+
+def check_metrics(results, mapping):
+    # {(subject, wave): {metric: 1.0 or 0.0}}; a metric is 1.0 when none of its checks failed
+    if results.empty or not mapping:
+        return {}
+    data_types = results["data_type"] if "data_type" in results else [None] * len(results)
+    metrics = [mapping.get((task, dt if isinstance(dt, str) else None), mapping.get((task, None)))
+               for task, dt in zip(results["task"], data_types)]
+    frame = results.assign(metric=metrics, ok=~results["status"].str.startswith("FAIL"))
+    frame = frame[frame["metric"].notna()]
+    values = {}
+    for (subject, wave, metric), ok in frame.groupby(["subject", "wave", "metric"])["ok"].all().items():
+        values.setdefault((subject, wave), {})[metric] = 1.0 if ok else 0.0
+    return values
+
+class OutputWatcher:
+    """Keep analysis_checks and the qc_data metric columns current as outputs appear
+
+    Uses inotify (optional inotify_simple package) when available, otherwise
+    polls directory mtimes through the cached DirectoryIndex. Each round
+    re-evaluates only the (subject, wave, task) rules whose output directory
+    (or something below it) changed, and writes the results and metrics in
+    one transaction.
+    """
+
+    def __init__(self, db, config, work_dir, prefix="", session_format="{:02d}",
+                 interval=WATCH_INTERVAL, max_workers=DEFAULT_MAX_WORKERS,
+                 use_inotify=True, user="analysis_watcher"):
+        self.db = db
+        self.config = config
+        self.work_dir = work_dir
+        self.prefix = prefix
+        self.session_format = session_format
+        self.interval = interval
+        self.max_workers = max_workers
+        self.use_inotify = use_inotify and INotify is not None
+        self.user = user
+        self.mapping = metric_map(config)
+        self.index = None
+        self.inotify = None
+        self.watches = {}   # inotify watch descriptor -> dir path
+
+    def rule_paths(self):
+        # Output directory -> [(subject, wave, task)] for every tracked (ID, wave)
+        paths = {}
+        for subject, wave in self.db.get_subject_waves():
+            session = wave_to_session(wave, self.session_format)
+            fields = dict(work_dir=self.work_dir, subject=subject, session=session, prefix=self.prefix)
+            for task, conf in self.config.items():
+                path = os.path.normpath(conf["output_path"].format(**fields))
+                paths.setdefault(path, []).append((subject, wave, task))
+        return paths
+
+    def affected(self, changed):
+        # {(subject, wave): tasks} whose output directory is a changed dir or above one
+        paths = self.rule_paths()
+        affected = {}
+        for path in changed:
+            path = os.path.normpath(path)
+            while True:
+                for subject, wave, task in paths.get(path, ()):
+                    affected.setdefault((subject, wave), set()).add(task)
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+        # Every check behind a metric is re-run so the metric sees all of them
+        metric_tasks = {}
+        for (task, _), metric in self.mapping.items():
+            metric_tasks.setdefault(metric, set()).add(task)
+        for tasks in affected.values():
+            for metric, feeding in metric_tasks.items():
+                if tasks & feeding:
+                    tasks |= feeding
+        return affected
+
+    def check_all(self):
+        # Initial full pass: walk the roots (reusing stored listings) and check every rule
+        self.index = build_index(self.config, self.work_dir, self.prefix, self.max_workers,
+                                 cache=self.db.load_dir_index())
+        results = check_cohort(self.config, self.work_dir, self.db.get_subject_waves(),
+                               self.prefix, self.max_workers, self.session_format, index=self.index)
+        self.save(results, self.index.changed_listings(), self.index.removed_paths())
+
+    def check_changed(self, changed):
+        # Re-evaluate only the rules affected by the changed directories
+        frames = []
+        for (subject, wave), tasks in self.affected(changed).items():
+            conf = {task: self.config[task] for task in self.config if task in tasks}
+            session = wave_to_session(wave, self.session_format)
+            df = perform_checks(conf, self.work_dir, subject, session, self.prefix, self.index)
+            df.insert(0, "wave", wave)
+            frames.append(df)
+        results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        listings = self.index.listings()
+        self.save(results, {path: listings[path] for path in changed if path in listings},
+                  [path for path in changed if path not in listings])
+
+    def save(self, results, listings, removed):
+        if not results.empty:
+            stats = [self.index.stat(path) for path in results["output_path"]]
+            results["dir_mtime"] = [mtime for mtime, _ in stats]
+            results["file_count"] = [count for _, count in stats]
+        with self.db.transaction():
+            self.db.save_dir_index(listings, removed)
+            written = self.db.save_analysis_checks(results)
+            metrics = self.db.set_check_metrics(check_metrics(results, self.mapping), self.user)
+        if written or metrics:
+            print(f"[INFO] {len(results)} checks re-evaluated: {written} results and "
+                  f"{metrics} QC metrics updated")
+
+    def start_inotify(self):
+        try:
+            self.inotify = INotify()
+            for path in self.index.dirs:
+                self.add_watch(path)
+            return True
+        except OSError as e:
+            # Usually fs.inotify.max_user_watches; polling needs no watches
+            print(f"[WARNING] inotify unavailable ({e}); falling back to polling")
+            if self.inotify is not None:
+                self.inotify.close()
+            self.inotify = None
+            self.watches = {}
+            return False
+
+    def add_watch(self, path):
+        mask = (inotify_flags.CREATE | inotify_flags.DELETE | inotify_flags.MOVED_FROM
+                | inotify_flags.MOVED_TO | inotify_flags.CLOSE_WRITE)
+        self.watches[self.inotify.add_watch(path, mask)] = path
+
+    def read_events(self):
+        # Block until events arrive; bursts within a second are batched into one round
+        changed = set()
+        for event in self.inotify.read(timeout=int(self.interval * 1000), read_delay=1000):
+            path = self.watches.get(event.wd)
+            if path is None:
+                continue
+            changed.add(path)
+            if event.mask & inotify_flags.ISDIR:
+                changed.add(os.path.join(path, event.name))
+        updated = self.index.refresh(changed)
+        watched = set(self.watches.values())
+        for path in updated:
+            if path in self.index.dirs and path not in watched:
+                try:
+                    self.add_watch(path)
+                except OSError as e:
+                    print(f"[WARNING] Failed to watch {path}: {e}")
+        return changed | updated
+
+    def poll(self):
+        # Re-walk with the previous listing as cache: unchanged directories are only stat'ed
+        time.sleep(self.interval)
+        previous = self.index
+        self.index = DirectoryIndex(previous.listings())
+        self.index.add_roots(previous.roots, self.max_workers)
+        changed = {path for path, entry in self.index.dirs.items()
+                   if previous.dirs.get(path) != entry}
+        changed.update(path for path in previous.dirs if path not in self.index.dirs)
+        return changed
+
+    def run(self, rounds=None):
+        self.check_all()
+        if self.use_inotify and self.start_inotify():
+            print(f"[INFO] Watching {len(self.watches)} directories with inotify")
+        else:
+            print(f"[INFO] Polling {len(self.index.dirs)} directories every {self.interval}s")
+        try:
+            while rounds is None or rounds > 0:
+                changed = self.read_events() if self.inotify else self.poll()
+                if changed:
+                    self.check_changed(changed)
+                if rounds is not None:
+                    rounds -= 1
+        except KeyboardInterrupt:
+            print("[INFO] Watcher stopped")
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()
+                self.inotify = None
+                self.watches = {}
+
 if __name__ == "__main__":
     CONFIG_PATH = r"src/fMRI_Data_Management/config/task_output_checks.yaml"
     WORK_DIR = r"/data/processed"
@@ -65,7 +536,23 @@ if __name__ == "__main__":
     SESSION = "01"
     PREFIX = "sub-"
 
+    DB_PATH = None          # set to fmri_qc.db to check every (ID, wave) in qc_data
+    MAX_WORKERS = DEFAULT_MAX_WORKERS
+    PERSIST = False         # with DB_PATH: store results in analysis_checks, reuse listings
+    WATCH = False           # with DB_PATH: keep running and push changes into qc_data
+
     cfg = load_config(CONFIG_PATH)
-    df = perform_checks(cfg, WORK_DIR, SUBJECT, SESSION, PREFIX)
+    if DB_PATH and (PERSIST or WATCH):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from database import FMRIQCDatabase
+        db = FMRIQCDatabase(DB_PATH)
+        if WATCH:
+            OutputWatcher(db, cfg, WORK_DIR, PREFIX, max_workers=MAX_WORKERS).run()
+            sys.exit(0)
+        df = check_cohort_incremental(db, cfg, WORK_DIR, PREFIX, MAX_WORKERS)
+    elif DB_PATH:
+        df = check_cohort(cfg, WORK_DIR, load_cohort(DB_PATH), PREFIX, MAX_WORKERS)
+    else:
+        df = perform_checks(cfg, WORK_DIR, SUBJECT, SESSION, PREFIX)
     print(df)
     df.to_csv("check_results.csv", index=False)
@@ -1,5 +1,6 @@
 import pandas as pd
 import json
+import re
 from typing import List, Dict, Any
 
 def parse_qc_metrics(data_list: List[Dict]) -> pd.DataFrame:
@@ -48,14 +49,131 @@ def get_all_unique_tags(df: pd.DataFrame) -> List[str]:
     return sorted(all_tags)
 
 
+FILTER_PART_PATTERN = re.compile(
+    r"^\s*\{(?P<column>[^}]+)\}\s+"
+    r"(?P<operator>is not blank|is blank|datestartswith|contains|s?(?:>=|<=|!=|=|<|>)|ge|le|lt|gt|ne|eq)"
+    r"\s*(?P<value>.*?)\s*$"
+)
+
+
+def parse_filter_query(filter_query: str) -> List[tuple]:
+    """Parse a DataTable filter_query into (column, operator, value) tuples"""
+    conditions = []
+    for part in (filter_query or '').split(' && '):
+        match = FILTER_PART_PATTERN.match(part)
+        if not match:
+            continue
+        column, operator, value = match.group('column', 'operator', 'value')
+        if re.match(r's[<>=!]', operator):
+            operator = operator[1:]  # forced-string variants compare the same way in SQL
+
+        if value[:1] in ('"', "'", '`') and value[-1:] == value[:1]:
+            value = value[1:-1]
+        else:
+            try:
+                value = float(value) if '.' in value else int(value)
+            except ValueError:
+                pass
+        conditions.append((column, operator, value))
+    return conditions
+
+
+def resolve_active_row(active_cell: Dict, derived_data: List[Dict],
+                       page_current: int, page_size: int,
+                       server_side: bool = False):
+    """Row dict under active_cell (page-relative when paging is server-side)"""
+    if not active_cell or not derived_data:
+        return None
+    row_index = active_cell['row']
+    if not server_side:
+        row_index = (page_current or 0) * (page_size or 25) + row_index
+    if row_index >= len(derived_data):
+        return None
+    return derived_data[row_index]
+
+
+def row_key(row: Dict):
+    """Stable identity of a table row: row_id if present, else (ID, wave)"""
+    if row.get('row_id') is not None:
+        return ('row_id', row['row_id'])
+    return (str(row.get('ID')), str(row.get('wave', '')))
+
+
+def diff_table_edits(current_data: List[Dict], previous_data: List[Dict],
+                     row_indices: List[int] = None, skip_columns=()) -> List[tuple]:
+    """Changed cells between two DataTable data snapshots as (row, column, value)
+
+    Only rows at row_indices (the visible page, where edits happen) are
+    compared; each is matched to its previous version by row_key.
+    """
+    if not current_data or not previous_data:
+        return []
+    if row_indices is None:
+        row_indices = range(len(current_data))
+
+    previous_by_key = None
+    changes = []
+    for i in row_indices:
+        if i >= len(current_data):
+            continue
+        row = current_data[i]
+        prev_row = previous_data[i] if i < len(previous_data) else None
+        if prev_row is None or row_key(prev_row) != row_key(row):
+            if previous_by_key is None:
+                previous_by_key = {row_key(r): r for r in previous_data}
+            prev_row = previous_by_key.get(row_key(row))
+            if prev_row is None:
+                continue
+        for column, value in row.items():
+            if column in skip_columns:
+                continue
+            if str(value) != str(prev_row.get(column)):
+                changes.append((row, column, value))
+    return changes
+
+
+def resolve_filtered_data(db, filtered_data, cache=None) -> pd.DataFrame:
+    """Rows behind the filtered-data store, resolved on the server
+
+    The store holds a result-cache key and/or a query spec; a cache miss
+    (evicted entry) falls back to running the query in SQL.
+    """
+    if not isinstance(filtered_data, dict):
+        return pd.DataFrame(filtered_data or [])
+
+    if cache is not None and filtered_data.get('key'):
+        cached = cache.get(filtered_data['key'])
+        if cached is not None:
+            return cached
+
+    if 'query' in filtered_data:
+        spec = filtered_data['query']
+        rows, _, columns = db.query_table(spec['table'], spec.get('filters'), spec.get('sort_by'))
+        return pd.DataFrame(rows, columns=columns)
+    return pd.DataFrame()
+
+
+def filter_by_keys(df: pd.DataFrame, keys) -> pd.DataFrame:
+    """Keep rows whose (ID, wave) pair is in keys"""
+    if df.empty:
+        return df
+    mask = pd.MultiIndex.from_arrays([df['ID'].astype(str), df['wave'].astype(str)]).isin(list(keys))
+    return df[mask]
+
+
 def filter_dataframe_by_criteria(df: pd.DataFrame, 
                                  filter_id: str = None,
                                  filter_wave: str = None,
                                  filter_rescan: str = 'all',
                                  filter_tags: str = None,
                                  filter_notes: str = None,
-                                 filter_project: str = None) -> pd.DataFrame:
-    """Apply multiple filters to dataframe"""
+                                 filter_project: str = None,
+                                 tag_keys=None) -> pd.DataFrame:
+    """Apply multiple filters to dataframe
+
+    tag_keys: (ID, wave) pairs carrying filter_tags (from the subject_tags
+    index); when given it replaces the substring scan over the tags column.
+    """
     if filter_id:
         df = df[df['ID'].str.contains(filter_id, case=False, na=False)]
     
@@ -66,7 +184,10 @@ def filter_dataframe_by_criteria(df: pd.DataFrame,
         df = df[df['rescan'] == int(filter_rescan)]
     
     if filter_tags:
-        df = df[df['tags'].str.contains(filter_tags, case=False, na=False)]
+        if tag_keys is not None:
+            df = filter_by_keys(df, tag_keys)
+        else:
+            df = df[df['tags'].str.contains(filter_tags, case=False, na=False, regex=False)]
     
     if filter_notes:
         df = df[df['notes'].str.contains(filter_notes, case=False, na=False)]
@@ -77,8 +198,8 @@ def filter_dataframe_by_criteria(df: pd.DataFrame,
     return df
 
 
-def apply_quick_filter(df: pd.DataFrame, filter_type: str) -> pd.DataFrame:
-    """Apply quick filter shortcuts"""
+def apply_quick_filter(df: pd.DataFrame, filter_type: str, tag_keys=None) -> pd.DataFrame:
+    """Apply quick filter shortcuts (tag_keys: (ID, wave) pairs for tag filters)"""
     if filter_type == 'rescan':
         return df[df['rescan'] == 1]
     
@@ -91,7 +212,9 @@ def apply_quick_filter(df: pd.DataFrame, filter_type: str) -> pd.DataFrame:
         return df[df['created_at'] > week_ago]
     
     elif filter_type == 'need_rerun':
-        return df[df['tags'].str.contains('need re-run', case=False, na=False)]
+        if tag_keys is not None:
+            return filter_by_keys(df, tag_keys)
+        return df[df['tags'].str.contains('needs re-run', case=False, na=False, regex=False)]
     
     # elif filter_type == 'needs_review':
     #     return df[df['tags'].str.contains('needs_review', case=False, na=False)]
@@ -3,8 +3,14 @@ import io
 import pandas as pd
 import tempfile
 import os
+import re
+import time
 from typing import Tuple, Optional
 from dash import dcc
+from config.constants import UPLOAD_CONFIG
+
+# Upload tokens are bare file names inside the upload dir (no separators)
+UPLOAD_TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+$')
 
 def decode_uploaded_file(contents: str) -> Tuple[bool, Optional[pd.DataFrame], Optional[str]]:
     try:
@@ -16,6 +22,89 @@ def decode_uploaded_file(contents: str) -> Tuple[bool, Optional[pd.DataFrame], O
         return False, None, str(e)
 
 
+def get_upload_dir() -> str:
+    """Directory for uploaded files (created on demand)"""
+    upload_dir = UPLOAD_CONFIG['dir'] or os.path.join(tempfile.gettempdir(), 'fmri_uploads')
+    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir
+
+
+def prune_uploads(max_age_hours: float = None):
+    """Remove uploaded files older than max_age_hours"""
+    max_age_hours = UPLOAD_CONFIG['max_age_hours'] if max_age_hours is None else max_age_hours
+    upload_dir = get_upload_dir()
+    cutoff = time.time() - max_age_hours * 3600
+    for entry in os.scandir(upload_dir):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+        except OSError as e:
+            print(f"[WARNING] Failed to delete old upload {entry.path}: {e}")
+
+
+def save_uploaded_file(contents: str, filename: str = None) -> Tuple[bool, Optional[str], Optional[str]]:
+    """Decode a dcc.Upload payload to a file on disk; returns (success, path, error)
+
+    The base64 text is decoded in slices, so no decoded copy of the whole
+    file (or a parsed DataFrame) is ever held in memory.
+    """
+    try:
+        content_type, content_string = contents.split(',', 1)
+        prune_uploads()
+        suffix = os.path.splitext(os.path.basename(filename or ''))[1]
+        if not re.fullmatch(r'\.[A-Za-z0-9]{1,10}', suffix):
+            suffix = '.csv'
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=get_upload_dir())
+        step = UPLOAD_CONFIG['decode_chunk_size']
+        with os.fdopen(fd, 'wb') as f:
+            for start in range(0, len(content_string), step):
+                f.write(base64.b64decode(content_string[start:start + step]))
+        return True, path, None
+    except Exception as e:
+        return False, None, str(e)
+
+
+def upload_token(file_path: str) -> str:
+    """Opaque token for an uploaded file (safe to hand to the browser)"""
+    return os.path.basename(file_path)
+
+
+def resolve_upload(token: str) -> Optional[str]:
+    """Path of the uploaded file behind a token; None unless it is a file in the upload dir"""
+    if not isinstance(token, str) or token in ('.', '..') or not UPLOAD_TOKEN_PATTERN.match(token):
+        return None
+    upload_dir = os.path.realpath(get_upload_dir())
+    path = os.path.realpath(os.path.join(upload_dir, token))
+    if os.path.dirname(path) != upload_dir or not os.path.isfile(path):
+        return None
+    return path
+
+
+def discard_upload(token: str):
+    """Delete the uploaded file behind a token (unknown tokens are ignored)"""
+    path = resolve_upload(token)
+    if path:
+        cleanup_temp_file(path)
+
+
+def read_csv_preview(file_path: str, nrows: int = None) -> Tuple[bool, Optional[pd.DataFrame], int, Optional[str]]:
+    """Head of a CSV file plus its total row count; returns (success, head, rows, error)
+
+    Rows are counted by streaming one column in chunks (flat memory).
+    """
+    nrows = nrows or UPLOAD_CONFIG['preview_rows']
+    try:
+        head = pd.read_csv(file_path, nrows=nrows)
+        total = 0
+        if len(head.columns):
+            for chunk in pd.read_csv(file_path, usecols=[0],
+                                     chunksize=UPLOAD_CONFIG['read_chunk_size']):
+                total += len(chunk)
+        return True, head, total, None
+    except Exception as e:
+        return False, None, 0, str(e)
+
+
 def prepare_temp_csv(df: pd.DataFrame) -> str:
     with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as tmp:
         df.to_csv(tmp.name, index=False)
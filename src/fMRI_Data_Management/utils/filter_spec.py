@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, Iterable, Optional
+from config.constants import QUICK_FILTERS
+
+# Quick filters without a tag (tagged ones become tag predicates)
+PLAIN_QUICK_FILTERS = ('rescan', 'notes', 'week')
+
+# Predicates whose result depends on the clock; never cached
+TIME_DEPENDENT = {('quick', 'week')}
+
+
+class FilterSpec:
+    """Filter-bar state compiled to a tuple of predicates
+
+    Each predicate is a hashable tuple, e.g. ('wave', 'wave1') or
+    ('condition', 'PPG', '=', 1). The same spec runs as SQL WHERE clauses
+    (QueryOperations) or as a composition of boolean masks over the parsed
+    qc_data frame, where masks of unchanged predicates come from a MaskCache.
+    """
+
+    def __init__(self, predicates: Iterable[tuple] = ()):
+        self.predicates = tuple(predicates)
+
+    @classmethod
+    def from_filters(cls, filters: Dict = None, qc: bool = True) -> 'FilterSpec':
+        """Spec from a filters dict (filter_*, quick_filter, conditions)
+
+        qc=False keeps only the DataTable conditions (filter bar applies to
+        qc_data only).
+        """
+        filters = filters or {}
+        predicates = []
+        if qc:
+            if filters.get('filter_id'):
+                predicates.append(('id_contains', str(filters['filter_id'])))
+            if filters.get('filter_wave'):
+                predicates.append(('wave', filters['filter_wave']))
+            if filters.get('filter_rescan') not in (None, 'all'):
+                predicates.append(('rescan', int(filters['filter_rescan'])))
+            if filters.get('filter_tags'):
+                predicates.append(('tag', filters['filter_tags']))
+            if filters.get('filter_notes'):
+                predicates.append(('notes_contains', str(filters['filter_notes'])))
+
+            quick = filters.get('quick_filter')
+            if quick in PLAIN_QUICK_FILTERS:
+                predicates.append(('quick', quick))
+            elif quick and QUICK_FILTERS.get(quick, {}).get('tag'):
+                predicates.append(('tag', QUICK_FILTERS[quick]['tag']))
+
+        for column, operator, value in filters.get('conditions') or []:
+            predicates.append(('condition', column, operator, value))
+        return cls(predicates)
+
+    def __bool__(self):
+        return bool(self.predicates)
+
+    def __repr__(self):
+        return f"FilterSpec({list(self.predicates)!r})"
+
+    def mask(self, df: pd.DataFrame, masks=None,
+             tag_keys: Optional[Callable] = None) -> np.ndarray:
+        """Boolean row mask of all predicates (AND)
+
+        masks: optional MaskCache for per-predicate reuse.
+        tag_keys: tag -> (ID, wave) pairs (subject_tags index lookup);
+        without it tag predicates scan the tags column.
+        """
+        result = np.ones(len(df), dtype=bool)
+        for predicate in self.predicates:
+            def build(predicate=predicate):
+                return predicate_mask(df, predicate, tag_keys)
+            if masks is None or predicate in TIME_DEPENDENT:
+                part = build()
+            else:
+                part = masks.get_mask(df, predicate, build)
+            result &= part
+        return result
+
+    def apply(self, df: pd.DataFrame, masks=None,
+              tag_keys: Optional[Callable] = None) -> pd.DataFrame:
+        """Filtered copy of df"""
+        if not self.predicates or df.empty:
+            return df.copy()
+        return df[self.mask(df, masks, tag_keys)]
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Helper: Series as nullable strings (missing values stay missing)"""
+    return series.astype('string')
+
+
+def _compare(series: pd.Series, operator: str, value) -> pd.Series:
+    """Helper: Dash filter_query comparison (numeric when the value is)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        series = pd.to_numeric(series, errors='coerce')
+    else:
+        series, value = _text(series), str(value)
+    if operator in ('=', 'eq'):
+        return series == value
+    if operator in ('!=', 'ne'):
+        return (series != value) & series.notna()  # NULL != x is not true in SQL
+    if operator in ('<', 'lt'):
+        return series < value
+    if operator in ('<=', 'le'):
+        return series <= value
+    if operator in ('>', 'gt'):
+        return series > value
+    if operator in ('>=', 'ge'):
+        return series >= value
+    return pd.Series(True, index=series.index)
+
+
+def predicate_mask(df: pd.DataFrame, predicate: tuple,
+                   tag_keys: Optional[Callable] = None) -> np.ndarray:
+    """Boolean mask of one predicate over a parsed frame
+
+    Text matches are literal and case-insensitive, like the SQL LIKE path.
+    """
+    kind = predicate[0]
+    if kind == 'id_contains':
+        mask = _text(df['ID']).str.contains(predicate[1], case=False, regex=False)
+    elif kind == 'wave':
+        mask = df['wave'] == predicate[1]
+    elif kind == 'rescan':
+        mask = df['rescan'] == predicate[1]
+    elif kind == 'tag':
+        if tag_keys is not None:
+            mask = pd.MultiIndex.from_arrays(
+                [df['ID'].astype(str), df['wave'].astype(str)]
+            ).isin(list(tag_keys(predicate[1])))
+        else:
+            mask = _text(df['tags']).str.contains(predicate[1], case=False, regex=False)
+    elif kind == 'notes_contains':
+        mask = _text(df['notes']).str.contains(predicate[1], case=False, regex=False)
+    elif predicate == ('quick', 'rescan'):
+        mask = df['rescan'] == 1
+    elif predicate == ('quick', 'notes'):
+        mask = df['notes'].notna() & (df['notes'] != '')
+    elif predicate == ('quick', 'week'):
+        week_ago = pd.Timestamp.now() - pd.Timedelta(days=7)
+        mask = pd.to_datetime(df['created_at'], format='mixed', errors='coerce') > week_ago
+    elif kind == 'condition':
+        _, column, operator, value = predicate
+        if column not in df.columns:
+            return np.ones(len(df), dtype=bool)
+        series = df[column]
+        if operator == 'contains':
+            mask = _text(series).str.contains(str(value), case=False, regex=False)
+        elif operator == 'datestartswith':
+            mask = _text(series).str.startswith(str(value))
+        elif operator == 'is blank':
+            mask = series.isna() | (series == '')
+        elif operator == 'is not blank':
+            mask = series.notna() & (series != '')
+        else:
+            mask = _compare(series, operator, value)
+    else:
+        print(f"[WARNING] Unknown filter predicate {predicate!r}; ignored")
+        return np.ones(len(df), dtype=bool)
+
+    if isinstance(mask, pd.Series):
+        return mask.fillna(False).to_numpy(dtype=bool)
+    return np.asarray(mask, dtype=bool)
@@ -4,14 +4,19 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from plotly.subplots import make_subplots
+from config.constants import WAFFLE_CONFIG
+from utils.progress_summary import summarize_progress, summary_waves, metric_counts_by_wave
 
-def create_stacked_bar_chart(df):
+
+def _as_summary(data):
+    """Charts accept a progress summary or a parsed qc_data frame"""
+    return summarize_progress(data) if isinstance(data, pd.DataFrame) else data
+
+def create_stacked_bar_chart(summary):
     metrics_group1 = ['T1', 'kidvid', 'CARDS', 'RS']
     metrics_group2 = ['kidvid_QC', 'Cards_QC', 'RS_QC']
 
-    if 'wave' not in df.columns:
-        df['wave'] = 'all'
-    waves = sorted(df['wave'].unique())
+    summary = _as_summary(summary)
 
     colors = ["#7BAFD4","#C9D7E8","#E8D9C5","#F2C9C1","#B6CEC7","#A3C4BC",
               "#D7E3F4","#F5D8CC","#E3E0DA","#C8D9D4"]
@@ -29,15 +34,7 @@ def create_stacked_bar_chart(df):
         subplot_titles=["Structural Metrics", "QC Metrics"]
     )
 
-    def get_counts(metrics):
-        data = []
-        for wave in waves:
-            wave_df = df[df['wave'] == wave]
-            counts = [wave_df[m].notna().sum() if m in wave_df.columns else 0 for m in metrics]
-            data.append(counts)
-        return pd.DataFrame(data, index=waves, columns=metrics)
-
-    counts_list = [get_counts(g) for g in metric_groups]
+    counts_list = [metric_counts_by_wave(summary, g) for g in metric_groups]
 
     # Add stacked bars for each group
     for row_idx, (counts, metrics) in enumerate(zip(counts_list, metric_groups), start=1):
@@ -81,7 +78,7 @@ def create_stacked_bar_chart(df):
     return fig
 
 
-def create_radar_chart(df):
+def create_radar_chart(summary):
     """Create faceted radar chart for QC metrics count by wave"""
     
     def hex_to_rgb(hex_color):
@@ -91,10 +88,9 @@ def create_radar_chart(df):
         
     metrics = ['reconstruction', 'T1', 'kidvid', 'kidvid_QC', 'CARDS', 'Cards_QC', 'RS', 'RS_QC', 'Download', 'PPG']
     
-    if 'wave' not in df.columns:
-        df['wave'] = 'all'
-    
-    waves = sorted(df['wave'].unique())
+    summary = _as_summary(summary)
+    counts_by_wave = metric_counts_by_wave(summary, metrics)
+    waves = summary_waves(summary)
     n_waves = len(waves)
     
     # Create subplots
@@ -107,15 +103,8 @@ def create_radar_chart(df):
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c']
     
     for idx, wave in enumerate(waves, 1):
-        wave_df = df[df['wave'] == wave]
-        
-        # Count non-null values for each metric
-        counts = []
-        for metric in metrics:
-            if metric in wave_df.columns:
-                counts.append(wave_df[metric].notna().sum())
-            else:
-                counts.append(0)
+        # Non-null values for each metric
+        counts = counts_by_wave.loc[wave].tolist()
         
         color = colors[idx % len(colors)]
         
@@ -174,11 +163,69 @@ def create_radar_chart(df):
     return fig
 
 
-def create_waffle_chart(df):
+def waffle_status_matrix(block):
+    """Status codes and hover labels for a metrics block (NA->0, 0->1, 1->3, other->2)"""
+    values = block.to_numpy(dtype=object)
+    is_na = block.isna().to_numpy()
+    is_done = ~is_na & (block == 1).to_numpy()
+    is_todo = ~is_na & (block == 0).to_numpy()
+    codes = np.select([is_na, is_done, is_todo], [0, 3, 1], default=2)
+    labels = np.select([is_na, is_done, is_todo], ['NA', 'Done', 'TODO'], default='')
+    labels = labels.astype(object)
+    other = codes == 2
+    labels[other] = [f'Other ({val})' for val in values[other]]
+    return codes, labels
+
+
+def bin_status_rows(codes, ids, max_rows, bin_by='id_block'):
+    """Aggregate a subjects x metrics status matrix into at most max_rows rows
+
+    'id_block' bins consecutive IDs; 'signature' keeps one row per distinct
+    status row (most common first). Each cell shows the most common status
+    of its bin; the hover label gives the full breakdown.
+    Returns (codes, row labels, hover labels, note).
+    """
+    status_names = ['NA', 'TODO', 'Other', 'Done']   # by code 0, 1, 2, 3
+    note = None
+
+    if bin_by == 'signature':
+        signatures, counts = np.unique(codes, axis=0, return_counts=True)
+        order = np.argsort(-counts, kind='stable')
+        if len(order) > max_rows:
+            hidden = order[max_rows:]
+            note = f"{len(hidden)} rarer patterns ({counts[hidden].sum()} subjects) not shown"
+            order = order[:max_rows]
+        z = signatures[order]
+        rows = [f"Pattern {i + 1} ({n})" for i, n in enumerate(counts[order])]
+        label_rows = [[f"{n} subjects: {status_names[code]}" for code in row]
+                      for n, row in zip(counts[order], z)]
+        return z, rows, np.array(label_rows, dtype=object), note
+
+    # One-hot statuses summed over contiguous blocks of sorted IDs
+    size = int(np.ceil(len(codes) / max_rows))
+    starts = np.arange(0, len(codes), size)
+    one_hot = (codes[:, :, None] == np.arange(4)).astype(np.int32)
+    tallies = np.add.reduceat(one_hot, starts, axis=0)     # blocks x metrics x 4
+    z = tallies.argmax(axis=2)
+    ends = np.minimum(starts + size, len(codes)) - 1
+    rows = [f"{ids[a]} – {ids[b]} ({b - a + 1})" for a, b in zip(starts, ends)]
+    labels = None
+    for code in (3, 1, 0, 2):
+        part = np.char.add(f"{status_names[code]} ", tallies[:, :, code].astype(str))
+        labels = part if labels is None else np.char.add(np.char.add(labels, ', '), part)
+    return z, rows, labels.astype(object), note
+
+
+def create_waffle_chart(df, max_rows=None, bin_by=None):
     """
     Create square heatmap visualization (waffle-style) with IDs as rows, metrics as columns.
     Wave1 and Wave2 side by side.
+
+    Waves with more than max_rows subjects are binned (see bin_status_rows),
+    so the figure size stays bounded however large the cohort grows.
     """
+    max_rows = max_rows or WAFFLE_CONFIG['max_rows']
+    bin_by = bin_by or WAFFLE_CONFIG['bin_by']
     metrics = ['reconstruction', 'T1', 'kidvid', 'kidvid_QC', 'CARDS', 'Cards_QC', 'RS', 'RS_QC', 'Download', 'PPG']
     
     # Filter only available metrics
@@ -216,8 +263,9 @@ def create_waffle_chart(df):
     )
     
     # Target cell size in pixels
-    cell_size = 15
+    cell_size = WAFFLE_CONFIG['cell_size']
     max_ids = 0
+    notes = []
     
     for idx, wave in enumerate(waves, start=1):
         wave_df = df[df['wave'] == wave].sort_values('ID')
@@ -225,39 +273,22 @@ def create_waffle_chart(df):
         if wave_df.empty:
             continue
         
-        # Create matrix data (IDs as rows, metrics as columns)
-        matrix_data = []
-        hover_texts = []
+        # Status matrix (IDs as rows, metrics as columns): NA->0, 0->1, 1->3, other->2
+        matrix_data, status_texts = waffle_status_matrix(wave_df[available_metrics])
+        ids = wave_df['ID'].tolist()
+        row_title = "ID"
         
-        for _, subject in wave_df.iterrows():
-            row_values = []
-            row_hover = []
-            
-            for metric in available_metrics:
-                val = subject.get(metric)
-                if pd.isna(val):
-                    row_values.append(0)
-                    status_text = 'NA'
-                elif val == 1:
-                    row_values.append(3)
-                    status_text = 'Done'
-                elif val == 0:
-                    row_values.append(1)
-                    status_text = 'TODO'
-                else:
-                    row_values.append(2)
-                    status_text = f'Other ({val})'
-                
-                row_hover.append(f"Wave: {wave}<br>ID: {subject['ID']}<br>Metric: {metric}<br>Status: {status_text}")
-            
-            matrix_data.append(row_values)
-            hover_texts.append(row_hover)
+        if len(wave_df) > max_rows:
+            matrix_data, ids, status_texts, note = bin_status_rows(
+                matrix_data, ids, max_rows, bin_by
+            )
+            row_title = "Subjects"
+            if note:
+                notes.append(f"{wave}: {note}")
         
-        n_ids = len(wave_df)
+        n_ids = len(ids)
         max_ids = max(max_ids, n_ids)
         
-        ids = wave_df['ID'].tolist()
-        
         colorscale = [
             [0.0, status_colors[0]],
             [0.33, status_colors[1]],
@@ -274,8 +305,9 @@ def create_waffle_chart(df):
                 showscale=False,
                 xgap=2,
                 ygap=2,
-                hoverinfo='text',
-                hovertext=hover_texts,
+                customdata=status_texts,
+                hovertemplate=(f"Wave: {wave}<br>{row_title}: %{{y}}<br>Metric: %{{x}}<br>"
+                               "Status: %{customdata}<extra></extra>"),
                 zmin=0,
                 zmax=3,
             ),
@@ -323,8 +355,12 @@ def create_waffle_chart(df):
             name=label
         ))
     
+    title = "Status Matrix by Wave"
+    if notes:
+        title += f"<br><sup>{'; '.join(notes)}</sup>"
+    
     fig.update_layout(
-        title="Status Matrix by Wave",
+        title=title,
         height=fig_height,
         width=fig_width,
         paper_bgcolor='white',
@@ -479,8 +515,9 @@ def create_waffle_chart(df):
 
 
 
-def create_time_series_chart(df):
-    if 'created_at' not in df.columns or df.empty:
+def create_time_series_chart(summary):
+    summary = _as_summary(summary)
+    if summary['subjects'].empty:
         fig = go.Figure()
         fig.add_annotation(
             text="No timestamp data available",
@@ -492,24 +529,17 @@ def create_time_series_chart(df):
         return fig
 
     try:
-        df = df.copy()
-        df['created_at'] = pd.to_datetime(df['created_at'], format='mixed', errors='coerce')
-        df = df.dropna(subset=['created_at'])
-        if df.empty:
+        if summary['weekly'].empty:
             raise ValueError("No valid dates found")
 
-        if 'wave' not in df.columns:
-            df['wave'] = 'all'
-
-        df['week'] = df['created_at'].dt.to_period('W').dt.start_time
-        weekly_counts = df.groupby(['week', 'wave']).size().reset_index(name='count')
+        weekly_counts = summary['weekly'].rename('count').reset_index()
 
         date_range = pd.date_range(
             start=weekly_counts['week'].min(),
             end=weekly_counts['week'].max(),
             freq='W-MON'
         )
-        waves = sorted(df['wave'].unique())
+        waves = sorted(weekly_counts['wave'].unique())
         colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#9467bd', '#8c564b']
         peak_color = '#d62728'
 
@@ -583,16 +613,50 @@ def create_time_series_chart(df):
         return fig
 
 
-def get_summary_stats(df):
+def create_pipeline_completion_chart(completion):
+    """Percent of checked subjects whose analysis outputs all pass, per task and wave
+
+    completion: frame from get_pipeline_completion (wave, task, subjects, complete)
+    """
+    colors = ["#7BAFD4","#E8D9C5","#B6CEC7","#F2C9C1","#C9D7E8","#A3C4BC"]
+    fig = go.Figure()
+    for idx, (wave, rows) in enumerate(completion.groupby('wave', sort=True)):
+        percent = (100 * rows['complete'] / rows['subjects']).round(1)
+        fig.add_trace(go.Bar(
+            y=rows['task'],
+            x=percent,
+            name=wave,
+            orientation='h',
+            marker_color=colors[idx % len(colors)],
+            customdata=rows[['complete', 'subjects']].values,
+            hovertemplate=f"{wave}: %{{customdata[0]}} / %{{customdata[1]}} "
+                          f"(%{{x}}%)<extra></extra>"
+        ))
+
+    fig.update_layout(
+        barmode='group',
+        title="Pipeline Completion by Task",
+        height=max(300, 40 * completion['task'].nunique() * max(1, completion['wave'].nunique())),
+        paper_bgcolor='white',
+        plot_bgcolor='rgba(245,245,245,0.5)',
+        font=dict(size=11),
+        xaxis=dict(title="Subjects complete (%)", range=[0, 100]),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5)
+    )
+    fig.update_xaxes(showgrid=True, gridcolor='rgba(220,220,220,0.4)')
+    return fig
+
+
+def get_summary_stats(summary):
     """Calculate summary statistics for cards"""
-    total = len(df)
-    wave1 = len(df[df['wave'] == 'wave1']) if 'wave' in df.columns else 0
-    wave2 = len(df[df['wave'] == 'wave2']) if 'wave' in df.columns else 0
+    subjects = _as_summary(summary)['subjects']
+    by_wave = subjects['total'].groupby(level='wave').sum()
+    total = int(subjects['total'].sum())
+    wave1 = int(by_wave.get('wave1', 0))
+    wave2 = int(by_wave.get('wave2', 0))
     
     # Calculate completion rate
-    completed = 0
-    if 'notes' in df.columns:
-        completed = len(df[df['notes'].notna() & (df['notes'] != '')])
+    completed = int(subjects['with_notes'].sum())
     
     return {
         'total': total,
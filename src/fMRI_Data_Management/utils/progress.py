@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ProgressTracker:
+    """Thread-safe progress of long-running jobs, polled by the UI
+
+    Jobs are keyed by caller-chosen ids and created on first use, so the
+    worker and the UI callback that starts polling may run in any order.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _job(self, job_id: str) -> Dict:
+        """Helper: Job entry, created on first use (lock held)"""
+        return self._jobs.setdefault(job_id, {'done': 0, 'total': None, 'message': "",
+                                              'finished': False, 'started_at': time.time()})
+
+    def start(self, job_id: str, total: int = None, message: str = ""):
+        """Register a job; no-op if the worker already reported on it"""
+        with self._lock:
+            job = self._job(job_id)
+            if job['total'] is None:
+                job['total'] = total
+            job['message'] = job['message'] or message
+
+    def update(self, job_id: str, done: int, total: int = None, message: str = None):
+        """Record rows/items processed so far"""
+        with self._lock:
+            job = self._job(job_id)
+            job['done'] = done
+            if total is not None:
+                job['total'] = total
+            if message is not None:
+                job['message'] = message
+
+    def finish(self, job_id: str, message: str = None):
+        """Mark a job as finished"""
+        with self._lock:
+            job = self._job(job_id)
+            job['finished'] = True
+            if message is not None:
+                job['message'] = message
+
+    def discard(self, job_id: str):
+        """Forget a job"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job's progress (None if unknown)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def percent(self, job_id: str) -> int:
+        """Progress in percent (0 when the total is unknown)"""
+        job = self.get(job_id)
+        if not job or not job['total']:
+            return 0
+        return min(100, int(100 * job['done'] / job['total']))
@@ -0,0 +1,102 @@
+import pandas as pd
+from typing import Dict, List
+from config.constants import METRIC_GROUPS
+
+# Metrics counted in the progress summary (the stats tab charts use these)
+PROGRESS_METRICS = METRIC_GROUPS['all']
+
+# Count columns per (wave, project, metric)
+METRIC_COUNT_COLUMNS = ['non_null', 'done', 'todo']
+
+
+def _empty_summary() -> Dict:
+    """Summary of an empty frame"""
+    def index(names):
+        return pd.MultiIndex.from_arrays([[] for _ in names], names=names)
+    return {
+        'metrics': pd.DataFrame(columns=METRIC_COUNT_COLUMNS, dtype='int64',
+                                index=index(['wave', 'project', 'metric'])),
+        'subjects': pd.DataFrame(columns=['total', 'with_notes'], dtype='int64',
+                                 index=index(['wave', 'project'])),
+        'weekly': pd.Series(dtype='int64', index=index(['week', 'wave']))
+    }
+
+
+def summarize_progress(df: pd.DataFrame) -> Dict:
+    """Progress counts of a parsed qc_data frame
+
+    Returns {'metrics': non_null/done/todo per (wave, project, metric),
+    'subjects': total/with_notes per (wave, project),
+    'weekly': entries per (created_at week, wave)}.
+    """
+    summary = _empty_summary()
+    if df.empty:
+        return summary
+
+    wave = df['wave'].astype(str).rename('wave')
+    if 'projects' in df.columns:
+        project = df['projects'].fillna('').astype(str).rename('project')
+    else:
+        project = pd.Series('', index=df.index, name='project')
+    keys = [wave, project]
+
+    metrics = [m for m in PROGRESS_METRICS if m in df.columns]
+    if metrics:
+        block = df[metrics]
+        parts = {'non_null': block.notna(), 'done': block == 1, 'todo': block == 0}
+        counts = {}
+        for name, part in parts.items():
+            grouped = part.groupby(keys).sum()
+            grouped.columns.name = 'metric'
+            counts[name] = grouped.stack()
+        summary['metrics'] = _drop_zero(pd.concat(counts, axis=1))
+
+    if 'notes' in df.columns:
+        with_notes = (df['notes'].notna() & (df['notes'] != '')).astype('int64')
+    else:
+        with_notes = pd.Series(0, index=df.index)
+    summary['subjects'] = pd.DataFrame(
+        {'total': 1, 'with_notes': with_notes}, index=df.index
+    ).groupby(keys).sum().astype('int64')
+
+    if 'created_at' in df.columns:
+        created = pd.to_datetime(df['created_at'], format='mixed', errors='coerce')
+        valid = created.notna()
+        if valid.any():
+            week = created[valid].dt.to_period('W').dt.start_time.rename('week')
+            summary['weekly'] = wave[valid].groupby([week, wave[valid]]).size().astype('int64')
+
+    return summary
+
+
+def _drop_zero(counts):
+    """Helper: Drop all-zero rows left after subtracting counts"""
+    if isinstance(counts, pd.DataFrame):
+        counts = counts[(counts != 0).any(axis=1)]
+    else:
+        counts = counts[counts != 0]
+    return counts.astype('int64').sort_index()
+
+
+def update_progress_summary(summary: Dict, old_rows: pd.DataFrame,
+                            new_rows: pd.DataFrame) -> Dict:
+    """Apply a row change (old_rows replaced by new_rows) to a summary"""
+    old, new = summarize_progress(old_rows), summarize_progress(new_rows)
+    return {
+        name: _drop_zero(summary[name].add(new[name], fill_value=0)
+                         .sub(old[name], fill_value=0))
+        for name in summary
+    }
+
+
+def summary_waves(summary: Dict) -> List[str]:
+    """Sorted waves present in a summary"""
+    return sorted(summary['subjects'].index.get_level_values('wave').unique())
+
+
+def metric_counts_by_wave(summary: Dict, metrics: List[str],
+                          column: str = 'non_null') -> pd.DataFrame:
+    """waves x metrics table of one count column (0 where a metric is absent)"""
+    counts = summary['metrics'][column].groupby(level=['wave', 'metric']).sum()
+    table = counts.unstack('metric') if not counts.empty else pd.DataFrame()
+    return table.reindex(index=summary_waves(summary), columns=metrics).fillna(0).astype('int64')
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+
+def filter_fingerprint(spec: Any) -> str:
+    """Stable short hash of a filter/query spec"""
+    payload = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a cached value in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe in-process LRU cache bounded by entry count and total size"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 32):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, value: Any, key: str = None) -> str:
+        """Store a value and return its key (a new random key by default)"""
+        key = key or uuid.uuid4().hex
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            print(f"[WARNING] Result of {size} bytes exceeds cache size; not cached")
+            return key
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._total_bytes += size
+            self._evict()
+        return key
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value (None if missing or evicted)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _evict(self):
+        """Drop least recently used entries until within limits (lock held)"""
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._total_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Current entry count and size"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._total_bytes,
+                    'max_entries': self.max_entries, 'max_bytes': self.max_bytes}
+
+
+class FigureCache(ResultCache):
+    """LRU cache of serialized figures keyed on (chart kind, data generation, fingerprint)
+
+    Figures are stored as JSON, so the byte limit reflects what is actually
+    sent to the browser; hits skip the figure build entirely.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 64):
+        super().__init__(max_bytes, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def get_figure(self, kind: str, generation: int, fingerprint: str,
+                   build: Callable[[], Any]) -> dict:
+        """Cached figure dict; build() (a go.Figure or dict) runs only on a miss"""
+        key = f"{kind}:{generation}:{fingerprint}"
+        payload = self.get(key)
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if payload is None:
+            figure = build()
+            payload = (figure.to_json() if hasattr(figure, 'to_json')
+                       else json.dumps(figure, cls=PlotlyJSONEncoder))
+            self.put(payload, key)
+        return json.loads(payload)
+
+    def stats(self) -> dict:
+        """Entry count, size and hit/miss counters"""
+        stats = super().stats()
+        with self._lock:
+            stats.update(hits=self.hits, misses=self.misses)
+        return stats
+
+
+class MaskCache(ResultCache):
+    """LRU cache of per-predicate boolean masks over one parsed frame
+
+    Masks are only valid for the frame object they were computed on; keys
+    carry a token that changes whenever a different frame is passed in, so
+    masks of an older frame are never returned (they age out of the LRU).
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 64):
+        super().__init__(max_bytes, max_entries)
+        self._frame = None
+        self._token = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_mask(self, frame: pd.DataFrame, predicate: Any,
+                 build: Callable[[], Any]):
+        """Cached mask of predicate over frame; build() runs only on a miss"""
+        with self._lock:
+            if frame is not self._frame:
+                self._frame = frame
+                self._token += 1
+            key = f"{self._token}:{filter_fingerprint(predicate)}"
+        mask = self.get(key)
+        with self._lock:
+            if mask is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if mask is None:
+            mask = build()
+            self.put(mask, key)
+        return mask
+
+    def stats(self) -> dict:
+        """Entry count, size and hit/miss counters"""
+        stats = super().stats()
+        with self._lock:
+            stats.update(hits=self.hits, misses=self.misses)
+        return stats
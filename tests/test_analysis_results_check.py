@@ -0,0 +1,144 @@
+import glob
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from database import FMRIQCDatabase
+from utils.analysis_results_check import (build_index, check_cohort_incremental,
+                                          load_config, wave_to_session)
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management',
+                           'config', 'task_output_checks.yaml')
+PREFIX = 'sub-'
+SUBJECTS = [('001', 'wave1'), ('002', 'wave1'), ('001', 'wave2'), ('003', 'wave1')]
+
+# Outputs of 001/002; 003 has nothing on disk
+FILES = [
+    'BIDS/sub-{s}/ses-{n}/anat/sub-{s}_T1w.nii.gz',
+    'BIDS/sub-{s}/ses-{n}/anat/sub-{s}_T1w.json',
+    'BIDS/sub-{s}/ses-{n}/anat/.sub-{s}_hidden.nii.gz',
+    'BIDS/sub-{s}/ses-{n}/fmap/sub-{s}_dir-AP_epi.nii.gz',
+    'BIDS/sub-{s}/ses-{n}/fmap/sub-{s}_dir-PA_epi.nii.gz',
+    'BIDS/sub-{s}/ses-{n}/func/sub-{s}_task-rest_run-1_bold.nii.gz',
+    'BIDS/sub-{s}/ses-{n}/func/sub-{s}_task-cards_bold.nii.gz',
+    'AFNI_derivatives/sub-{s}/ses-{n}/sswarp2/T1_results/QC_anatSS.sub-{s}.jpg',
+    'AFNI_derivatives/sub-{s}/ses-{n}/cards_output/sub-{s}.results/QC_sub-{s}/index.html',
+    'BIDS_derivatives/fmriprep/sub-{s}.html',
+    'BIDS_derivatives/xcpd/sub-{s}/ses-{n}/sub-{s}_executive_summary.html',
+    'quality_control/mriqc/sub-{s}_ses-{n}_T1w.html',
+]
+SHARED_FILES = ['quality_control/mriqc/group_T1w.html', 'BIDS/dataset_description.json']
+
+
+def set_old_mtimes(root, age=100):
+    # Directories changed within MTIME_SETTLE_SECONDS are never trusted as cached
+    stamp = time.time() - age
+    for top, dirs, files in os.walk(root):
+        os.utime(top, (stamp, stamp))
+
+
+@pytest.fixture
+def work_dir(tmp_path):
+    work = tmp_path / 'work'
+    for s, wave in SUBJECTS[:3]:
+        for template in FILES:
+            path = work / template.format(s=s, n=wave_to_session(wave))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text('')
+    for name in SHARED_FILES:
+        (work / name).write_text('')
+    set_old_mtimes(str(work))
+    return str(work)
+
+
+@pytest.fixture
+def config():
+    return load_config(CONFIG_PATH)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = FMRIQCDatabase(str(tmp_path / 'qc.db'))
+    for subject_id, wave in SUBJECTS:
+        database.add_subject(subject_id, wave, user='test')
+    yield database
+    database.close()
+
+
+def rule_patterns(config, work_dir):
+    patterns = []
+    for subject, wave in SUBJECTS:
+        fields = dict(work_dir=work_dir, subject=subject, session=wave_to_session(wave),
+                      prefix=PREFIX)
+        for conf in config.values():
+            path = conf['output_path'].format(**fields)
+            for spec in conf.get('raw_count_check', {}).get('data_types', {}).values():
+                patterns.append(os.path.join(path, spec['pattern']))
+            patterns.extend(os.path.join(path, f.format(**fields))
+                            for f in conf.get('required_files', []))
+    return patterns
+
+
+def test_index_matches_glob(config, work_dir):
+    index = build_index(config, work_dir, PREFIX)
+    patterns = rule_patterns(config, work_dir) + [
+        os.path.join(work_dir, 'BIDS', '**', '*.nii.gz'),
+        os.path.join(work_dir, 'BIDS', 'sub-*', 'ses-01', '**'),
+        os.path.join(work_dir, 'BIDS', 'sub-00?', '*', 'anat', '.*'),
+    ]
+    for pattern in patterns:
+        expected = sorted(os.path.normpath(p) for p in glob.glob(pattern, recursive=True))
+        assert sorted(index.glob(pattern)) == expected, pattern
+    assert any(index.glob(pattern) for pattern in patterns)
+
+
+def changed_rows(db, run):
+    before = db.conn.total_changes
+    run()
+    return db.conn.total_changes - before
+
+
+def test_second_run_over_unchanged_tree_writes_nothing(db, config, work_dir):
+    first = check_cohort_incremental(db, config, work_dir, PREFIX)
+    assert not first.empty
+
+    index = build_index(config, work_dir, PREFIX, cache=db.load_dir_index())
+    assert index.listed == 0
+    assert index.changed_listings() == {} and index.removed_paths() == []
+
+    generation = db.data_generation
+    assert changed_rows(db, lambda: check_cohort_incremental(db, config, work_dir, PREFIX)) == 0
+    assert db.data_generation == generation
+
+
+def test_touched_directory_relists_only_that_subtree(db, config, work_dir, capsys):
+    check_cohort_incremental(db, config, work_dir, PREFIX)
+    func = os.path.join(work_dir, 'BIDS', 'sub-002', 'ses-01', 'func')
+    open(os.path.join(func, 'sub-002_task-kidvid_bold.nii.gz'), 'w').close()
+    stamp = time.time() - 50
+    os.utime(func, (stamp, stamp))
+
+    index = build_index(config, work_dir, PREFIX, cache=db.load_dir_index())
+    assert index.listed == 1
+    assert list(index.changed_listings()) == [func]
+
+    capsys.readouterr()
+    results = check_cohort_incremental(db, config, work_dir, PREFIX)
+    assert f"listed 1 of {len(index.dirs)} directories, 1 results changed" in capsys.readouterr().out
+    kidvid = results[(results['subject'] == '002') & (results['data_type'] == 'kidvid')]
+    assert kidvid['status'].tolist() == ['PASS']
+
+
+def test_pipeline_completion_counts_subjects_whose_checks_all_pass(db, config, work_dir):
+    check_cohort_incremental(db, config, work_dir, PREFIX)
+    completion = db.get_pipeline_completion().set_index(['wave', 'task'])
+
+    assert completion.loc[('wave1', 'afni_volume')].tolist() == [3, 2]
+    assert completion.loc[('wave2', 'mriqc_group')].tolist() == [1, 1]
+    # fmap (2 of 4, tolerance 1) and kidvid are missing for everyone
+    assert completion.loc[('wave1', 'recon_bids'), 'complete'] == 0
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from database.connection_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    db_path = str(tmp_path / 'pool.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.close()
+    pool = ConnectionPool(db_path, size=2, timeout=1.0)
+    yield pool
+    pool.close_all()
+
+
+def is_closed(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_release_rolls_back_open_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+        assert conn.in_transaction
+
+    assert not conn.in_transaction
+    with pool.connection() as other:
+        assert other.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_connections_are_reused_up_to_size(pool):
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(first)
+    pool.release(second)
+
+
+def test_close_all_closes_every_connection(pool):
+    idle, in_use = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close_all()
+    assert is_closed(idle)
+
+    # Connections checked out at close time are closed when given back
+    pool.release(in_use)
+    assert is_closed(in_use)
+
+    with pytest.raises(RuntimeError):
+        pool.acquire()
@@ -0,0 +1,54 @@
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from config.constants import UPLOAD_CONFIG
+from utils.file_operations import (save_uploaded_file, upload_token, resolve_upload,
+                                   discard_upload, get_upload_dir)
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(UPLOAD_CONFIG, 'dir', str(tmp_path / 'uploads'))
+    return get_upload_dir()
+
+
+def upload(text, filename='data.csv'):
+    contents = 'data:text/csv;base64,' + base64.b64encode(text.encode()).decode()
+    success, path, error = save_uploaded_file(contents, filename)
+    assert success, error
+    return path
+
+
+def test_token_resolves_to_the_uploaded_file(upload_dir):
+    path = upload("ID,wave\n001,wave1\n")
+    token = upload_token(path)
+    assert os.sep not in token
+    assert resolve_upload(token) == os.path.realpath(path)
+
+    discard_upload(token)
+    assert not os.path.exists(path)
+    assert resolve_upload(token) is None
+
+
+def test_suspicious_filename_suffix_is_not_used(upload_dir):
+    path = upload("ID\n001\n", filename='x.csv/../../evil')
+    assert os.path.dirname(os.path.realpath(path)) == os.path.realpath(upload_dir)
+    assert path.endswith('.csv')
+
+
+def test_tokens_outside_the_upload_dir_are_rejected(upload_dir, tmp_path):
+    outside = tmp_path / 'secret.csv'
+    outside.write_text("ID\n001\n")
+    os.symlink(outside, os.path.join(upload_dir, 'link.csv'))
+    os.mkdir(os.path.join(upload_dir, 'subdir'))
+
+    for token in [str(outside), '../secret.csv', 'link.csv', 'subdir', '.', '..', '',
+                  None, {'path': str(outside)}]:
+        assert resolve_upload(token) is None
+        discard_upload(token)
+    assert outside.exists()
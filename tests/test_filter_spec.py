@@ -0,0 +1,99 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from config.constants import TABLE_CONFIG
+from database import FMRIQCDatabase
+from utils.data_processing import parse_filter_query
+from utils.filter_spec import FilterSpec
+
+DATA_DIR = os.path.dirname(__file__)
+
+# Filter-bar state (plus a DataTable filter_query) as the filter callback builds it
+FILTERS = [
+    {},
+    {'filter_id': '1'},
+    {'filter_wave': 'wave2', 'filter_rescan': '1'},
+    {'filter_rescan': '0', 'filter_tags': 'needs re-run'},
+    {'filter_notes': 'MOTION'},
+    {'filter_notes': '%'},
+    {'quick_filter': 'rescan'},
+    {'quick_filter': 'notes', 'filter_wave': 'wave1'},
+    {'quick_filter': 'need_rerun'},
+    {'filter_query': '{projects} = ProjectA'},
+    {'filter_query': '{projects} != "BRANCH" && {wave} = wave1'},
+    {'filter_query': '{projects} contains project && {T1} = 1'},
+    {'filter_query': '{T1} >= 1 && {RS} < 1'},
+    {'filter_query': '{kidvid} ne 0'},
+    {'filter_query': '{reconstruction} gt 0.5'},
+    {'filter_query': '{PPG} is blank'},
+    {'filter_query': '{PPG} is not blank && {projectspace} eq 1'},
+    {'filter_query': '{notes} contains review'},
+    {'filter_query': '{notes} s= "Good quality"'},
+    {'filter_query': '{ID} datestartswith 2'},
+    {'filter_query': '{cglab} is blank', 'filter_tags': 'check quality', 'filter_id': '4'},
+    {'filter_query': '{no_such_column} = 1', 'filter_wave': 'wave1'},
+]
+
+
+@pytest.fixture(scope='module', params=['json', 'normalized'])
+def db(request, tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp(request.param)
+    cwd = os.getcwd()
+    os.chdir(tmp_path)
+    database = FMRIQCDatabase(str(tmp_path / 'qc.db'), metric_storage=request.param)
+    database.import_from_csv(os.path.join(DATA_DIR, 'qc_wave1.csv'), 'wave1')
+    database.import_from_csv(os.path.join(DATA_DIR, 'qc_wave2.csv'), 'wave2')
+    yield database
+    database.close()
+    os.chdir(cwd)
+
+
+def as_filters(case):
+    filters = {k: v for k, v in case.items() if k != 'filter_query'}
+    filters['conditions'] = parse_filter_query(case.get('filter_query'))
+    return filters
+
+
+@pytest.mark.parametrize('case', FILTERS, ids=lambda case: repr(case))
+def test_frame_mask_matches_sql(db, case):
+    filters = as_filters(case)
+    df = FilterSpec.from_filters(filters).apply(
+        db.get_qc_dataframe(copy=False),
+        tag_keys=lambda tag: db.get_subjects_with_tags([tag]))
+    in_frame = set(zip(df['ID'].astype(str), df['wave']))
+
+    rows, total, _ = db.query_table('qc_data', filters)
+    in_sql = {(str(row['ID']), row['wave']) for row in rows}
+
+    assert in_frame == in_sql
+    assert total == len(rows)
+
+
+def test_filter_cases_are_selective(db):
+    counts = [db.query_table('qc_data', as_filters(case))[1] for case in FILTERS]
+    assert counts[0] == 100
+    # Only {} and the literal '%' notes search select all or nothing
+    assert sum(0 < count < 100 for count in counts) == len(FILTERS) - 2
+
+
+def test_text_filters_debounce_in_milliseconds():
+    from dash_app.layouts.main_layout import create_filter_section
+
+    # dbc.Input debounce is in ms (True = on blur); a value in seconds would be < 100
+    debounce = TABLE_CONFIG['filter_debounce']
+    assert isinstance(debounce, int) and not isinstance(debounce, bool)
+    assert 100 <= debounce <= 2000
+
+    inputs = {}
+    stack = [create_filter_section()]
+    while stack:
+        component = stack.pop()
+        if getattr(component, 'id', None) in ('filter-id', 'filter-notes'):
+            inputs[component.id] = component.debounce
+        children = getattr(component, 'children', None)
+        stack.extend(children if isinstance(children, list) else [children] if children else [])
+    assert inputs == {'filter-id': debounce, 'filter-notes': debounce}
@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from database import FMRIQCDatabase
+from database.migrations import SCHEMA_VERSION, get_schema_version, run_migrations
+
+# Tables as created before migrations existed (user_version 0)
+BASELINE_SCHEMA = """
+    CREATE TABLE qc_data (
+        ID TEXT NOT NULL, wave TEXT NOT NULL, qc_metrics TEXT,
+        rescan INTEGER DEFAULT 0, tags TEXT, notes TEXT, PPG TEXT,
+        PPG_correct TEXT, cglab TEXT, projects TEXT, Download TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_by TEXT, PRIMARY KEY (ID, wave)
+    );
+    CREATE TABLE column_config (
+        column_key TEXT PRIMARY KEY, display_name TEXT NOT NULL,
+        data_type TEXT DEFAULT 'text', valid_values TEXT, description TEXT,
+        is_active INTEGER DEFAULT 1, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE audit_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, subject_id TEXT NOT NULL,
+        wave TEXT NOT NULL, field_name TEXT, old_value TEXT, new_value TEXT,
+        action_type TEXT, updated_by TEXT, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE note_templates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, template_name TEXT NOT NULL,
+        template_content TEXT NOT NULL, category TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE table_registry (
+        table_name TEXT PRIMARY KEY, display_name TEXT NOT NULL, description TEXT,
+        primary_keys TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_by TEXT, is_primary INTEGER DEFAULT 0
+    );
+    CREATE TABLE beh (row_id INTEGER PRIMARY KEY AUTOINCREMENT, ID TEXT, wave TEXT, score REAL);
+    INSERT INTO table_registry (table_name, display_name, primary_keys, is_primary)
+    VALUES ('qc_data', 'QC Data', '["ID", "wave"]', 1),
+           ('beh', 'Beh', '["row_id"]', 0);
+"""
+
+TAGS = {
+    ('001', 'wave1'): '["motion", " needs re-run "]',
+    ('002', 'wave1'): '["motion", "motion", ""]',
+    ('003', 'wave1'): '[]',
+    ('004', 'wave1'): None,
+    ('005', 'wave1'): 'not json',
+    ('001', 'wave2'): '["artifact", 3]',
+}
+
+
+def expected_tag_rows():
+    rows = set()
+    for (subject_id, wave), tags in TAGS.items():
+        try:
+            values = json.loads(tags) if tags else []
+        except ValueError:
+            continue
+        rows.update((subject_id, wave, tag.strip())
+                    for tag in values if isinstance(tag, str) and tag.strip())
+    return rows
+
+
+def schema_snapshot(conn):
+    return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master").fetchall())
+
+
+@pytest.fixture
+def baseline_path(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO qc_data (ID, wave, tags) VALUES (?, ?, ?)",
+                     [key + (tags,) for key, tags in TAGS.items()])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def test_migrations_upgrade_baseline_database(baseline_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db = FMRIQCDatabase(baseline_path)
+    try:
+        assert get_schema_version(db.conn) == SCHEMA_VERSION
+
+        indexes = {row[0] for row in db.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'idx_audit_log_subject_updated', 'idx_audit_log_updated',
+                'idx_qc_data_wave', 'idx_beh_id_wave', 'idx_qc_metric_values_key',
+                'idx_subject_tags_tag', 'idx_analysis_checks_wave_task'} <= indexes
+
+        rows = {tuple(row) for row in db.conn.execute("SELECT ID, wave, tag FROM subject_tags")}
+        assert rows == expected_tag_rows()
+    finally:
+        db.close()
+
+
+def test_migrations_are_idempotent(baseline_path, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    FMRIQCDatabase(baseline_path).close()
+    capsys.readouterr()
+
+    conn = sqlite3.connect(baseline_path)
+    before = schema_snapshot(conn)
+    tags_before = conn.execute("SELECT COUNT(*) FROM subject_tags").fetchone()[0]
+
+    assert run_migrations(conn) == SCHEMA_VERSION
+    assert schema_snapshot(conn) == before
+    assert conn.execute("SELECT COUNT(*) FROM subject_tags").fetchone()[0] == tags_before
+    assert "Applied migration" not in capsys.readouterr().out
+    conn.close()
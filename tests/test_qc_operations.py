@@ -0,0 +1,102 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from database import FMRIQCDatabase
+from utils.data_processing import parse_qc_metrics
+
+DATA_DIR = os.path.dirname(__file__)
+
+
+@pytest.fixture(params=['json', 'normalized'])
+def db(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = FMRIQCDatabase(str(tmp_path / 'qc.db'), metric_storage=request.param)
+    database.import_from_csv(os.path.join(DATA_DIR, 'qc_wave1.csv'), 'wave1')
+    database.import_from_csv(os.path.join(DATA_DIR, 'qc_wave2.csv'), 'wave2')
+    yield database
+    database.close()
+
+
+def keys_of(db, n, wave='wave1'):
+    df = db.get_qc_dataframe()
+    return [tuple(k) for k in df.loc[df['wave'] == wave, ['ID', 'wave']].values[:n]]
+
+
+def test_staging_batch_keys_does_not_bump_generation(db):
+    pairs = keys_of(db, 5)
+    assert db.batch_add_tags(pairs, ['motion'], user='test') == 5
+    generation = db.data_generation
+
+    # Every subject already has the tag: keys are staged, no row changes
+    assert db.batch_add_tags(pairs, ['motion'], user='test') == 0
+    assert db.data_generation == generation
+
+    db.batch_set_field(pairs, 'T1', 1.0, user='test')
+    assert db.data_generation == generation + 1
+
+
+def audit_rows(db, action_type):
+    return [tuple(row) for row in db.conn.execute(
+        "SELECT subject_id, wave, field_name, old_value, new_value FROM audit_log "
+        "WHERE action_type = ? ORDER BY subject_id, wave", (action_type,))]
+
+
+def test_delete_subjects_count_and_tombstones(db):
+    pairs = sorted(keys_of(db, 3))
+    db.add_tag(*pairs[0], 'motion', user='test')
+    before = db.get_qc_dataframe()
+
+    # A generator, plus a key that does not exist
+    deleted = db.delete_subjects((key for key in pairs + [('nope', 'wave1')]), user='test')
+    assert deleted == 3
+
+    tombstones = audit_rows(db, 'delete')
+    assert [row[:2] for row in tombstones] == pairs
+    for subject_id, wave, field_name, old_value, new_value in tombstones:
+        record = json.loads(old_value)
+        assert (field_name, new_value) == ('delete', 'None')
+        assert (record['ID'], record['wave']) == (subject_id, wave)
+        assert isinstance(record['qc_metrics'], dict) and record['qc_metrics']
+    assert json.loads(json.loads(tombstones[0][3])['tags']) == ['motion']
+
+    after = db.get_qc_dataframe()
+    assert len(after) == len(before) - 3
+    assert not set(map(tuple, after[['ID', 'wave']].values)) & set(pairs)
+    for table in ('qc_metric_values', 'subject_tags'):
+        left = db.conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE ID = ? AND wave = ?", pairs[0]).fetchone()[0]
+        assert left == 0
+
+
+def fresh_frame(db):
+    df = parse_qc_metrics(db.get_all_data_raw())
+    return df.sort_values(['ID', 'wave'], kind='stable').reset_index(drop=True)
+
+
+def comparable(df):
+    """Values as text, with every missing value (None/NaN) spelled the same"""
+    return df.astype(object).where(df.notna(), None).astype(str)
+
+
+def test_cached_frame_matches_fresh_parse_after_batch_writes(db):
+    db.get_qc_dataframe()   # build the cache so later reads patch it
+    wave1, wave2 = keys_of(db, 20), keys_of(db, 10, wave='wave2')
+
+    db.batch_update(wave1[:8], 'tag', 'needs re-run', user='test')
+    db.batch_update(wave1[4:12], 'T1', 0.0, user='test')
+    db.batch_update(wave2, 'projects', 'OTHER', user='test')
+    db.batch_update(wave2[:3], 'new_metric', 'x', user='test')
+    db.batch_update(wave1[10:15], 'tags', 'motion, artifact', user='test')
+    db.batch_delete(wave1[15:], user='test')
+    db.batch_delete(iter(wave2[5:7]), user='test')
+
+    cached = db.get_qc_dataframe()
+    fresh = fresh_frame(db)
+    assert set(cached.columns) == set(fresh.columns)
+    pd.testing.assert_frame_equal(comparable(cached[fresh.columns]), comparable(fresh))
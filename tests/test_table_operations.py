@@ -0,0 +1,76 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'fMRI_Data_Management'))
+
+from database import FMRIQCDatabase
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    database = FMRIQCDatabase(str(tmp_path / 'test.db'))
+    yield database
+    database.close()
+
+
+def make_frame(n=50):
+    return pd.DataFrame({
+        'ID': [f"S{i:03d}" for i in range(n)],
+        'wave': 'wave1',
+        'projects': 'BRANCH',
+        'score': range(n)
+    })
+
+
+def schema_objects(db, table_name):
+    rows = db.conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE tbl_name = ?", (table_name,)
+    ).fetchall()
+    return [tuple(row) for row in rows]
+
+
+def test_failed_load_leaves_no_table(db):
+    def fail_after_first_chunk(done, total):
+        if done > 10:
+            raise RuntimeError("load failed")
+
+    with pytest.raises(RuntimeError):
+        db.create_table_from_dataframe('beh', make_frame(), chunk_size=10,
+                                       progress_callback=fail_after_first_chunk)
+
+    assert schema_objects(db, 'beh') == []
+    assert db.get_table_info('beh') is None
+
+    result = db.create_table_from_dataframe('beh', make_frame(), chunk_size=10)
+    assert result['success'] and result['rows_imported'] == 50
+
+
+def test_csv_parse_error_mid_stream_leaves_no_table(db, tmp_path):
+    csv_path = tmp_path / 'beh.csv'
+    lines = ['ID,wave,projects,score'] + [f"S{i:03d},wave1,BRANCH,{i}" for i in range(30)]
+    lines.insert(16, 'S999,wave1,BRANCH,1,extra,fields')  # in the second chunk
+    csv_path.write_text('\n'.join(lines) + '\n')
+
+    with pytest.raises(pd.errors.ParserError):
+        db.create_table_from_csv('beh', str(csv_path), chunk_size=10)
+
+    assert schema_objects(db, 'beh') == []
+    assert db.get_table_info('beh') is None
+
+
+def test_failed_overwrite_keeps_existing_table(db):
+    db.create_table_from_dataframe('beh', make_frame(5))
+
+    def fail(done, total):
+        raise RuntimeError("load failed")
+
+    with pytest.raises(RuntimeError):
+        db.create_table_from_dataframe('beh', make_frame(), overwrite=True,
+                                       progress_callback=fail)
+
+    assert db.get_table_info('beh') is not None
+    assert len(db.get_table_data('beh')) == 5